@@ -0,0 +1,36 @@
+from typing import Any, Callable
+
+from ..services.executor import BlockingExecutor, io_executor
+from .base_repository import BaseJsonRepository
+
+# Методы, которые только читают данные (остальные - запись)
+_READ_PREFIXES = ('get_', 'search_', 'email_exists', 'username_exists')
+
+
+class AsyncRepository:
+    """
+    Async-обёртка над репозиторием: await repo.get_by_id(...), await repo.create(...).
+
+    Чтение, когда снимок в памяти актуален, выполняется сразу в цикле событий
+    (это обращение к словарю), иначе - как и любая запись (блокировка файла,
+    дозапись журнала, fsync) - в ограниченном пуле потоков.
+    """
+
+    def __init__(self, repository: BaseJsonRepository, executor: BlockingExecutor = io_executor):
+        self.repository = repository
+        self.executor = executor
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        method = getattr(self.repository, name)
+        if not callable(method):
+            return method
+        is_read = name.startswith(_READ_PREFIXES)
+
+        async def call(*args, **kwargs):
+            if is_read and self.repository.is_fresh():
+                return method(*args, **kwargs)
+            return await self.executor.run(method, *args, **kwargs)
+
+        call.__name__ = name
+        call.__doc__ = method.__doc__
+        return call
@@ -1,73 +1,266 @@
 import json
-from typing import List, Dict, Any, Optional
+import os
+from typing import Callable, List, Dict, Any, Hashable, Optional, Sequence, Tuple, Type
 from pathlib import Path
 import logging
 
+from ..services.snapshot_cache import Snapshot, snapshot_cache
+from .locking import FileLock
+from .records import Record
+from .storage import JsonFileStorage, get_storage
+
 logger = logging.getLogger(__name__)
 
 
+class VersionConflictError(Exception):
+    """Запись изменили с момента чтения: версия в обновлении не совпадает с сохранённой"""
+
+    def __init__(self, item_id: str, expected: int, actual: int):
+        super().__init__(f"Version conflict for {item_id}: expected {expected}, got {actual}")
+        self.item_id = item_id
+        self.expected = expected
+        self.actual = actual
+
+
+class IndexSet:
+    """
+    Хеш-индексы по полям записей одного снимка.
+
+    unique: значение -> запись (при дублях предпочитается неудалённая запись)
+    multi:  значение -> список записей
+    """
+
+    def __init__(self, unique: Sequence[str], multi: Sequence[str], data: Sequence[Dict[str, Any]]):
+        self.unique: Dict[str, Dict[Any, Dict[str, Any]]] = {field: {} for field in unique}
+        self.multi: Dict[str, Dict[Any, List[Dict[str, Any]]]] = {field: {} for field in multi}
+        for item in data:
+            self.add(item)
+
+    def add(self, item: Dict[str, Any]):
+        for field, index in self.unique.items():
+            value = item.get(field)
+            if value is None:
+                continue
+            current = index.get(value)
+            if current is None or current.get('is_deleted', False) or not item.get('is_deleted', False):
+                index[value] = item
+        for field, index in self.multi.items():
+            value = item.get(field)
+            index.setdefault(value, []).append(item)
+
+    def remove(self, item: Dict[str, Any]):
+        for field, index in self.unique.items():
+            value = item.get(field)
+            if index.get(value) is item:
+                del index[value]
+        for field, index in self.multi.items():
+            bucket = index.get(item.get(field))
+            if bucket is None:
+                continue
+            for i, candidate in enumerate(bucket):
+                if candidate is item:
+                    del bucket[i]
+                    break
+            if not bucket:
+                del index[item.get(field)]
+
+    def replace(self, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]):
+        if old is not None:
+            self.remove(old)
+        if new is not None:
+            self.add(new)
+
+
 class BaseJsonRepository:
-    
-    def __init__(self, data_dir: str, filename: str):
+    # Декларативные индексы: подклассы перечисляют поля, по которым ищут записи
+    unique_indexes: Tuple[str, ...] = ('id',)
+    multi_indexes: Tuple[str, ...] = ()
+    # Счётчики меняются только приращениями, update() их не перезаписывает
+    counter_fields: Tuple[str, ...] = ()
+    # Класс записей в снимке (records.py); None - записи хранятся как dict
+    record_type: Optional[Type[Record]] = None
+
+    def __new__(cls, *args, **kwargs):
+        # STORAGE_ENGINE=sqlite: тот же репозиторий, но данные в SQLite (sqlite_repository)
+        if os.getenv('STORAGE_ENGINE') == 'sqlite':
+            from .sqlite_repository import sqlite_variant
+            cls = sqlite_variant(cls)
+        return super().__new__(cls)
+
+    def __init__(self, data_dir: str, filename: str, storage: Optional[JsonFileStorage] = None):
         self.data_dir = Path(data_dir)
         self.file_path = self.data_dir / filename
+        self._index_key = ('indexes', self.unique_indexes, self.multi_indexes)
+        # Производные структуры, которые при записи обновляются, а не строятся заново
+        self._incremental: Dict[Hashable, Callable[[Sequence[Dict[str, Any]]], Any]] = {
+            self._index_key: lambda data: IndexSet(self.unique_indexes, self.multi_indexes, data),
+        }
         self._ensure_file_exists()
-    
+        self.storage = storage if storage is not None else get_storage(self.file_path, self.record_type)
+
     def _ensure_file_exists(self):
         if not self.file_path.exists():
             self.data_dir.mkdir(parents=True, exist_ok=True)
             with open(self.file_path, 'w') as f:
                 json.dump([], f, indent=2)
-    
-    def _read_data(self) -> List[Dict[str, Any]]:
+
+    def _write_lock(self) -> FileLock:
+        return self.storage.lock
+
+    def _snapshot(self) -> Snapshot:
+        # Под блокировкой записи всегда сверяемся с диском: могли писать другие процессы
+        return snapshot_cache.get(
+            self.file_path,
+            loader=self.storage.load,
+            watch=self.storage.watch,
+            revalidate=self.storage.lock.held(),
+        )
+
+    def is_fresh(self) -> bool:
+        """Актуален ли снимок данных в памяти (чтение не потребует загрузки с диска)"""
+        return snapshot_cache.is_fresh(self.file_path, watch=self.storage.watch)
+
+    def data_tag(self) -> str:
+        """
+        Версия данных для ETag: подпись файла и журнала текущего снимка (mtime,
+        размер, inode). Одинакова во всех процессах, пока данные не менялись.
+        """
+        return f"{self.file_path.name}:{self._snapshot().stamp}"
+
+    def _read_data(self) -> Sequence[Dict[str, Any]]:
         try:
-            with open(self.file_path, 'r') as f:
-                return json.load(f)
+            return self._snapshot().data
         except Exception as e:
             logger.error(f"Error reading {self.file_path}: {e}")
-            return []
-    
-    def _write_data(self, data: List[Dict[str, Any]]):
+            return ()
+
+    def _indexes(self, snapshot: Optional[Snapshot] = None) -> IndexSet:
+        if snapshot is None:
+            snapshot = self._snapshot()
+        return snapshot.derive(self._index_key, self._incremental[self._index_key])
+
+    def derived(self, key: Hashable, builder: Callable[[Sequence[Dict[str, Any]]], Any]) -> Any:
+        """
+        Производная структура текущего снимка (топы, поисковый индекс и т.п.).
+
+        Строится один раз на снимок. У структуры должен быть метод replace(old, new):
+        записи через этот репозиторий обновляют её на месте, а не строят заново.
+        """
+        self._incremental.setdefault(key, builder)
+        return self._snapshot().derive(key, builder)
+
+    def _find_unique(self, field: str, value: Any) -> Optional[Dict[str, Any]]:
         try:
-            with open(self.file_path, 'w') as f:
-                json.dump(data, f, indent=2)
+            return self._indexes().unique[field].get(value)
         except Exception as e:
-            logger.error(f"Error writing to {self.file_path}: {e}")
-    
-    def get_all(self) -> List[Dict[str, Any]]:
+            logger.error(f"Error reading {self.file_path}: {e}")
+            return None
+
+    def _find_many(self, field: str, value: Any) -> List[Dict[str, Any]]:
+        try:
+            return list(self._indexes().multi[field].get(value, ()))
+        except Exception as e:
+            logger.error(f"Error reading {self.file_path}: {e}")
+            return []
+
+    def _record(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Запись для снимка: dict от вызывающего -> record_type"""
+        return self.record_type.from_dict(item) if self.record_type is not None else item
+
+    def _apply(self, new: Dict[str, Any]):
+        """Записать запись (вставка или замена по id)"""
+        self._apply_many([new])
+
+    def _apply_many(self, items: List[Dict[str, Any]], changes: Optional[List[Dict[str, Any]]] = None):
+        """
+        Записать пачку записей через хранилище и обновить снимок, индексы и прочие
+        производные структуры.
+
+        changes - записи журнала (по умолчанию "put" каждой записи). Записи в снимке
+        не изменяются на месте: изменённая запись заменяется новой.
+        """
+        items = [self._record(item) for item in items]
+        if changes is None:
+            changes = [{'op': 'put', 'item': item} for item in items]
+        with self._write_lock():
+            snapshot = self._snapshot()
+            indexes = self._indexes(snapshot)
+            data = list(snapshot.data)
+
+            pairs = [(indexes.unique['id'].get(item.get('id')), item) for item in items]
+            replaced = {}
+            for old, item in pairs:
+                if old is None:
+                    data.append(item)
+                else:
+                    replaced[id(old)] = (old, item)
+            if replaced:
+                for i, row in enumerate(data):
+                    pair = replaced.get(id(row))
+                    if pair is not None and pair[0] is row:
+                        data[i] = pair[1]
+
+            try:
+                in_sync = self.storage.write(data, changes)
+            except Exception as e:
+                # Что успело попасть в файл, неизвестно: снимок перечитается, ошибка - вызывающему
+                logger.error(f"Error writing to {self.file_path}: {e}")
+                snapshot_cache.invalidate(self.file_path)
+                raise
+            if not in_sync:
+                # Файл менял кто-то ещё - снимок и индексы перечитаются при следующем обращении
+                snapshot_cache.invalidate(self.file_path)
+                return
+            carried = {}
+            for key in list(self._incremental):
+                structure = snapshot.peek(key)
+                if structure is None:
+                    continue  # ещё не строилась - построится по требованию
+                for old, item in pairs:
+                    structure.replace(old, item)
+                carried[key] = structure
+            snapshot_cache.publish(self.file_path, data, carried, watch=self.storage.watch)
+
+    def get_all(self) -> Sequence[Dict[str, Any]]:
         return self._read_data()
-    
+
     def get_by_id(self, item_id: str) -> Optional[Dict[str, Any]]:
-        data = self._read_data()
-        for item in data:
-            if item.get('id') == item_id:
-                return item
-        return None
-    
+        return self._find_unique('id', item_id)
+
     def get_not_deleted(self) -> List[Dict[str, Any]]:
         data = self._read_data()
         return [item for item in data if not item.get('is_deleted', False)]
 
     def create(self, item: Dict[str, Any]) -> Dict[str, Any]:
-        data = self._read_data()
-        data.append(item)
-        self._write_data(data)
+        item.setdefault('version', 1)
+        self._apply(item)
         return item
-    
+
     def update(self, item_id: str, updated_item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        data = self._read_data()
-        for i, item in enumerate(data):
-            if item.get('id') == item_id:
-                data[i] = updated_item
-                self._write_data(data)
-                return updated_item
-        return None
-    
+        """
+        Заменить запись. Если в updated_item есть 'version', это версия, которую
+        прочитал вызывающий: при несовпадении с сохранённой - VersionConflictError.
+        """
+        with self._write_lock():
+            item = self.get_by_id(item_id)
+            if item is None:
+                return None
+            current_version = item.get('version', 0)
+            expected_version = updated_item.get('version')
+            if expected_version is not None and expected_version != current_version:
+                raise VersionConflictError(item_id, expected_version, current_version)
+
+            new_item = {**updated_item, 'id': item_id, 'version': current_version + 1}
+            for field in self.counter_fields:
+                if field in item:
+                    new_item[field] = item[field]
+            self._apply(new_item)
+            return new_item
+
     def delete(self, item_id: str) -> bool:
-        data = self._read_data()
-        for item in data:
-            if item.get('id') == item_id:
-                item['is_deleted'] = True
-                self._write_data(data)
-                return True
-        return False
\ No newline at end of file
+        with self._write_lock():
+            item = self.get_by_id(item_id)
+            if item is None:
+                return False
+            self._apply({**item, 'is_deleted': True, 'version': item.get('version', 0) + 1})
+            return True
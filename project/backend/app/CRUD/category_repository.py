@@ -1,8 +1,11 @@
 from typing import Optional, Dict, Any, List
-from base_repository import BaseJsonRepository
+from .base_repository import BaseJsonRepository
+from .records import CategoryRecord
 
 
 class CategoryRepository(BaseJsonRepository):
+    record_type = CategoryRecord
+
     def __init__(self, data_dir: str):
         super().__init__(data_dir, "categories.json")
     
@@ -1,49 +1,54 @@
-from typing import Dict, Any, List
-from base_repository import BaseJsonRepository
+from typing import Dict, Any, List, Optional
+from .base_repository import BaseJsonRepository
+from .records import CommentRecord
+from ..services.comment_tree import build_comment_tree
 
 
 class CommentRepository(BaseJsonRepository):
+    multi_indexes = ('video_id', 'parent_id', 'user_id')
+    record_type = CommentRecord
+
     def __init__(self, data_dir: str):
         super().__init__(data_dir, "comments.json")
     
     def get_by_video_id(self, video_id: str) -> List[Dict[str, Any]]:
-        data = self._read_data()
         return [
-            comment for comment in data
-            if comment.get('video_id') == video_id and not comment.get('is_deleted', False)
+            comment for comment in self._find_many('video_id', video_id)
+            if not comment.get('is_deleted', False)
         ]
     
     def get_root_comments(self, video_id: str) -> List[Dict[str, Any]]:
-        data = self._read_data()
         return [
-            comment for comment in data
-            if comment.get('video_id') == video_id 
-            and comment.get('parent_id') is None
+            comment for comment in self._find_many('video_id', video_id)
+            if comment.get('parent_id') is None
             and not comment.get('is_deleted', False)
         ]
     
     def get_replies(self, parent_id: str) -> List[Dict[str, Any]]:
-        data = self._read_data()
         return [
-            comment for comment in data
-            if comment.get('parent_id') == parent_id
-            and not comment.get('is_deleted', False)
+            comment for comment in self._find_many('parent_id', parent_id)
+            if not comment.get('is_deleted', False)
         ]
     
     def get_by_user_id(self, user_id: str) -> List[Dict[str, Any]]:
-        data = self._read_data()
         return [
-            comment for comment in data
-            if comment.get('user_id') == user_id and not comment.get('is_deleted', False)
+            comment for comment in self._find_many('user_id', user_id)
+            if not comment.get('is_deleted', False)
         ]
     
-    def get_comment_thread(self, comment_id: str) -> Dict[str, Any]:
+    def get_video_comments(self, video_id: str) -> List[Dict[str, Any]]:
+        """Все комментарии видео, включая удалённые (нужны для построения дерева)"""
+        return self._find_many('video_id', video_id)
+
+    def get_comment_thread(self, comment_id: str, max_depth: Optional[int] = None) -> Dict[str, Any]:
+        """Комментарий со всей веткой ответов (узел дерева build_comment_tree)"""
         comment = self.get_by_id(comment_id)
         if not comment:
             return {}
-        
-        replies = self.get_replies(comment_id)
-        return {
-            'comment': comment,
-            'replies': replies
-        }
+
+        tree = build_comment_tree(
+            self.get_video_comments(comment.get('video_id')),
+            max_depth=max_depth,
+            root_id=comment_id,
+        )
+        return tree['items'][0] if tree['items'] else {}
@@ -0,0 +1,55 @@
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: остаётся только блокировка между потоками
+    fcntl = None
+
+
+class FileLock:
+    """
+    Реентерабельная блокировка файла данных: между потоками процесса (RLock)
+    и между процессами, например воркерами uvicorn (fcntl.flock на <файл>.lock).
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self._fd: Optional[int] = None
+        self._depth = 0
+        self._owner: Optional[int] = None
+
+    def acquire(self):
+        self._lock.acquire()
+        if self._depth == 0 and fcntl is not None:
+            try:
+                if self._fd is None:
+                    self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            except BaseException:
+                self._lock.release()
+                raise
+        self._depth += 1
+        self._owner = threading.get_ident()
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            self._owner = None
+            if self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._lock.release()
+
+    def held(self) -> bool:
+        """Удерживает ли блокировку текущий поток"""
+        return self._owner == threading.get_ident()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
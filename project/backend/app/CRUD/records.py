@@ -0,0 +1,173 @@
+import sys
+from collections.abc import Mapping
+from operator import attrgetter
+from typing import Any, Dict, FrozenSet, Iterator, Tuple
+
+_intern = sys.intern
+
+
+class Record(Mapping):
+    """
+    Запись репозитория в памяти: поля - в __slots__, а не в dict.
+
+    Словарь на десяток ключей занимает в несколько раз больше самих значений;
+    у записи со слотами - заголовок объекта и по указателю на поле. Повторяющиеся
+    строки (id записей, авторов, категорий, видео) интернируются: тысячи записей
+    ссылаются на одну строку, а не на свою копию из JSON.
+
+    Для остального кода запись - неизменяемое отображение: get, [], in,
+    {**record}, dict(record) работают как у dict, а json_codec.dumps пишет её
+    как объект. Отсутствующее поле - незаполненный слот (get вернёт default,
+    "поле" in record - False). В __slots__ - поля, которые есть у каждой записи
+    в файлах данных; остальные (version появляется после первой записи через
+    репозиторий) хранятся в _extra.
+    """
+
+    __slots__ = ("_extra",)
+
+    # Поля, строки в которых интернируются
+    interned: Tuple[str, ...] = ()
+
+    _fields: Tuple[str, ...] = ()
+    _field_set: FrozenSet[str] = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        fields = tuple(field for klass in reversed(cls.__mro__) for field in klass.__dict__.get("__slots__", ())
+                       if field != "_extra")
+        clashes = [field for field in fields if hasattr(Record, field)]
+        if clashes:
+            raise TypeError(f"Поля {clashes} совпадают с методами Record")
+        cls._fields = fields
+        cls._field_set = frozenset(fields)
+        # attrgetter с двумя и больше именами возвращает кортеж - to_dict собирает dict за один zip
+        if len(fields) > 1:
+            cls._getter = staticmethod(attrgetter(*fields))
+        else:
+            cls._getter = staticmethod(lambda record: tuple(getattr(record, field) for field in fields))
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> "Record":
+        """Запись из dict (распарсенного JSON); запись того же класса возвращается как есть"""
+        if type(data) is cls:
+            return data
+        record = cls.__new__(cls)
+        record._fill(data)
+        return record
+
+    def _fill(self, data: Mapping):
+        extra = None
+        for key, value in data.items():
+            try:
+                setattr(self, key, value)
+            except (AttributeError, TypeError):
+                # Поле не из __slots__ (или ключ - не строка)
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+        self._extra = extra
+        for key in self.interned:
+            value = getattr(self, key, None)
+            if type(value) is str:
+                setattr(self, key, _intern(value))
+
+    def to_dict(self) -> Dict[str, Any]:
+        try:
+            data = dict(zip(self._fields, self._getter(self)))
+        except AttributeError:
+            # Не все поля заполнены
+            data = {}
+            for field in self._fields:
+                try:
+                    data[field] = getattr(self, field)
+                except AttributeError:
+                    pass
+        if self._extra:
+            data.update(self._extra)
+        return data
+
+    # ---------- отображение ----------
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        if key in self._field_set:
+            return getattr(self, key, default)
+        extra = self._extra
+        return extra.get(key, default) if extra else default
+
+    def __getitem__(self, key: Any) -> Any:
+        if key in self._field_set:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        extra = self._extra
+        if extra and key in extra:
+            return extra[key]
+        raise KeyError(key)
+
+    def __contains__(self, key: Any) -> bool:
+        if key in self._field_set:
+            return hasattr(self, key)
+        extra = self._extra
+        return bool(extra) and key in extra
+
+    def __iter__(self) -> Iterator[str]:
+        for field in self._fields:
+            if hasattr(self, field):
+                yield field
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for field in self._fields if hasattr(self, field)) + len(self._extra or ())
+
+    def keys(self):
+        return self.to_dict().keys()
+
+    def items(self):
+        return self.to_dict().items()
+
+    def values(self):
+        return self.to_dict().values()
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, Mapping):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self._fill(state)
+
+
+class UserRecord(Record):
+    __slots__ = (
+        "id", "name", "email", "birth", "role", "registered_at", "user_link", "logo_loc",
+        "password_hash", "is_deleted",
+    )
+    interned = ("id", "name", "role")
+
+
+class VideoRecord(Record):
+    __slots__ = (
+        "id", "user_id", "name", "description", "date", "likes", "dislikes", "views",
+        "is_public", "is_deleted", "category_id",
+    )
+    interned = ("id", "user_id", "category_id")
+
+
+class CommentRecord(Record):
+    __slots__ = ("id", "user_id", "video_id", "parent_id", "text", "date", "is_deleted")
+    interned = ("id", "user_id", "video_id", "parent_id")
+
+
+class CategoryRecord(Record):
+    __slots__ = ("id", "name")
+    interned = ("id",)
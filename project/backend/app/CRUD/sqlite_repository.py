@@ -0,0 +1,285 @@
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple, Type
+
+from ..services import json_codec
+from ..services.metrics import metrics
+from ..services.snapshot_cache import Snapshot
+from .base_repository import BaseJsonRepository
+from .storage import SqliteDatabase, get_database, sqlite_path
+
+logger = logging.getLogger(__name__)
+
+# Каталог версий таблиц: каждая запись в таблицу увеличивает её версию
+_VERSIONS_DDL = 'CREATE TABLE IF NOT EXISTS _versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)'
+
+
+def _encode(item: Dict[str, Any]) -> bytes:
+    # Колонка data - TEXT: sqlite3 хранит bytes как BLOB, поэтому декодируем
+    return json_codec.dumps(item).decode('utf-8')
+
+
+def _column_value(value: Any) -> Any:
+    # В индексируемые колонки идут скаляры; составные значения - как JSON
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return json_codec.dumps(value).decode('utf-8')
+
+
+class SqliteRepository(BaseJsonRepository):
+    """
+    Репозиторий с теми же методами, что у BaseJsonRepository, но поверх таблицы SQLite.
+
+    Запись хранится целиком (JSON в колонке data); поля из unique_indexes и
+    multi_indexes подкласса дублируются в колонки с индексами (и is_deleted -
+    в свою колонку), так что get_by_id, _find_unique и _find_many - запросы по
+    индексу, а запись меняет одну строку, а не переписывает файл.
+
+    Полный список записей (get_all) и производные структуры (derived) строятся
+    по снимку таблицы, как у JSON-репозитория. Актуальность снимка - версия
+    таблицы в _versions: свои записи обновляют снимок на месте, запись другого
+    процесса меняет версию, и снимок перечитывается.
+
+    Выбирается переменной окружения STORAGE_ENGINE=sqlite: тогда
+    VideoRepository(data_dir) и остальные создаются поверх SQLite (см.
+    sqlite_variant), методы подклассов работают без изменений.
+    """
+
+    def __init__(self, data_dir: str, filename: str, database: Optional[SqliteDatabase] = None):
+        self.data_dir = Path(data_dir)
+        self.table = Path(filename).stem
+        self.db = database if database is not None else get_database(sqlite_path(self.data_dir))
+        self.file_path = self.db.path
+        self.columns: Tuple[str, ...] = tuple(
+            dict.fromkeys(field for field in self.unique_indexes + self.multi_indexes if field != 'id')
+        )
+        self._incremental: Dict[Hashable, Callable[[Sequence[Dict[str, Any]]], Any]] = {}
+        self._snapshot_lock = threading.Lock()
+        self._cached: Optional[Snapshot] = None
+        self._ensure_schema()
+
+        columns = ''.join(f', "{c}"' for c in self.columns)
+        params = ', ?' * len(self.columns)
+        updates = ''.join(f', "{c}" = excluded."{c}"' for c in self.columns)
+        self._upsert_sql = (
+            f'INSERT INTO "{self.table}" (id, data, is_deleted{columns}) VALUES (?, ?, ?{params}) '
+            f'ON CONFLICT(id) DO UPDATE SET data = excluded.data, is_deleted = excluded.is_deleted{updates}'
+        )
+
+    # ---------- схема ----------
+
+    def _ensure_schema(self):
+        with self.db:
+            conn = self.db.writer
+            conn.execute(_VERSIONS_DDL)
+            conn.execute(
+                f'CREATE TABLE IF NOT EXISTS "{self.table}" '
+                f'(id TEXT PRIMARY KEY, data TEXT NOT NULL, is_deleted INTEGER NOT NULL DEFAULT 0)'
+            )
+            conn.execute('INSERT OR IGNORE INTO _versions (name, version) VALUES (?, 0)', (self.table,))
+            existing = {row[1] for row in conn.execute(f'PRAGMA table_info("{self.table}")')}
+            for column in self.columns:
+                if column not in existing:
+                    # Новый индекс в подклассе: колонка заполняется из уже сохранённых записей
+                    conn.execute(f'ALTER TABLE "{self.table}" ADD COLUMN "{column}"')
+                    conn.execute(f'UPDATE "{self.table}" SET "{column}" = json_extract(data, ?)', (f'$.{column}',))
+                conn.execute(
+                    f'CREATE INDEX IF NOT EXISTS "{self.table}_{column}" ON "{self.table}" ("{column}")'
+                )
+
+    def _row(self, item: Dict[str, Any]) -> tuple:
+        if item.get('id') is None:
+            raise ValueError(f"Запись без id: {item}")
+        return (
+            item['id'],
+            _encode(item),
+            1 if item.get('is_deleted', False) else 0,
+            *(_column_value(item.get(column)) for column in self.columns),
+        )
+
+    def insert_many(self, items: Sequence[Dict[str, Any]]) -> int:
+        """Записать пачку записей одним запросом (миграция, начальная загрузка), без обновления снимка"""
+        with self.db:
+            self.db.writer.executemany(self._upsert_sql, (self._row(item) for item in items))
+            self._bump_version()
+        self._cached = None
+        return len(items)
+
+    # ---------- снимок и производные структуры ----------
+
+    def _version(self) -> int:
+        row = self.db.reader().execute('SELECT version FROM _versions WHERE name = ?', (self.table,)).fetchone()
+        return row[0] if row else 0
+
+    def _bump_version(self) -> int:
+        return self.db.writer.execute(
+            'UPDATE _versions SET version = version + 1 WHERE name = ? RETURNING version', (self.table,)
+        ).fetchone()[0]
+
+    def _snapshot(self) -> Snapshot:
+        version = self._version()
+        cached = self._cached
+        if cached is not None and cached.version == version:
+            return cached
+        with self._snapshot_lock:
+            cached = self._cached
+            if cached is not None and cached.version == version:
+                return cached
+            # Версию и строки читаем одним снимком БД (транзакция чтения)
+            conn = self.db.reader()
+            in_transaction = conn.in_transaction
+            with metrics.timer("snapshot_load_seconds", "load", table=self.table):
+                if not in_transaction:
+                    conn.execute('BEGIN')
+                try:
+                    version = self._version()
+                    rows = conn.execute(f'SELECT data FROM "{self.table}" ORDER BY rowid').fetchall()
+                finally:
+                    if not in_transaction:
+                        conn.execute('COMMIT')
+                data = [self._record(json_codec.loads(row[0])) for row in rows]
+            snapshot = Snapshot(self.file_path, version, None, data)
+            if not self.db.held():
+                self._cached = snapshot
+            return snapshot
+
+    def is_fresh(self) -> bool:
+        """Актуален ли снимок таблицы в памяти (get_all и derived не пойдут в базу)"""
+        cached = self._cached
+        return cached is not None and cached.version == self._version()
+
+    def data_tag(self) -> str:
+        """Версия данных для ETag: версия таблицы (общая для всех процессов)"""
+        return f"{self.table}:{self._version()}"
+
+    def _read_data(self) -> Sequence[Dict[str, Any]]:
+        try:
+            return self._snapshot().data
+        except Exception as e:
+            logger.error(f"Error reading table {self.table}: {e}")
+            return ()
+
+    def _indexes(self, snapshot: Optional[Snapshot] = None):
+        raise NotImplementedError("SqliteRepository ищет записи запросами по индексам таблицы")
+
+    def derived(self, key: Hashable, builder: Callable[[Sequence[Dict[str, Any]]], Any]) -> Any:
+        self._incremental.setdefault(key, builder)
+        return self._snapshot().derive(key, builder)
+
+    # ---------- поиск по индексам ----------
+
+    def _query(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        return [self._record(json_codec.loads(row[0])) for row in self.db.reader().execute(sql, params)]
+
+    def _find_unique(self, field: str, value: Any) -> Optional[Dict[str, Any]]:
+        # Как в IndexSet: при дублях - последняя неудалённая запись
+        try:
+            rows = self._query(
+                f'SELECT data FROM "{self.table}" WHERE "{field}" IS ? ORDER BY is_deleted, rowid DESC LIMIT 1',
+                (_column_value(value),),
+            )
+        except Exception as e:
+            logger.error(f"Error reading table {self.table}: {e}")
+            return None
+        return rows[0] if rows else None
+
+    def _find_many(self, field: str, value: Any) -> List[Dict[str, Any]]:
+        try:
+            return self._query(
+                f'SELECT data FROM "{self.table}" WHERE "{field}" IS ? ORDER BY rowid',
+                (_column_value(value),),
+            )
+        except Exception as e:
+            logger.error(f"Error reading table {self.table}: {e}")
+            return []
+
+    def get_by_id(self, item_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            rows = self._query(f'SELECT data FROM "{self.table}" WHERE id = ?', (item_id,))
+        except Exception as e:
+            logger.error(f"Error reading table {self.table}: {e}")
+            return None
+        return rows[0] if rows else None
+
+    def get_not_deleted(self) -> List[Dict[str, Any]]:
+        if self.is_fresh():
+            return [item for item in self._read_data() if not item.get('is_deleted', False)]
+        return self._query(f'SELECT data FROM "{self.table}" WHERE is_deleted = 0 ORDER BY rowid')
+
+    # ---------- запись ----------
+
+    def _write_lock(self) -> SqliteDatabase:
+        # Транзакция записи: чтения внутри неё видят её же изменения
+        return self.db
+
+    def _apply_many(self, items: List[Dict[str, Any]], changes: Optional[List[Dict[str, Any]]] = None):
+        """
+        Записать пачку записей (вставка или замена по id) и обновить снимок и
+        производные структуры. changes (записи журнала JSON-хранилища) не нужны:
+        запись идёт внутри транзакции, в которой прочитаны исходные значения.
+        """
+        items = [self._record(item) for item in items]
+        try:
+            with self.db:
+                cached = self._cached
+                current = cached is not None and cached.version == self._version()
+                pairs = [(self.get_by_id(item.get('id')), item) for item in items]
+                self.db.writer.executemany(self._upsert_sql, [self._row(item) for item in items])
+                version = self._bump_version()
+                if current:
+                    self._publish(cached, version, pairs)
+                    self.db.on_rollback(self._invalidate)
+                else:
+                    self._cached = None
+        except Exception as e:
+            logger.error(f"Error writing to table {self.table}: {e}")
+            self._cached = None
+            raise
+
+    def _publish(self, cached: Snapshot, version: int, pairs: List[Tuple[Optional[Dict[str, Any]], Dict[str, Any]]]):
+        """Новый снимок после своей записи: строки заменяются, производные структуры обновляются на месте"""
+        data = list(cached.data)
+        positions = {}
+        for old, item in pairs:
+            if old is None:
+                data.append(item)
+            else:
+                positions[old.get('id')] = item
+        if positions:
+            for i, row in enumerate(data):
+                item = positions.get(row.get('id'))
+                if item is not None:
+                    data[i] = item
+        snapshot = Snapshot(self.file_path, version, None, data)
+        for key in list(self._incremental):
+            structure = cached.peek(key)
+            if structure is None:
+                continue
+            for old, item in pairs:
+                structure.replace(old, item)
+            snapshot._derived[key] = structure
+        self._cached = snapshot
+
+    def _invalidate(self):
+        self._cached = None
+
+
+_variants: Dict[type, type] = {}
+_variants_guard = threading.Lock()
+
+
+def sqlite_variant(cls: Type[BaseJsonRepository]) -> Type[BaseJsonRepository]:
+    """
+    Тот же репозиторий поверх SQLite: class SqliteVideoRepository(VideoRepository, SqliteRepository).
+
+    Методы подкласса остаются его собственными, а чтение и запись, которыми они
+    пользуются (_find_many, get_by_id, _apply_many...), приходят из SqliteRepository.
+    """
+    if issubclass(cls, SqliteRepository):
+        return cls
+    with _variants_guard:
+        variant = _variants.get(cls)
+        if variant is None:
+            variant = _variants[cls] = type(f"Sqlite{cls.__name__}", (cls, SqliteRepository), {})
+        return variant
@@ -0,0 +1,497 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from ..services import json_codec
+from ..services.snapshot_cache import file_stamp
+from .locking import FileLock
+from .records import Record
+
+logger = logging.getLogger(__name__)
+
+
+def encode_json(data: Any) -> bytes:
+    # Компактно, без отступов: файл данных читает программа, а не человек
+    return json_codec.dumps(data)
+
+
+def atomic_write(path: Path, raw: bytes):
+    """Записать файл атомарно: временный файл рядом + fsync + rename"""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name + '.', suffix='.tmp')
+    try:
+        os.fchmod(fd, 0o644)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(raw)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class JsonFileStorage:
+    """
+    Все записи в одном JSON-файле: любое изменение атомарно переписывает файл целиком.
+
+    record - класс записей (records.py): загруженные dict сразу превращаются в
+    записи со слотами, без него остаются dict.
+    """
+
+    # Дополнительные файлы, изменение которых означает новую версию данных
+    watch: Tuple[Path, ...] = ()
+
+    def __init__(self, file_path: Path, record: Optional[Type[Record]] = None):
+        self.file_path = Path(file_path)
+        self.record = record
+        # Запись (и компактизация) - под блокировкой, общей для всех процессов
+        self.lock = FileLock(self.file_path.with_name(self.file_path.name + '.lock'))
+
+    def _record(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        return self.record.from_dict(item) if self.record is not None else item
+
+    def _records(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if self.record is None:
+            return items
+        from_dict = self.record.from_dict
+        return [from_dict(item) for item in items]
+
+    def load(self, path: Optional[Path] = None) -> List[Dict[str, Any]]:
+        with open(self.file_path, 'rb') as f:
+            return self._records(json_codec.loads(f.read()))
+
+    def write(self, data: List[Dict[str, Any]], changes: List[Dict[str, Any]]) -> bool:
+        """
+        Сохранить изменения. data - полное новое состояние, changes - записи журнала.
+
+        Возвращает True, если data совпадает с тем, что теперь лежит на диске
+        (иначе вызывающий должен перечитать данные).
+        """
+        with self.lock:
+            atomic_write(self.file_path, encode_json(data))
+            return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class WalStorage(JsonFileStorage):
+    """
+    JSON-снимок плюс журнал изменений (JSON Lines) в <файл>.wal.
+
+    Изменение - это дозапись одной строки в журнал: "put" (запись целиком) или
+    "incr" (приращения числовых полей записи). fsync выполняется пачками:
+    каждые fsync_batch записей или не позже чем через fsync_interval секунд.
+    При загрузке журнал проигрывается поверх снимка, а когда в нём накапливается
+    compact_every записей, снимок атомарно переписывается и журнал начинается заново.
+
+    Первая строка журнала - sha1 снимка, поверх которого он пишется. Если снимок
+    уже заменён, а журнал ещё нет (сбой посреди компактизации), журнал игнорируется.
+    """
+
+    def __init__(
+        self,
+        file_path: Path,
+        fsync_batch: int = 64,
+        fsync_interval: float = 0.05,
+        compact_every: int = 1000,
+        record: Optional[Type[Record]] = None,
+    ):
+        super().__init__(file_path, record)
+        self.log_path = self.file_path.with_name(self.file_path.name + '.wal')
+        self.watch = (self.log_path,)
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+
+        self._fd: Optional[int] = None
+        self._data: Optional[List[Dict[str, Any]]] = None
+        self._snapshot_stamp = None
+        self._snapshot_sha: Optional[str] = None
+        self._log_ino: Optional[int] = None
+        self._offset = 0
+        self._log_records = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._sync_timer: Optional[threading.Timer] = None
+
+    # ---------- чтение ----------
+
+    def load(self, path: Optional[Path] = None) -> List[Dict[str, Any]]:
+        with self.lock:
+            snapshot_stamp = file_stamp(self.file_path)
+            try:
+                log_stat = os.stat(self.log_path)
+            except FileNotFoundError:
+                log_stat = None
+
+            if (
+                self._data is not None
+                and snapshot_stamp == self._snapshot_stamp
+                and log_stat is not None
+                and log_stat.st_ino == self._log_ino
+                and log_stat.st_size >= self._offset
+            ):
+                # Снимок тот же, журнал только дописан - проигрываем лишь хвост
+                data = list(self._data)
+                self._replay(data, self._offset)
+            else:
+                with open(self.file_path, 'rb') as f:
+                    raw = f.read()
+                data = self._records(json_codec.loads(raw))
+                self._snapshot_stamp = snapshot_stamp
+                self._snapshot_sha = hashlib.sha1(raw).hexdigest()
+                self._close_log()
+                self._log_ino = None
+                self._offset = 0
+                self._log_records = 0
+                if log_stat is not None and log_stat.st_size > 0:
+                    self._log_ino = log_stat.st_ino
+                    if not self._replay(data, 0):
+                        logger.warning(f"Stale log {self.log_path} ignored")
+                        self._reset_log()
+
+            self._data = data
+            return data
+
+    def _replay(self, data: List[Dict[str, Any]], start: int) -> bool:
+        """Применить записи журнала начиная со смещения start. False - журнал от другого снимка"""
+        with open(self.log_path, 'rb') as f:
+            f.seek(start)
+            buf = f.read()
+
+        positions = None
+        pos = 0
+        while True:
+            end = buf.find(b'\n', pos)
+            if end < 0:
+                break  # незавершённая строка: её ещё дописывают (или запись оборвалась)
+            line = buf[pos:end].strip()
+            line_start = start + pos
+            pos = end + 1
+            if not line:
+                continue
+            try:
+                record = json_codec.loads(line)
+            except ValueError:
+                logger.warning(f"Corrupted record at {self.log_path}:{line_start} skipped")
+                continue
+
+            op = record.get('op')
+            if op == 'base':
+                if record.get('sha1') != self._snapshot_sha:
+                    return False
+            elif line_start == 0:
+                return False
+            elif op == 'put':
+                item = self._record(record['item'])
+                if positions is None:
+                    positions = {row.get('id'): i for i, row in enumerate(data)}
+                i = positions.get(item.get('id'))
+                if i is None:
+                    positions[item.get('id')] = len(data)
+                    data.append(item)
+                else:
+                    data[i] = item
+                self._log_records += 1
+            elif op == 'incr':
+                # Аддитивные приращения счётчиков: порядок записей от разных процессов не важен
+                if positions is None:
+                    positions = {row.get('id'): i for i, row in enumerate(data)}
+                i = positions.get(record['id'])
+                if i is not None:
+                    row = data[i]
+                    data[i] = self._record({
+                        **row,
+                        **{field: row.get(field, 0) + delta for field, delta in record['deltas'].items()},
+                    })
+                self._log_records += 1
+
+        self._offset = start + pos
+        return True
+
+    # ---------- запись ----------
+
+    def write(self, data: List[Dict[str, Any]], changes: List[Dict[str, Any]]) -> bool:
+        with self.lock:
+            fd = self._open_log()
+            size_before = os.fstat(fd).st_size
+            in_sync = size_before == self._offset
+
+            payload = b''.join(
+                json_codec.dumps(change) + b'\n'
+                for change in changes
+            )
+            if not in_sync:
+                # Хвост журнала нам неизвестен (мог остаться оборванной строкой) - начинаем с новой строки
+                payload = b'\n' + payload
+            os.write(fd, payload)
+            end = os.lseek(fd, 0, os.SEEK_CUR)
+            in_sync = in_sync and end == size_before + len(payload)
+
+            self._after_append(len(changes))
+            if not in_sync:
+                return False
+
+            self._offset = end
+            self._data = data
+            self._log_records += len(changes)
+            if self._log_records >= self.compact_every:
+                self.compact()
+            return True
+
+    def _open_log(self) -> int:
+        if self._fd is not None:
+            try:
+                if os.stat(self.log_path).st_ino == self._log_ino:
+                    return self._fd
+            except FileNotFoundError:
+                pass
+            self._close_log()
+
+        try:
+            self._fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND)
+        except FileNotFoundError:
+            self._reset_log()
+            return self._fd
+        st = os.fstat(self._fd)
+        if st.st_size == 0:
+            # Пустой журнал без заголовка (например, сбой сразу после создания)
+            self._reset_log()
+            return self._fd
+        self._log_ino = st.st_ino
+        return self._fd
+
+    def _reset_log(self):
+        """Атомарно начать новый журнал поверх текущего снимка"""
+        header = json_codec.dumps({'op': 'base', 'sha1': self._snapshot_sha}) + b'\n'
+        atomic_write(self.log_path, header)
+        self._close_log()
+        self._fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND)
+        self._log_ino = os.fstat(self._fd).st_ino
+        self._offset = len(header)
+        self._log_records = 0
+
+    def compact(self):
+        """Переписать снимок с учётом журнала и начать журнал заново"""
+        with self.lock:
+            if self._data is None:
+                return
+            self.load()  # догоняем журнал, если в него писал кто-то ещё
+            raw = encode_json(self._data)
+            atomic_write(self.file_path, raw)
+            self._snapshot_sha = hashlib.sha1(raw).hexdigest()
+            self._snapshot_stamp = file_stamp(self.file_path)
+            self._reset_log()
+            self._unsynced = 0
+
+    # ---------- fsync пачками ----------
+
+    def _after_append(self, records: int):
+        self._unsynced += records
+        if self._unsynced >= self.fsync_batch or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.flush()
+        elif self._sync_timer is None:
+            self._sync_timer = threading.Timer(self.fsync_interval, self.flush)
+            self._sync_timer.daemon = True
+            self._sync_timer.start()
+
+    def flush(self):
+        with self.lock:
+            if self._sync_timer is not None:
+                self._sync_timer.cancel()
+                self._sync_timer = None
+            if self._fd is not None and self._unsynced:
+                os.fsync(self._fd)
+            self._unsynced = 0
+            self._last_sync = time.monotonic()
+
+    def _close_log(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def close(self):
+        with self.lock:
+            if self._log_records:
+                self.compact()
+            self.flush()
+            self._close_log()
+
+
+class SqliteDatabase:
+    """
+    Файл SQLite, общий для репозиториев процесса (таблица на репозиторий).
+
+    Режим WAL: читатели не ждут писателя и друг друга. Запись идёт через одно
+    соединение под реентерабельной блокировкой в транзакции BEGIN IMMEDIATE
+    (между процессами её сериализует сам SQLite), чтение вне транзакции - через
+    соединение своего потока. Запросы параметризованы, и sqlite3 держит их
+    подготовленными в кэше соединения.
+    """
+
+    def __init__(self, path: Path, busy_timeout: float = 30.0, cache_size_kib: int = 65536):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.busy_timeout = busy_timeout
+        self.cache_size_kib = cache_size_kib
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._owner: Optional[int] = None
+        self._on_rollback: List[Callable[[], None]] = []
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self.writer = self._connect()
+        self.writer.execute('PRAGMA journal_mode=WAL')
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None: транзакции открываются явно (BEGIN IMMEDIATE)
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=256,
+        )
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA cache_size=-{int(self.cache_size_kib)}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
+
+    def held(self) -> bool:
+        """Открыта ли транзакция записи в текущем потоке"""
+        return self._owner == threading.get_ident()
+
+    def reader(self) -> sqlite3.Connection:
+        """Соединение для чтения: внутри своей транзакции записи - её соединение (видны свои изменения)"""
+        if self.held():
+            return self.writer
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            with self._lock:
+                self._readers.append(conn)
+        return conn
+
+    def on_rollback(self, callback: Callable[[], None]):
+        """Вызвать callback, если текущая транзакция записи откатится"""
+        self._on_rollback.append(callback)
+
+    def __enter__(self):
+        self._lock.acquire()
+        if self._depth == 0:
+            try:
+                self.writer.execute('BEGIN IMMEDIATE')
+            except BaseException:
+                self._lock.release()
+                raise
+            self._owner = threading.get_ident()
+        self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._depth -= 1
+        try:
+            if self._depth == 0:
+                self._owner = None
+                callbacks, self._on_rollback = self._on_rollback, []
+                if exc_type is None:
+                    try:
+                        self.writer.execute('COMMIT')
+                    except BaseException:
+                        self.writer.execute('ROLLBACK')
+                        for callback in callbacks:
+                            callback()
+                        raise
+                else:
+                    self.writer.execute('ROLLBACK')
+                    for callback in callbacks:
+                        callback()
+        finally:
+            self._lock.release()
+
+    def close(self):
+        with self._lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+            self.writer.execute('PRAGMA optimize')
+            self.writer.close()
+
+
+_storages: Dict[Path, JsonFileStorage] = {}
+_storages_guard = threading.Lock()
+
+
+def get_storage(file_path: Path, record: Optional[Type[Record]] = None) -> JsonFileStorage:
+    """
+    Хранилище для файла данных (одно на файл в процессе); record - класс записей файла.
+
+    Движок выбирается переменной окружения STORAGE_ENGINE: "wal" (по умолчанию) или "json"
+    (при "sqlite" репозитории хранят данные в SQLite и файлов JSON не используют).
+    """
+    file_path = Path(file_path)
+    with _storages_guard:
+        storage = _storages.get(file_path)
+        if storage is None:
+            engine = os.getenv('STORAGE_ENGINE', 'wal')
+            if engine == 'json':
+                storage = JsonFileStorage(file_path, record)
+            elif engine == 'wal':
+                storage = WalStorage(
+                    file_path,
+                    fsync_batch=int(os.getenv('WAL_FSYNC_BATCH', '64')),
+                    fsync_interval=float(os.getenv('WAL_FSYNC_INTERVAL', '0.05')),
+                    compact_every=int(os.getenv('WAL_COMPACT_EVERY', '1000')),
+                    record=record,
+                )
+            else:
+                raise ValueError(f"Unknown STORAGE_ENGINE: {engine}")
+            _storages[file_path] = storage
+        return storage
+
+
+_databases: Dict[Path, SqliteDatabase] = {}
+
+
+def sqlite_path(data_dir: Path) -> Path:
+    """Файл базы SQLite: SQLITE_PATH или <папка данных>/mypipe.db"""
+    return Path(os.getenv('SQLITE_PATH') or Path(data_dir) / 'mypipe.db')
+
+
+def get_database(path: Path) -> SqliteDatabase:
+    """База SQLite (одна на файл в процессе)"""
+    path = Path(path)
+    with _storages_guard:
+        database = _databases.get(path)
+        if database is None:
+            database = _databases[path] = SqliteDatabase(path)
+        return database
+
+
+def close_storages():
+    """Сбросить журналы на диск (и компактизировать их) при остановке приложения"""
+    with _storages_guard:
+        for storage in _storages.values():
+            try:
+                storage.close()
+            except Exception as e:
+                logger.error(f"Error closing storage {storage.file_path}: {e}")
+        for database in _databases.values():
+            try:
+                database.close()
+            except Exception as e:
+                logger.error(f"Error closing database {database.path}: {e}")
+        _databases.clear()
@@ -1,30 +1,32 @@
 from typing import Optional, Dict, Any, List
-from base_repository import BaseJsonRepository
+from .base_repository import BaseJsonRepository
+from .records import UserRecord
 
 
 class UserRepository(BaseJsonRepository):
+    unique_indexes = ('id', 'email', 'user_link')
+    multi_indexes = ('name',)
+    record_type = UserRecord
+
     def __init__(self, data_dir: str):
         super().__init__(data_dir, "users.json")
     
     def get_by_email(self, email: str) -> Optional[Dict[str, Any]]:
-        data = self._read_data()
-        for user in data:
-            if user.get('email') == email and not user.get('is_deleted', False):
-                return user
+        user = self._find_unique('email', email)
+        if user is not None and not user.get('is_deleted', False):
+            return user
         return None
     
     def get_by_username(self, username: str) -> Optional[Dict[str, Any]]:
-        data = self._read_data()
-        for user in data:
-            if user.get('name') == username and not user.get('is_deleted', False):
+        for user in self._find_many('name', username):
+            if not user.get('is_deleted', False):
                 return user
         return None
     
     def get_by_user_link(self, user_link: str) -> Optional[Dict[str, Any]]:
-        data = self._read_data()
-        for user in data:
-            if user.get('user_link') == user_link and not user.get('is_deleted', False):
-                return user
+        user = self._find_unique('user_link', user_link)
+        if user is not None and not user.get('is_deleted', False):
+            return user
         return None
     
     def email_exists(self, email: str) -> bool:
@@ -1,17 +1,21 @@
 from typing import Optional, Dict, Any, List
-from base_repository import BaseJsonRepository
+from .base_repository import BaseJsonRepository
+from .records import VideoRecord
+from ..services.video_columns import VideoColumns, get_video_columns
 
 
 class VideoRepository(BaseJsonRepository):
-    
+    multi_indexes = ('user_id', 'category_id')
+    counter_fields = ('views', 'likes', 'dislikes')
+    record_type = VideoRecord
+
     def __init__(self, data_dir: str):
         super().__init__(data_dir, "videos.json")
     
     def get_by_user_id(self, user_id: str) -> List[Dict[str, Any]]:
-        data = self._read_data()
         return [
-            video for video in data
-            if video.get('user_id') == user_id and not video.get('is_deleted', False)
+            video for video in self._find_many('user_id', user_id)
+            if not video.get('is_deleted', False)
         ]
     
     def get_public_videos(self) -> List[Dict[str, Any]]:
@@ -22,10 +26,9 @@ class VideoRepository(BaseJsonRepository):
         ]
     
     def get_by_category(self, category_id: str) -> List[Dict[str, Any]]:
-        data = self._read_data()
         return [
-            video for video in data
-            if video.get('category_id') == category_id and not video.get('is_deleted', False)
+            video for video in self._find_many('category_id', category_id)
+            if not video.get('is_deleted', False)
         ]
     
     def search_by_name(self, query: str) -> List[Dict[str, Any]]:
@@ -44,40 +47,58 @@ class VideoRepository(BaseJsonRepository):
             if query_lower in video.get('description', '').lower() and not video.get('is_deleted', False)
         ]
     
+    def video_columns(self) -> Optional[VideoColumns]:
+        """Столбцы текущего снимка для ранжирования (None - NumPy не установлен)"""
+        return get_video_columns(self)
+
     def get_trending(self, limit: int = 10) -> List[Dict[str, Any]]:
+        columns = self.video_columns()
+        if columns is not None:
+            return columns.top(limit, 'views', base=columns.public_videos())
         data = self.get_public_videos()
         return sorted(data, key=lambda x: x.get('views', 0), reverse=True)[:limit]
     
     def get_popular_by_likes(self, limit: int = 10) -> List[Dict[str, Any]]:
+        columns = self.video_columns()
+        if columns is not None:
+            return columns.top(limit, 'likes', base=columns.public_videos())
         data = self.get_public_videos()
         return sorted(data, key=lambda x: x.get('likes', 0), reverse=True)[:limit]
     
+    def apply_counter_deltas(self, deltas: Dict[str, Dict[str, int]]) -> int:
+        """
+        Прибавить пачку приращений счётчиков: {video_id: {"views": 3, "likes": 1}}.
+
+        В журнал пишутся записи "incr", поэтому пачки от разных процессов
+        складываются, а не перетирают друг друга. Возвращает число обновлённых видео.
+        """
+        with self._write_lock():
+            items = []
+            changes = []
+            for video_id, fields in deltas.items():
+                video = self.get_by_id(video_id)
+                if video is None:
+                    continue
+                items.append({**video, **{f: video.get(f, 0) + d for f, d in fields.items()}})
+                changes.append({'op': 'incr', 'id': video_id, 'deltas': fields})
+            if items:
+                self._apply_many(items, changes)
+            return len(items)
+
+    def _increment(self, video_id: str, field: str) -> Optional[Dict[str, Any]]:
+        with self._write_lock():
+            if not self.apply_counter_deltas({video_id: {field: 1}}):
+                return None
+            return self.get_by_id(video_id)
+
     def increment_views(self, video_id: str) -> Optional[Dict[str, Any]]:
-        data = self._read_data()
-        for video in data:
-            if video.get('id') == video_id:
-                video['views'] = video.get('views', 0) + 1
-                self._write_data(data)
-                return video
-        return None
+        return self._increment(video_id, 'views')
     
     def increment_likes(self, video_id: str) -> Optional[Dict[str, Any]]:
-        data = self._read_data()
-        for video in data:
-            if video.get('id') == video_id:
-                video['likes'] = video.get('likes', 0) + 1
-                self._write_data(data)
-                return video
-        return None
+        return self._increment(video_id, 'likes')
     
     def increment_dislikes(self, video_id: str) -> Optional[Dict[str, Any]]:
-        data = self._read_data()
-        for video in data:
-            if video.get('id') == video_id:
-                video['dislikes'] = video.get('dislikes', 0) + 1
-                self._write_data(data)
-                return video
-        return None
+        return self._increment(video_id, 'dislikes')
     
     def get_similar_videos(self, video_id: str, limit: int = 5) -> List[Dict[str, Any]]:
         video = self.get_by_id(video_id)
@@ -88,6 +109,10 @@ class VideoRepository(BaseJsonRepository):
         if not isinstance(category_id, str):
             return []
 
+        columns = self.video_columns()
+        if columns is not None:
+            return columns.top(limit, "views", category_id=category_id, exclude=video_id, base=columns.not_deleted())
+
         similar = self.get_by_category(category_id)
         # исключаем текущее видео
         similar = [v for v in similar if v.get("id") != video_id]
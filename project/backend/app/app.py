@@ -1,17 +1,45 @@
-import json
+import os
 from pathlib import Path
 
 import uuid
 from datetime import datetime, UTC, timezone
+from email.utils import format_datetime
 
 date = datetime.now(UTC).isoformat()
 
-from app.services.recommendations import get_trending_videos, get_all_categories_with_top_videos
-
-from fastapi import FastAPI, HTTPException
+from app.services.recommendations import (
+    get_trending_videos,
+    get_all_categories_with_top_videos,
+    get_category_recommendations,
+    get_leaderboard,
+)
+from app.services.comment_tree import build_comment_tree
+from app.services.personal_feed import PersonalFeedCache, build_personal_feed, get_user_history
+from app.services.related import TEXT_NEIGHBOURS, get_related_videos, text_neighbours_ready
+from app.services.search import get_search_index
+from app.services.video_columns import get_video_columns
+from app.services.video_listing import SORT_RANKS, decode_cursor, encode_cursor, get_listing, project
+
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 #from app.services.minio_storage import MinIOStorage
-from .services.minio_storage import MinIOStorage
+from .services.minio_storage import MinIOStorage, AsyncMinIOStorage, StorageUnavailableError
+from .services.snapshot_cache import snapshot_cache
+from .CRUD.video_repository import VideoRepository
+from .CRUD.comment_repository import CommentRepository
+from .CRUD.category_repository import CategoryRepository
+from .CRUD.async_repository import AsyncRepository
+from .CRUD.storage import close_storages
+from .services.counters import CounterAggregator
+from .services.executor import BlockingExecutor, io_executor
+from .services.object_cache import CachedObjectStorage
+from .services.video_stream import ObjectStreamer, RangeNotSatisfiable, etag_matches, parse_range
+from .services.uploads import ChecksumMismatchError, StreamingUploader, UploadTooLargeError
+from .services.json_codec import BACKEND as JSON_BACKEND, dumps
+from .services.responses import FastJSONResponse, Payload, get_payload_cache
+from .services.http_cache import CACHE_CONTROL, data_tag, make_etag, not_modified, payload_response, response_encoding
+from .services.metrics import MetricsMiddleware, metrics
 
 from pydantic import BaseModel
 from typing import Optional
@@ -23,7 +51,8 @@ class CommentCreate(BaseModel):
 
 
 
-app = FastAPI()
+# Ответы сериализуются через json_codec (orjson, если установлен)
+app = FastAPI(default_response_class=FastJSONResponse)
 
 origins = [
     "http://localhost",
@@ -38,69 +67,430 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Гистограммы задержек по маршрутам для /metrics (METRICS_ENABLED=false - выключить),
+# METRICS_SERVER_TIMING=true - ещё и заголовок Server-Timing с замерами каждого запроса
+app.add_middleware(
+    MetricsMiddleware,
+    metrics=metrics,
+    server_timing=os.getenv("METRICS_SERVER_TIMING", "false").lower() == "true",
+)
 
 # ---------------- PATHS ----------------
 
 BASE_DIR = Path(__file__).resolve().parent.parent  # backend/
-DATA_DIR = BASE_DIR / "data"
+DATA_DIR = Path(os.getenv("DATA_DIR", str(BASE_DIR / "data")))
 
 VIDEOS_FILE = DATA_DIR / "videos.json"
 COMMENTS_FILE = DATA_DIR / "comments.json"
 
+video_repo = VideoRepository(str(DATA_DIR))
+comment_repo = CommentRepository(str(DATA_DIR))
+category_repo = CategoryRepository(str(DATA_DIR))
+
+# Для async-обработчиков: блокирующие операции уходят в ограниченный пул (IO_POOL_SIZE)
+async_videos = AsyncRepository(video_repo)
+async_comments = AsyncRepository(comment_repo)
+async_categories = AsyncRepository(category_repo)
+
+# Просмотры/лайки/дизлайки копятся в памяти и пачками сбрасываются в videos.json
+video_counters = CounterAggregator(
+    video_repo.apply_counter_deltas,
+    flush_interval=float(os.getenv("COUNTERS_FLUSH_INTERVAL", "1.0")),
+    max_pending=int(os.getenv("COUNTERS_MAX_PENDING", "1000")),
+)
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# Похожих видео - не больше, чем соседей по тексту хранится на видео
+MAX_RELATED = TEXT_NEIGHBOURS
+
 # ---------------- MINIO ----------------
 
-minio_client = MinIOStorage()
+minio_client = MinIOStorage(
+    endpoint=os.getenv("MINIO_ENDPOINT", "minio:9000"),
+    access_key=os.getenv("MINIO_ACCESS_KEY", "minioadmin"),
+    secret_key=os.getenv("MINIO_SECRET_KEY", "minioadmin"),
+    # Адрес MinIO, по которому к нему ходит браузер; на него выписываются ссылки
+    public_endpoint=os.getenv("MINIO_PUBLIC_ENDPOINT", "localhost:9000"),
+    public_secure=os.getenv("MINIO_PUBLIC_SECURE", "false").lower() == "true",
+    url_cache_size=int(os.getenv("PRESIGNED_URL_CACHE_SIZE", "10000")),
+    url_safety_margin=float(os.getenv("PRESIGNED_URL_SAFETY_MARGIN", "300")),
+    pool_size=int(os.getenv("MINIO_POOL_SIZE", "32")),
+    connect_timeout=float(os.getenv("MINIO_CONNECT_TIMEOUT", "3")),
+    read_timeout=float(os.getenv("MINIO_READ_TIMEOUT", "30")),
+    retries=int(os.getenv("MINIO_RETRIES", "3")),
+    breaker_threshold=int(os.getenv("MINIO_BREAKER_THRESHOLD", "5")),
+    breaker_reset_timeout=float(os.getenv("MINIO_BREAKER_RESET_TIMEOUT", "10")),
+)
+# Обращения к MinIO - в своём пуле: медленный или недоступный MinIO не должен
+# занимать потоки io_executor, на которых работают остальные запросы
+storage_executor = BlockingExecutor(int(os.getenv("STORAGE_POOL_SIZE", "16")), "storage")
+async_minio = AsyncMinIOStorage(minio_client, storage_executor)
+
+# Загрузки видео идут в свой пул, чтобы большие файлы не занимали потоки остальных запросов
+upload_executor = BlockingExecutor(int(os.getenv("UPLOAD_POOL_SIZE", "8")), "upload")
+video_uploader = StreamingUploader(
+    minio_client,
+    upload_executor,
+    part_size=int(os.getenv("UPLOAD_PART_SIZE", str(8 * 1024 * 1024))),
+    parallel=int(os.getenv("UPLOAD_PARALLEL_PARTS", "4")),
+    retries=int(os.getenv("UPLOAD_PART_RETRIES", "3")),
+)
+# Раздача видео через бэкенд (/api/video/{id}/stream) вместо подписанной ссылки на MinIO
+VIDEO_STREAM_PROXY = os.getenv("VIDEO_STREAM_PROXY", "false").lower() == "true"
+# Дисковый кэш популярных небольших объектов MinIO (OBJECT_CACHE_MAX_BYTES=0 - выключен)
+OBJECT_CACHE_MAX_BYTES = int(os.getenv("OBJECT_CACHE_MAX_BYTES", str(1024 ** 3)))
+object_cache = CachedObjectStorage(
+    minio_client,
+    os.getenv("OBJECT_CACHE_DIR", str(BASE_DIR / "cache")),
+    max_bytes=OBJECT_CACHE_MAX_BYTES,
+    max_object_size=int(os.getenv("OBJECT_CACHE_MAX_OBJECT_SIZE", str(64 * 1024 ** 2))),
+    revalidate_after=float(os.getenv("OBJECT_CACHE_REVALIDATE_AFTER", "300")),
+) if OBJECT_CACHE_MAX_BYTES > 0 else None
+
+video_streamer = ObjectStreamer(
+    minio_client,
+    storage_executor,
+    chunk_size=int(os.getenv("STREAM_CHUNK_SIZE", str(256 * 1024))),
+    cache=object_cache,
+)
+
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", str(20 * 1024 ** 3)))
+
+# Готовые персональные ленты: сбрасываются новым действием пользователя или через FEED_CACHE_TTL секунд
+personal_feeds = PersonalFeedCache(
+    max_entries=int(os.getenv("FEED_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("FEED_CACHE_TTL", "30")),
+)
+
+# Счётчики кэшей и пулов - в /metrics рядом с гистограммами (опрашиваются при выдаче)
+metrics.collect("snapshot_cache", snapshot_cache.stats)
+metrics.collect("payload_cache_videos", lambda: get_payload_cache(video_repo).stats())
+metrics.collect("payload_cache_categories", lambda: get_payload_cache(category_repo).stats())
+metrics.collect("presigned_cache", minio_client.url_cache.stats)
+metrics.collect("minio", minio_client.stats)
+metrics.collect("counters", video_counters.stats)
+metrics.collect("personal_feed", personal_feeds.stats)
+metrics.collect("uploads", video_uploader.stats)
+metrics.collect("io_executor", io_executor.stats)
+metrics.collect("storage_executor", storage_executor.stats)
+if object_cache is not None:
+    metrics.collect("object_cache", object_cache.stats)
+
+
+@app.on_event("startup")
+def startup():
+    video_counters.start()
+
+
+@app.on_event("shutdown")
+def shutdown():
+    # Сбросить накопленные счётчики, дописать журналы изменений и свернуть их в JSON-файлы
+    video_counters.stop()
+    close_storages()
+    io_executor.shutdown()
+    storage_executor.shutdown()
+    upload_executor.shutdown()
+
+
+def _storage_unavailable(e: StorageUnavailableError) -> HTTPException:
+    # 503 с Retry-After вместо долгого ожидания таймаутов, пока MinIO недоступен
+    return HTTPException(
+        503,
+        "Хранилище видео временно недоступно",
+        headers={"Retry-After": str(max(int(e.retry_after + 0.999), 1))},
+    )
+
+
+async def _from_snapshot(build, repo, *args):
+    # Топы и индексы живут в памяти; с диска (в пуле потоков) - только если снимок устарел
+    if repo.is_fresh():
+        return build(repo, *args)
+    return await io_executor.run(build, repo, *args)
+
+
+async def _cached_json(request: Request, repo, key, build, cache_control: str) -> Response:
+    """
+    Ответ из готовых байтов (кэш снимка repo) с ETag версии данных. При
+    промахе сначала проверяется If-None-Match (304 без сборки ответа), потом
+    данные собирает await build(); сериализация и сжатие - в пуле потоков
+    (ответ может быть большим), сжатый вариант тоже остаётся в кэше.
+    """
+    cache = await _from_snapshot(get_payload_cache, repo)
+    payload = cache.peek(key)
+    if payload is None:
+        generation = cache.generation
+        etag = make_etag(await _from_snapshot(data_tag, repo), key)
+        cached = not_modified(request, etag, cache_control)
+        if cached is not None:
+            return cached
+        data = await build()
+        payload = cache.store(key, Payload(await io_executor.run(dumps, data), etag), generation)
+    encoding = response_encoding(request, payload)
+    if encoding is not None and not payload.has(encoding):
+        await io_executor.run(payload.encoded, encoding)
+    return payload_response(request, payload, cache_control)
+
+
+async def _conditional_json(request: Request, repo, key, build, cache_control: str) -> Response:
+    """
+    Ответ, который не кэшируется целиком (страницы, карточки): ETag из версии
+    данных repo и key, при совпадении If-None-Match - 304 без сборки ответа.
+    """
+    etag = make_etag(await _from_snapshot(data_tag, repo), key)
+    cached = not_modified(request, etag, cache_control)
+    if cached is not None:
+        return cached
+    return payload_response(request, Payload(dumps(await build()), etag), cache_control)
 
 
 # ---------------- ROUTES ----------------
 
 @app.get("/")
-def root():
+async def root():
     return {"message": "Привет мир!"}
 
 
 @app.get("/api/videos")
-def get_videos(include_recommendations: bool = False, top_per_category: int = 3):
+async def get_videos(
+    request: Request,
+    include_recommendations: bool = False,
+    top_per_category: int = Query(3, ge=0, le=MAX_PAGE_SIZE),
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    sort: str = "date",
+    category_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    """
+    Без limit/cursor/фильтров - весь каталог, как раньше. Иначе - страница ленты
+    (публичные видео) в порядке sort: {"items": [...], "next_cursor": "..."}.
+    fields=id,name,views - вернуть только эти поля видео.
+    """
     try:
-        with open(VIDEOS_FILE, "r", encoding="utf-8") as f:
-            videos = json.load(f)
-        
-        # Если фронт запросил рекомендации, добавляем их
-        if include_recommendations:
-            recommendations = get_all_categories_with_top_videos(videos, top_per_category)
-            return {
-                "all_videos": videos,
-                "recommendations": recommendations
-            }
-        
-        return videos
+        field_list = [f for f in fields.split(",") if f] if fields else None
+
+        if limit is not None or cursor is not None or category_id is not None or user_id is not None:
+            if sort not in SORT_RANKS:
+                raise HTTPException(400, f"Сортировка должна быть одной из: {', '.join(SORT_RANKS)}")
+            try:
+                after = decode_cursor(sort, cursor) if cursor else None
+            except ValueError:
+                raise HTTPException(400, "Некорректный курсор")
+
+            limit = min(max(limit or DEFAULT_PAGE_SIZE, 1), MAX_PAGE_SIZE)
+            filters = {}
+            if category_id is not None:
+                filters["category_id"] = category_id
+            if user_id is not None:
+                filters["user_id"] = user_id
+
+            async def page():
+                listing = await _from_snapshot(get_listing, video_repo, sort)
+                items, last_key = listing.page(limit, after, **filters)
+                result = {
+                    "items": project(items, field_list),
+                    "next_cursor": encode_cursor(sort, last_key) if last_key else None,
+                }
+                if include_recommendations:
+                    result["recommendations"] = get_all_categories_with_top_videos(
+                        [], top_per_category, leaderboard=await _from_snapshot(get_leaderboard, video_repo, "views"),
+                    )
+                return result
+
+            key = ("page", sort, cursor, limit, category_id, user_id, fields, include_recommendations, top_per_category)
+            return await _conditional_json(request, video_repo, key, page, CACHE_CONTROL["feed"])
+
+        async def catalog():
+            videos = await async_videos.get_all()
+            if field_list:
+                videos = project(videos, field_list)
+
+            # Если фронт запросил рекомендации, добавляем их
+            if include_recommendations:
+                recommendations = get_all_categories_with_top_videos(
+                    videos, top_per_category, leaderboard=await _from_snapshot(get_leaderboard, video_repo, "views"),
+                )
+                return {
+                    "all_videos": videos,
+                    "recommendations": recommendations
+                }
+            return videos
+
+        # Весь каталог - самый тяжёлый ответ: сериализуется один раз на снимок
+        key = ("videos", tuple(field_list or ()), top_per_category if include_recommendations else None)
+        return await _cached_json(request, video_repo, key, catalog, CACHE_CONTROL["feed"])
     
+    except HTTPException:
+        raise
     except FileNotFoundError:
         raise HTTPException(404, "videos.json не найден")
     except Exception as e:
         raise HTTPException(500, str(e))
 
 
-@app.get("/api/video/{video_id}")
-def get_video(video_id: str):
+@app.post("/api/videos/upload")
+async def upload_video(
+    request: Request,
+    user_id: str,
+    name: str = Query(..., min_length=1, max_length=200),
+    description: Optional[str] = None,
+    category_id: Optional[str] = None,
+    is_public: bool = True,
+):
+    """
+    Загрузка видео: тело запроса - сам файл (не multipart/form-data), метаданные -
+    в параметрах. Файл потоком уходит в MinIO частями, запись о видео создаётся
+    после успешной сборки объекта. Заголовок X-Content-SHA256 (необязательный) -
+    контрольная сумма файла для проверки.
+    """
+    content_type = request.headers.get("content-type", "video/mp4")
+    if not content_type.startswith("video/"):
+        raise HTTPException(415, "Ожидается видеофайл (Content-Type: video/*)")
+
+    video_id = str(uuid.uuid4())
     try:
-        with open(VIDEOS_FILE, "r", encoding="utf-8") as f:
-            videos = json.load(f)
+        result = await video_uploader.upload(
+            request.stream(),
+            bucket_name="video",
+            object_name=f"{video_id}.mp4",
+            content_type=content_type,
+            expected_sha256=request.headers.get("x-content-sha256"),
+            max_size=MAX_UPLOAD_SIZE,
+        )
+    except UploadTooLargeError as e:
+        raise HTTPException(413, str(e))
+    except ChecksumMismatchError as e:
+        raise HTTPException(422, str(e))
+    except StorageUnavailableError as e:
+        raise _storage_unavailable(e)
+    except Exception as e:
+        raise HTTPException(500, f"MinIO error: {repr(e)}")
 
-        for video in videos:
-            if video["id"] == video_id:
-                return video
+    video = {
+        "id": video_id,
+        "user_id": user_id,
+        "name": name,
+        "description": description or "",
+        "date": datetime.now(timezone.utc).isoformat(),
+        "likes": 0,
+        "dislikes": 0,
+        "views": 0,
+        "is_public": is_public,
+        "is_deleted": False,
+        "category_id": category_id,
+    }
+    await async_videos.create(video)
+
+    return {"status": "ok", "video": video, "size": result["size"], "sha256": result["sha256"]}
+
+
+@app.get("/api/videos/trending")
+async def get_trending(request: Request, limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE)):
+    # limit входит в ключ PayloadCache - без границы каждое значение занимало бы свою запись
+    async def trending():
+        return get_trending_videos([], limit, leaderboard=await _from_snapshot(get_leaderboard, video_repo, "popularity"))
+
+    return await _cached_json(request, video_repo, ("trending", limit), trending, CACHE_CONTROL["feed"])
+
+
+@app.get("/api/videos/feed")
+async def get_personal_feed(request: Request, user_id: str, limit: int = DEFAULT_PAGE_SIZE):
+    """
+    Лента пользователя по его комментариям и загрузкам (services/personal_feed.py);
+    без истории - общий топ
+    """
+    limit = min(max(limit, 1), MAX_PAGE_SIZE)
+    inline = video_repo.is_fresh() and comment_repo.is_fresh() and text_neighbours_ready(video_repo)
+    if inline:
+        history = get_user_history(video_repo, comment_repo, user_id)
+    else:
+        history = await io_executor.run(get_user_history, video_repo, comment_repo, user_id)
+
+    key = (user_id, limit)
+    payload = personal_feeds.peek(key, history.stamp)
+    if payload is None:
+        # Лента зависит от видео (топы), комментариев (похожие) и истории пользователя -
+        # пока они те же, ETag тот же в любом процессе и после пересборки
+        etag = make_etag(
+            "feed", user_id, limit, history.stamp,
+            await _from_snapshot(data_tag, video_repo), await _from_snapshot(data_tag, comment_repo),
+        )
+        cached = not_modified(request, etag, CACHE_CONTROL["personal"])
+        if cached is not None:
+            return cached
+        if inline:
+            items = build_personal_feed(video_repo, comment_repo, history, limit)
+        else:
+            items = await io_executor.run(build_personal_feed, video_repo, comment_repo, history, limit)
+        payload = personal_feeds.store(key, history.stamp, Payload(dumps(items), etag))
+    return payload_response(request, payload, CACHE_CONTROL["personal"])
 
-        raise HTTPException(404, "Видео не найдено")
+
+@app.get("/api/categories")
+async def get_categories(request: Request):
+    try:
+        return await _cached_json(
+            request, category_repo, "categories", async_categories.get_all_active, CACHE_CONTROL["categories"],
+        )
+    except FileNotFoundError:
+        raise HTTPException(404, "categories.json не найден")
+
+
+@app.get("/api/search")
+async def search_videos(
+    request: Request,
+    q: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    offset: int = 0,
+    category_id: Optional[str] = None,
+    prefix: bool = True,
+    fields: Optional[str] = None,
+):
+    """Поиск публичных видео по названию и описанию: {"items": [...], "next_offset": ...}"""
+    limit = min(max(limit, 1), MAX_PAGE_SIZE)
+    offset = max(offset, 0)
+    async def results():
+        index = await _from_snapshot(get_search_index, video_repo)
+        items, has_more = index.search(q, limit, offset, prefix=prefix, category_id=category_id)
+        return {
+            "items": project(items, [f for f in fields.split(",") if f] if fields else None),
+            "next_offset": offset + limit if has_more else None,
+        }
+
+    try:
+        key = ("search", q, limit, offset, category_id, prefix, fields)
+        return await _conditional_json(request, video_repo, key, results, CACHE_CONTROL["search"])
+    except FileNotFoundError:
+        raise HTTPException(404, "videos.json не найден")
+    except Exception as e:
+        raise HTTPException(500, str(e))
+
+
+@app.get("/api/video/{video_id}")
+async def get_video(video_id: str, request: Request):
+    async def card():
+        video = await async_videos.get_by_id(video_id)
+        if video is None:
+            raise HTTPException(404, "Видео не найдено")
+        return video_counters.overlay(video)
+
+    try:
+        # Несброшенные просмотры/лайки этого процесса - тоже часть версии карточки
+        key = ("video", video_id, sorted(video_counters.pending(video_id).items()))
+        return await _conditional_json(request, video_repo, key, card, CACHE_CONTROL["video"])
 
     except FileNotFoundError:
         raise HTTPException(404, "videos.json не найден")
 
 
 @app.get("/api/video/{video_id}/get_link")
-def get_video_link(video_id: str):
+async def get_video_link(video_id: str):
+    if VIDEO_STREAM_PROXY:
+        return {"video_url": f"/api/video/{video_id}/stream"}
     try:
-        url = minio_client.get_presigned_url(
+        url = await async_minio.get_presigned_url(
             bucket_name="video",
             object_name=f"{video_id}.mp4",
             expiration=3600
@@ -109,38 +499,171 @@ def get_video_link(video_id: str):
         if not url:
             raise HTTPException(500, "Не удалось получить ссылку")
 
-        # Переписываем host minio -> localhost, чтобы ссылка работала из браузера
-        external_url = url.replace("http://minio:9000", "http://localhost:9000")
-
-        return {"video_url": external_url}
+        # Ссылка уже подписана для внешнего адреса MinIO (MINIO_PUBLIC_ENDPOINT)
+        return {"video_url": url}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(500, f"MinIO error: {repr(e)}")
 
 
 
+@app.api_route("/api/video/{video_id}/stream", methods=["GET", "HEAD"])
+async def stream_video(video_id: str, request: Request):
+    """
+    Видео через бэкенд: Range/206 для перемотки, ETag/If-None-Match и If-Range,
+    тело пересылается из MinIO кусками по мере чтения.
+    """
+    video = await async_videos.get_by_id(video_id)
+    if video is None or video.get("is_deleted", False):
+        raise HTTPException(404, "Видео не найдено")
+
+    object_name = f"{video_id}.mp4"
+    try:
+        info = await video_streamer.stat("video", object_name)
+    except StorageUnavailableError as e:
+        raise _storage_unavailable(e)
+    except Exception as e:
+        raise HTTPException(502, f"MinIO error: {repr(e)}")
+    if info is None:
+        raise HTTPException(404, "Файл видео не найден")
+
+    size = info["size"]
+    etag = f'"{info["etag"]}"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, max-age=3600",
+    }
+    if info["last_modified"] is not None:
+        headers["Last-Modified"] = format_datetime(info["last_modified"], usegmt=True)
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range is not None and if_range.strip() != etag:
+        range_header = None  # объект изменился - отдаём целиком
+
+    try:
+        requested = parse_range(range_header, size)
+    except RangeNotSatisfiable:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    if requested is None:
+        status_code, (start, end) = 200, (0, size - 1)
+    else:
+        status_code, (start, end) = 206, requested
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+
+    media_type = info["content_type"] or "video/mp4"
+    if request.method == "HEAD" or size == 0:
+        return Response(status_code=status_code, headers=headers, media_type=media_type)
+    return StreamingResponse(
+        video_streamer.iterate("video", object_name, start, end, size),
+        status_code=status_code,
+        headers=headers,
+        media_type=media_type,
+    )
+
+
+@app.get("/api/video/{video_id}/recommendations")
+async def get_recommendations(video_id: str, limit: int = 10):
+    return get_category_recommendations(
+        video_id, [], limit, leaderboard=await _from_snapshot(get_leaderboard, video_repo, "popularity"),
+    )
+
+
+@app.get("/api/video/{video_id}/related")
+async def get_related(video_id: str, request: Request, limit: int = 10):
+    """
+    Похожие видео: близость названия и описания (TF-IDF), общие комментаторы
+    и категория - из заранее посчитанных соседей (services/related.py)
+    """
+    limit = min(max(limit, 1), MAX_RELATED)
+
+    async def related():
+        if video_repo.is_fresh() and comment_repo.is_fresh() and text_neighbours_ready(video_repo):
+            return get_related_videos(video_repo, comment_repo, video_id, limit)
+        # Первый пакетный расчёт соседей (или чтение с диска) - не в цикле событий
+        return await io_executor.run(get_related_videos, video_repo, comment_repo, video_id, limit)
+
+    comments_tag = await _from_snapshot(data_tag, comment_repo)
+    return await _conditional_json(
+        request, video_repo, ("related", video_id, limit, comments_tag), related, CACHE_CONTROL["related"],
+    )
+
+
 @app.get("/api/video/{video_id}/comments")
-def get_comments(video_id: str):
+async def get_comments(video_id: str, request: Request):
     try:
-        with open(COMMENTS_FILE, "r", encoding="utf-8") as f:
-            comments = json.load(f)
+        return await _conditional_json(
+            request, comment_repo, ("comments", video_id),
+            lambda: async_comments.get_by_video_id(video_id), CACHE_CONTROL["comments"],
+        )
 
-        return [c for c in comments if c["video_id"] == video_id]
+    except FileNotFoundError:
+        raise HTTPException(404, "comments.json не найден")
+
+
+@app.get("/api/video/{video_id}/comments/tree")
+async def get_comment_tree(
+    video_id: str,
+    request: Request,
+    limit: int = DEFAULT_PAGE_SIZE,
+    offset: int = 0,
+    max_depth: Optional[int] = None,
+    order: str = "old",
+):
+    """Дерево комментариев: страница корневых комментариев с вложенными ответами"""
+    if order not in ("old", "new"):
+        raise HTTPException(400, "order должен быть old или new")
+    limit = min(max(limit, 1), MAX_PAGE_SIZE)
+    offset = max(offset, 0)
+    max_depth = max_depth if max_depth is None else max(max_depth, 0)
+
+    async def tree():
+        comments = await async_comments.get_video_comments(video_id)
+        return build_comment_tree(
+            comments,
+            limit=limit,
+            offset=offset,
+            max_depth=max_depth,
+            newest_first=order == "new",
+        )
+
+    try:
+        key = ("tree", video_id, limit, offset, max_depth, order)
+        return await _conditional_json(request, comment_repo, key, tree, CACHE_CONTROL["comments"])
 
     except FileNotFoundError:
         raise HTTPException(404, "comments.json не найден")
 
 
-@app.post("/api/video/{video_id}/comment")
-def add_comment(video_id: str, body: CommentCreate):
+@app.get("/api/comments/{comment_id}/thread")
+async def get_comment_thread(comment_id: str, request: Request, max_depth: Optional[int] = None):
+    """Ветка ответов под комментарием - продолжение узла с has_more_replies"""
+
+    async def thread():
+        result = await async_comments.get_comment_thread(comment_id, max_depth)
+        if not result:
+            raise HTTPException(404, "Комментарий не найден")
+        return result
+
     try:
-        # --- Загружаем существующие комментарии ---
-        if COMMENTS_FILE.exists():
-            with open(COMMENTS_FILE, "r", encoding="utf-8") as f:
-                comments = json.load(f)
-        else:
-            comments = []
+        key = ("thread", comment_id, max_depth)
+        return await _conditional_json(request, comment_repo, key, thread, CACHE_CONTROL["comments"])
 
+    except FileNotFoundError:
+        raise HTTPException(404, "comments.json не найден")
+
+
+@app.post("/api/video/{video_id}/comment")
+async def add_comment(video_id: str, body: CommentCreate):
+    try:
         # --- Создаём новый комментарий ---
         new_comment = {
             "id": str(uuid.uuid4()),
@@ -153,12 +676,100 @@ def add_comment(video_id: str, body: CommentCreate):
         }
 
         # --- Добавляем и сохраняем ---
-        comments.append(new_comment)
-
-        with open(COMMENTS_FILE, "w", encoding="utf-8") as f:
-            json.dump(comments, f, ensure_ascii=False, indent=2)
+        await async_comments.create(new_comment)
 
         return {"status": "ok", "comment": new_comment}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+async def _count(video_id: str, field: str):
+    if await async_videos.get_by_id(video_id) is None:
+        raise HTTPException(404, "Видео не найдено")
+    video_counters.increment(video_id, field)
+    return {"status": "ok"}
+
+
+@app.post("/api/video/{video_id}/view")
+async def add_view(video_id: str):
+    return await _count(video_id, "views")
+
+
+@app.post("/api/video/{video_id}/likes")
+async def add_like(video_id: str):
+    return await _count(video_id, "likes")
+
+
+@app.post("/api/video/{video_id}/dislikes")
+async def add_dislike(video_id: str):
+    return await _count(video_id, "dislikes")
+
+
+@app.get("/api/stats/counters")
+async def get_counter_stats():
+    return video_counters.stats()
+
+
+@app.get("/api/stats/cache")
+async def get_cache_stats():
+    return snapshot_cache.stats()
+
+
+@app.get("/api/stats/presigned")
+async def get_presigned_stats():
+    return minio_client.url_cache.stats()
+
+
+@app.get("/api/stats/storage")
+async def get_storage_stats():
+    return {**minio_client.stats(), "executor": storage_executor.stats()}
+
+
+@app.get("/api/stats/uploads")
+async def get_upload_stats():
+    return {**video_uploader.stats(), "executor": upload_executor.stats()}
+
+
+@app.get("/api/stats/object_cache")
+async def get_object_cache_stats():
+    if object_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **object_cache.stats()}
+
+
+@app.get("/api/stats/payloads")
+async def get_payload_stats():
+    return {
+        "json": JSON_BACKEND,
+        "videos": get_payload_cache(video_repo).stats(),
+        "categories": get_payload_cache(category_repo).stats(),
+    }
+
+
+@app.get("/api/stats/catalog")
+async def get_catalog_stats():
+    """Видео, просмотры и лайки по категориям - агрегаты по столбцам каталога"""
+    columns = await _from_snapshot(get_video_columns, video_repo)
+    if columns is None:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        **columns.stats(),
+        "by_category": [
+            {"category_id": category_id, **totals}
+            for category_id, totals in columns.category_totals().items()
+        ],
+    }
+
+
+@app.get("/api/stats/executor")
+async def get_executor_stats():
+    return io_executor.stats()
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Метрики в текстовом формате Prometheus"""
+    # Сборщики могут перечитать снимок с диска - не в цикле событий
+    return Response(await io_executor.run(metrics.render), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,118 @@
+from typing import Any, Dict, Iterable, List, Optional
+
+# Поля удалённого комментария, которые остаются в дереве, если на него есть живые ответы
+_PLACEHOLDER_FIELDS = ("id", "video_id", "parent_id", "date")
+
+
+def build_comment_tree(
+    comments: Iterable[Dict[str, Any]],
+    limit: Optional[int] = None,
+    offset: int = 0,
+    max_depth: Optional[int] = None,
+    newest_first: bool = False,
+    root_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Дерево комментариев одного видео за один проход по его комментариям.
+
+    Комментарии берутся в порядке добавления (он же хронологический), ответы
+    внутри ветки - от старых к новым, корни - в порядке newest_first.
+    Корни пагинируются (offset/limit), ветки обрезаются на глубине max_depth
+    (0 - только корни): у обрезанного узла has_more_replies=True, продолжение
+    можно получить с root_id. У каждого узла reply_count - прямые ответы,
+    total_replies - все ответы в ветке.
+
+    Удалённый комментарий остаётся в дереве без текста и автора, только если
+    под ним есть живые ответы. Ответ на комментарий, которого нет среди
+    переданных, считается корнем.
+    """
+    by_id: Dict[str, Dict[str, Any]] = {}
+    children: Dict[Optional[str], List[str]] = {}
+    order: List[str] = []
+    for comment in comments:
+        comment_id = comment.get("id")
+        by_id[comment_id] = comment
+        order.append(comment_id)
+
+    roots: List[str] = []
+    for comment_id in order:
+        parent_id = by_id[comment_id].get("parent_id")
+        if parent_id is not None and parent_id in by_id and parent_id != comment_id:
+            children.setdefault(parent_id, []).append(comment_id)
+        else:
+            roots.append(comment_id)
+
+    # Живые ответы в каждой ветке: обход в глубину без рекурсии, затем сумма снизу вверх
+    preorder: List[str] = []
+    stack = list(roots)
+    visited = set()
+    while stack:
+        comment_id = stack.pop()
+        if comment_id in visited:
+            continue
+        visited.add(comment_id)
+        preorder.append(comment_id)
+        stack.extend(children.get(comment_id, ()))
+
+    total: Dict[str, int] = {}
+    visible: Dict[str, bool] = {}
+    for comment_id in reversed(preorder):
+        live_below = 0
+        for child_id in children.get(comment_id, ()):
+            if visible.get(child_id):
+                live_below += total[child_id] + (0 if by_id[child_id].get("is_deleted", False) else 1)
+        total[comment_id] = live_below
+        visible[comment_id] = live_below > 0 or not by_id[comment_id].get("is_deleted", False)
+
+    if root_id is not None:
+        roots = [root_id] if visible.get(root_id) else []
+    else:
+        roots = [comment_id for comment_id in roots if visible[comment_id]]
+        if newest_first:
+            roots.reverse()
+
+    total_roots = len(roots)
+    end = total_roots if limit is None else offset + limit
+    page_roots = roots[offset:end]
+
+    def make_node(comment_id: str, depth: int) -> Dict[str, Any]:
+        comment = by_id[comment_id]
+        if comment.get("is_deleted", False):
+            node = {field: comment.get(field) for field in _PLACEHOLDER_FIELDS}
+            node.update(user_id=None, text=None, is_deleted=True)
+        else:
+            node = dict(comment)
+        replies = [child_id for child_id in children.get(comment_id, ()) if visible[child_id]]
+        node["depth"] = depth
+        node["reply_count"] = len(replies)
+        node["total_replies"] = total[comment_id]
+        node["replies"] = []
+        node["has_more_replies"] = False
+        return node
+
+    items = []
+    stack = []
+    for comment_id in reversed(page_roots):
+        node = make_node(comment_id, 0)
+        items.append(node)
+        stack.append((comment_id, node))
+    items.reverse()
+
+    while stack:
+        comment_id, node = stack.pop()
+        if not node["reply_count"]:
+            continue
+        if max_depth is not None and node["depth"] >= max_depth:
+            node["has_more_replies"] = True
+            continue
+        for child_id in children[comment_id]:
+            if visible[child_id]:
+                child = make_node(child_id, node["depth"] + 1)
+                node["replies"].append(child)
+                stack.append((child_id, child))
+
+    return {
+        "items": items,
+        "total_roots": total_roots,
+        "next_offset": end if end < total_roots else None,
+    }
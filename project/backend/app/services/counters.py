@@ -0,0 +1,161 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# video_id -> {"views": 3, "likes": 1}
+Deltas = Dict[str, Dict[str, int]]
+
+
+class _Shard:
+    __slots__ = ("lock", "deltas")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.deltas: Deltas = {}
+
+
+class CounterAggregator:
+    """
+    Накопитель приращений счётчиков (просмотры, лайки, дизлайки).
+
+    increment() только прибавляет число в памяти (шард выбирается по ключу, чтобы
+    потоки не толкались на одной блокировке). Фоновый поток раз в flush_interval
+    секунд - или раньше, если накопилось max_pending ключей - забирает все
+    приращения и одним пакетом передаёт их в flush_fn. Приращения аддитивны,
+    поэтому пакеты от разных воркеров складываются, а не перетирают друг друга.
+    """
+
+    def __init__(
+        self,
+        flush_fn: Callable[[Deltas], Any],
+        shards: int = 16,
+        flush_interval: float = 1.0,
+        max_pending: int = 1000,
+    ):
+        self._flush_fn = flush_fn
+        self._shards = [_Shard() for _ in range(shards)]
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._pending_keys = 0
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.flushes = 0
+        self.flush_errors = 0
+        self.flushed_deltas = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def _shard(self, key: str) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def increment(self, key: str, field: str, delta: int = 1):
+        shard = self._shard(key)
+        with shard.lock:
+            fields = shard.deltas.get(key)
+            if fields is None:
+                fields = shard.deltas[key] = {}
+                with self._pending_lock:
+                    self._pending_keys += 1
+            fields[field] = fields.get(field, 0) + delta
+        if self._pending_keys >= self.max_pending:
+            self._wake.set()
+
+    def pending(self, key: str) -> Dict[str, int]:
+        """Ещё не сброшенные приращения для ключа"""
+        shard = self._shard(key)
+        with shard.lock:
+            return dict(shard.deltas.get(key, {}))
+
+    def overlay(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Запись с учётом несброшенных приращений этого процесса"""
+        pending = self.pending(record.get("id"))
+        if not pending:
+            return record
+        return {**record, **{field: record.get(field, 0) + d for field, d in pending.items()}}
+
+    def _drain(self) -> Deltas:
+        drained: Deltas = {}
+        for shard in self._shards:
+            with shard.lock:
+                if shard.deltas:
+                    drained.update(shard.deltas)
+                    with self._pending_lock:
+                        self._pending_keys -= len(shard.deltas)
+                    shard.deltas = {}
+        return drained
+
+    def _merge_back(self, deltas: Deltas):
+        for key, fields in deltas.items():
+            for field, delta in fields.items():
+                self.increment(key, field, delta)
+
+    def flush(self) -> int:
+        """Сбросить накопленные приращения; вернуть число сброшенных ключей"""
+        with self._flush_lock:
+            deltas = self._drain()
+            if not deltas:
+                return 0
+
+            started = time.perf_counter()
+            try:
+                self._flush_fn(deltas)
+            except Exception as e:
+                # Ничего не теряем: вернём приращения и попробуем в следующий раз
+                logger.error(f"Counter flush failed: {e}")
+                self.flush_errors += 1
+                self._merge_back(deltas)
+                return 0
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.flushes += 1
+            self.flushed_deltas += len(deltas)
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self._total_flush_ms += elapsed_ms
+            return len(deltas)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def start(self):
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="counter-flusher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Остановить фоновый поток и сбросить остаток"""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        pending_delta = 0
+        for shard in self._shards:
+            with shard.lock:
+                pending_delta += sum(sum(fields.values()) for fields in shard.deltas.values())
+        return {
+            "pending_keys": self._pending_keys,
+            "pending_delta": pending_delta,
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+            "flushed_deltas": self.flushed_deltas,
+            "last_flush_ms": self.last_flush_ms,
+            "max_flush_ms": self.max_flush_ms,
+            "avg_flush_ms": (self._total_flush_ms / self.flushes) if self.flushes else 0.0,
+        }
@@ -0,0 +1,83 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, TypeVar
+
+T = TypeVar("T")
+
+
+class BlockingExecutor:
+    """
+    Ограниченный пул потоков для блокирующих вызовов (диск, MinIO) из async-обработчиков.
+
+    Обработчик ждёт результат через await и не занимает поток на всё время
+    запроса - поток нужен только на сам блокирующий вызов. Размер пула задаёт
+    верхнюю границу одновременных блокирующих операций на воркер.
+    """
+
+    def __init__(self, max_workers: int, name: str = "io"):
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._active = 0
+        self._submitted = 0
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._active += 1
+            self._submitted += 1
+        try:
+            # Контекст (contextvars) переносится в поток, как в asyncio.to_thread: замеры
+            # запроса (Server-Timing) видят и вызовы в пуле
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(self._pool, functools.partial(context.run, fn, *args, **kwargs))
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "active": self._active,
+                "submitted": self._submitted,
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+
+def bounded_map(fn: Callable[[T], Any], items: Iterable[T], workers: int) -> Iterator[Any]:
+    """
+    fn(item) для каждого элемента в workers потоках; результаты - в порядке
+    элементов. В полёте не больше 2 * workers задач, и items читается по мере
+    продвижения, поэтому генератор на миллион элементов не держит их в памяти.
+    """
+    with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="bulk") as pool:
+        window = deque()
+        for item in items:
+            if len(window) >= 2 * workers:
+                yield window.popleft().result()
+            window.append(pool.submit(fn, item))
+        while window:
+            yield window.popleft().result()
+
+
+def batched(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    """Элементы пачками по size (последняя может быть короче)"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+io_executor = BlockingExecutor(int(os.getenv("IO_POOL_SIZE", "32")), "io")
@@ -0,0 +1,125 @@
+import hashlib
+import os
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+from .responses import JsonBytesResponse, Payload, brotli
+
+# Cache-Control по видам ответов. max-age - сколько браузер и nginx отдают
+# ответ без запроса; stale-while-revalidate - сколько ещё можно отдать
+# устаревший ответ, проверяя его в фоне (If-None-Match -> 304 почти бесплатен)
+CACHE_CONTROL = {
+    "feed": "public, max-age=5, stale-while-revalidate=60",
+    "video": "public, max-age=2, stale-while-revalidate=30",
+    "comments": "public, max-age=2, stale-while-revalidate=30",
+    "related": "public, max-age=60, stale-while-revalidate=600",
+    "personal": "private, max-age=10",
+    "search": "public, max-age=30, stale-while-revalidate=300",
+    "categories": "public, max-age=300, stale-while-revalidate=3600",
+}
+
+# Ответы меньше этого не сжимаются: выигрыш меньше заголовков и затрат CPU
+COMPRESS_MIN_SIZE = int(os.getenv("HTTP_COMPRESS_MIN_SIZE", "1024"))
+
+_VARIANT_SUFFIXES = ("-br", "-gzip")
+
+
+def make_etag(*parts: Any) -> str:
+    """Сильный ETag из частей ключа: версии данных (data_tag) и параметров ответа"""
+    return '"' + hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=12).hexdigest() + '"'
+
+
+def data_tag(repo) -> str:
+    """Версия данных репозитория для ETag (одинакова во всех процессах)"""
+    return repo.data_tag()
+
+
+def _bare(tag: str) -> str:
+    tag = tag.strip().removeprefix("W/").strip('"')
+    for suffix in _VARIANT_SUFFIXES:
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)]
+    return tag
+
+
+def _matching(header: Optional[str], etag: str) -> Optional[str]:
+    # ETag из If-None-Match, совпавший с etag (с его суффиксом сжатия), или None
+    if not header:
+        return None
+    if header.strip() == "*":
+        return etag
+    bare = _bare(etag)
+    for tag in header.split(","):
+        if _bare(tag) == bare:
+            return '"' + tag.strip().removeprefix("W/").strip('"') + '"'
+    return None
+
+
+def if_none_match(header: Optional[str], etag: str) -> bool:
+    """
+    Совпадает ли ETag с одним из If-None-Match. Сжатые варианты (ETag с
+    суффиксом -gzip/-br) - то же содержимое, что и несжатый ответ.
+    """
+    return _matching(header, etag) is not None
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """br (если установлен brotli) или gzip - что принимает клиент; None - без сжатия"""
+    if not accept_encoding:
+        return None
+    accepted = set()
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def response_encoding(request: Request, payload: Payload) -> Optional[str]:
+    """Кодировка, в которой будет отдан payload этому клиенту"""
+    if len(payload.body) < COMPRESS_MIN_SIZE:
+        return None
+    return choose_encoding(request.headers.get("accept-encoding"))
+
+
+def _headers(etag: str, encoding: Optional[str], cache_control: str) -> dict:
+    if encoding is not None:
+        etag = f'{etag[:-1]}-{encoding}"'  # у каждого представления свой сильный ETag
+    return {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+
+
+def not_modified(request: Request, etag: str, cache_control: str) -> Optional[Response]:
+    """
+    304, если у клиента уже есть ответ с этим ETag, - проверяется до того, как
+    ответ собран и сериализован. В 304 - ETag того представления, что у клиента.
+    """
+    matched = _matching(request.headers.get("if-none-match"), etag)
+    if matched is None:
+        return None
+    return Response(status_code=304, headers={**_headers(etag, None, cache_control), "ETag": matched})
+
+
+def payload_response(request: Request, payload: Payload, cache_control: str) -> Response:
+    """
+    Ответ из Payload: 304 по If-None-Match, иначе тело - сжатое, если клиент
+    это принимает и тело достаточно большое (сжатый вариант хранится в payload).
+    """
+    cached = not_modified(request, payload.etag, cache_control)
+    if cached is not None:
+        return cached
+    encoding = response_encoding(request, payload)
+    headers = _headers(payload.etag, encoding, cache_control)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return JsonBytesResponse(payload.encoded(encoding), headers=headers)
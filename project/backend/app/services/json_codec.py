@@ -0,0 +1,42 @@
+import json
+from collections.abc import Mapping
+from datetime import date, datetime
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # необязательная зависимость: без неё - стандартный json
+    orjson = None
+
+# Какой кодек используется (для /api/stats и бенчмарков)
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def _default(value: Any) -> Any:
+    # То, что orjson умеет сам, а стандартный json - нет, и записи со слотами
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, Mapping):
+        # Записи репозиториев (CRUD/records.py) - отображения, но не dict
+        return value.to_dict() if hasattr(value, "to_dict") else dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    def dumps(data: Any) -> bytes:
+        """Компактный JSON в UTF-8 (без экранирования не-ASCII символов)"""
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+    def loads(raw: Union[bytes, str]) -> Any:
+        return orjson.loads(raw)
+else:
+    _encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_default)
+
+    def dumps(data: Any) -> bytes:
+        """Компактный JSON в UTF-8 (без экранирования не-ASCII символов)"""
+        return _encoder.encode(data).encode("utf-8")
+
+    def loads(raw: Union[bytes, str]) -> Any:
+        return json.loads(raw)
@@ -0,0 +1,270 @@
+import base64
+import hashlib
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ..CRUD.storage import atomic_write
+from .executor import batched, bounded_map
+
+
+class _FileResponse:
+    """Ответ на чтение диапазона с тем же интерфейсом, что у ответа urllib3 из Minio.get_object"""
+
+    def __init__(self, path: Path, offset: int, length: int):
+        self._file = open(path, "rb")
+        self._file.seek(offset)
+        self._left = length if length else None
+
+    def stream(self, amt: int = 65536, decode_content: bool = False) -> Iterator[bytes]:
+        while self._left is None or self._left > 0:
+            chunk = self._file.read(amt if self._left is None else min(amt, self._left))
+            if not chunk:
+                return
+            if self._left is not None:
+                self._left -= len(chunk)
+            yield chunk
+
+    def read(self) -> bytes:
+        return b"".join(self.stream())
+
+    def close(self):
+        self._file.close()
+
+    def release_conn(self):
+        pass
+
+
+class LocalObjectStore:
+    """
+    Замена MinIOStorage на локальной папке: <root>/<бакет>/<объект>.
+
+    Те же методы и форма результатов, что у MinIOStorage, - для разработки без
+    MinIO, проверки кэшей и бенчмарков. latency (секунды) добавляется к каждому
+    обращению, чтобы имитировать сетевое хранилище.
+    """
+
+    def __init__(self, root: str, latency: float = 0.0):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.latency = latency
+        self.requests = 0
+
+    def _path(self, bucket_name: str, object_name: str) -> Path:
+        path = (self.root / bucket_name / object_name).resolve()
+        if self.root.resolve() not in path.parents:
+            raise ValueError(f"Недопустимое имя объекта: {object_name}")
+        return path
+
+    def _request(self):
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def bucket_exists(self, bucket_name: str) -> bool:
+        return (self.root / bucket_name).is_dir()
+
+    def create_bucket(self, bucket_name: str) -> bool:
+        if self.bucket_exists(bucket_name):
+            return False
+        (self.root / bucket_name).mkdir(parents=True)
+        return True
+
+    def upload_file(
+        self,
+        bucket_name: str,
+        file_path: str,
+        object_name: Optional[str] = None,
+        content_type: str = "application/octet-stream",
+    ) -> Optional[str]:
+        self._request()
+        object_name = object_name or os.path.basename(file_path)
+        path = self._path(bucket_name, object_name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(file_path, path)
+        return path.as_uri()
+
+    def upload_bytes(
+        self,
+        bucket_name: str,
+        object_name: str,
+        data: bytes,
+        content_type: str = "application/octet-stream",
+    ) -> Optional[str]:
+        self._request()
+        path = self._path(bucket_name, object_name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(path, data)
+        return path.as_uri()
+
+    # Части составной загрузки лежат в <root>/.uploads/<upload_id>/<номер> до сборки объекта
+
+    def _upload_dir(self, upload_id: str) -> Path:
+        path = self.root / ".uploads" / upload_id
+        if not path.is_dir():
+            raise KeyError(f"Нет составной загрузки {upload_id}")
+        return path
+
+    def start_multipart_upload(
+        self,
+        bucket_name: str,
+        object_name: str,
+        content_type: str = "application/octet-stream",
+    ) -> str:
+        self._request()
+        self._path(bucket_name, object_name)
+        upload_id = uuid.uuid4().hex
+        (self.root / ".uploads" / upload_id).mkdir(parents=True)
+        return upload_id
+
+    def upload_part(
+        self,
+        bucket_name: str,
+        object_name: str,
+        upload_id: str,
+        part_number: int,
+        data: bytes,
+        md5_base64: str,
+    ) -> str:
+        self._request()
+        md5 = hashlib.md5(data)
+        # Как MinIO с Content-MD5: искажённая часть отклоняется
+        if base64.b64encode(md5.digest()).decode("ascii") != md5_base64:
+            raise ValueError(f"Content-MD5 части {part_number} не совпадает")
+        atomic_write(self._upload_dir(upload_id) / str(part_number), data)
+        return md5.hexdigest()
+
+    def complete_multipart_upload(
+        self,
+        bucket_name: str,
+        object_name: str,
+        upload_id: str,
+        parts: List[Tuple[int, str]],
+    ) -> str:
+        self._request()
+        directory = self._upload_dir(upload_id)
+        content = bytearray()
+        digests = []
+        for number, etag in parts:
+            data = (directory / str(number)).read_bytes()
+            digest = hashlib.md5(data)
+            if digest.hexdigest() != etag.strip('"'):
+                raise ValueError(f"ETag части {number} не совпадает")
+            digests.append(digest.digest())
+            content += data
+        path = self._path(bucket_name, object_name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(path, bytes(content))
+        shutil.rmtree(directory)
+        return f"{hashlib.md5(b''.join(digests)).hexdigest()}-{len(digests)}"
+
+    def abort_multipart_upload(self, bucket_name: str, object_name: str, upload_id: str):
+        self._request()
+        shutil.rmtree(self.root / ".uploads" / upload_id, ignore_errors=True)
+
+    def download_file(self, bucket_name: str, object_name: str, file_path: str) -> bool:
+        self._request()
+        path = self._path(bucket_name, object_name)
+        if not path.is_file():
+            return False
+        shutil.copyfile(path, file_path)
+        return True
+
+    def download_bytes(self, bucket_name: str, object_name: str) -> Optional[bytes]:
+        self._request()
+        path = self._path(bucket_name, object_name)
+        return path.read_bytes() if path.is_file() else None
+
+    def stat_object(self, bucket_name: str, object_name: str) -> Optional[Dict[str, Any]]:
+        self._request()
+        path = self._path(bucket_name, object_name)
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        return {
+            "size": st.st_size,
+            "etag": f"{st.st_mtime_ns:x}-{st.st_size:x}",
+            "content_type": "application/octet-stream",
+            "last_modified": datetime.fromtimestamp(st.st_mtime, timezone.utc),
+        }
+
+    def open_object(self, bucket_name: str, object_name: str, offset: int = 0, length: int = 0) -> _FileResponse:
+        self._request()
+        return _FileResponse(self._path(bucket_name, object_name), offset, length)
+
+    def delete_object(self, bucket_name: str, object_name: str) -> bool:
+        self._request()
+        try:
+            self._path(bucket_name, object_name).unlink()
+            return True
+        except FileNotFoundError:
+            return False
+
+    def delete_objects(self, bucket_name: str, object_names: Iterable[str]) -> List[Dict[str, Any]]:
+        # Как у S3 DeleteObjects: один запрос на пачку, удаление отсутствующего - не ошибка
+        for batch in batched(object_names, 1000):
+            self._request()
+            for name in batch:
+                self._path(bucket_name, name).unlink(missing_ok=True)
+        return []
+
+    def upload_files(
+        self,
+        bucket_name: str,
+        files: Iterable[Tuple[str, str]],
+        content_type: str = "application/octet-stream",
+        workers: int = 8,
+    ) -> List[Dict[str, Any]]:
+        def upload(item: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+            try:
+                self.upload_file(bucket_name, item[0], item[1], content_type)
+            except OSError as e:
+                return {"name": item[1], "code": type(e).__name__, "message": str(e)}
+            return None
+
+        return [error for error in bounded_map(upload, files, workers) if error is not None]
+
+    def download_files(self, bucket_name: str, files: Iterable[Tuple[str, str]], workers: int = 8) -> List[Dict[str, Any]]:
+        def download(item: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+            if not self.download_file(bucket_name, item[0], item[1]):
+                return {"name": item[0], "code": "NoSuchKey", "message": "Объект не найден"}
+            return None
+
+        return [error for error in bounded_map(download, files, workers) if error is not None]
+
+    def list_objects(self, bucket_name: str, prefix: str = "", recursive: bool = True) -> Iterator[Dict[str, Any]]:
+        # Обход папок по одной, в порядке имён, без сборки всего списка
+        bucket = self.root / bucket_name
+        if not bucket.is_dir():
+            return
+        self._request()
+
+        def walk(directory: Path) -> Iterator[Path]:
+            # Порядок ключей, как у S3: "a.jpg" раньше "a/b.jpg"
+            for path in sorted(directory.iterdir(), key=lambda path: path.name + "/" if path.is_dir() else path.name):
+                if not path.is_dir():
+                    yield path
+                elif recursive:
+                    yield from walk(path)
+
+        for path in walk(bucket):
+            name = path.relative_to(bucket).as_posix()
+            if name.startswith(prefix):
+                st = path.stat()
+                yield {
+                    "name": name,
+                    "size": st.st_size,
+                    "modified": datetime.fromtimestamp(st.st_mtime, timezone.utc),
+                }
+
+    def get_presigned_url(self, bucket_name: str, object_name: str, expiration: int = 3600) -> Optional[str]:
+        return self._path(bucket_name, object_name).as_uri()
+
+    def cached_presigned_url(self, bucket_name: str, object_name: str, expiration: int = 3600) -> Optional[str]:
+        # Подписывать нечего: ссылка на файл всегда "в кэше"
+        return self.get_presigned_url(bucket_name, object_name, expiration)
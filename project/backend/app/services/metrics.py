@@ -0,0 +1,272 @@
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Границы корзин гистограмм, секунды (как у клиентов Prometheus, плюс мелкие - для чтений из памяти)
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# Замеры текущего запроса для заголовка Server-Timing: имя -> (секунды, вызовов).
+# Словарь общий для запроса и его вызовов в пулах потоков (BlockingExecutor копирует контекст)
+_request_timings: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar("request_timings", default=None)
+
+_NAME_UNSAFE = re.compile(r"[^a-zA-Z0-9_]")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(key: LabelKey, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class _Timer:
+    """Контекстный менеджер metrics.timer(); без генератора - дешевле на горячем пути"""
+
+    __slots__ = ("metrics", "name", "timing", "labels", "started")
+
+    def __init__(self, metrics: "Metrics", name: str, timing: Optional[str], labels: Dict[str, Any]):
+        self.metrics = metrics
+        self.name = name
+        self.timing = timing
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        self.metrics.observe(self.name, elapsed, **self.labels)
+        if self.timing is not None:
+            add_timing(self.timing, elapsed)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def add_timing(name: str, seconds: float):
+    """Добавить замер в Server-Timing текущего запроса (если заголовок включён)"""
+    timings = _request_timings.get()
+    if timings is not None:
+        entry = timings.get(name)
+        if entry is None:
+            timings[name] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+
+class Metrics:
+    """
+    Метрики процесса в формате Prometheus: гистограммы задержек и счётчики с
+    метками, плюс сборщики - функции stats() кэшей и пулов, которые
+    опрашиваются только при выдаче /metrics.
+
+    enabled=False выключает запись: timer() возвращает пустой контекстный
+    менеджер, observe() и inc() сразу выходят, middleware пропускает запросы
+    без замеров. Сборщики работают и тогда - они ничего не стоят до запроса /metrics.
+    """
+
+    def __init__(self, enabled: bool = True, namespace: str = "mypipe", buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.namespace = namespace
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._help: Dict[str, str] = {}
+        self._collectors: List[Tuple[str, Callable[[], Dict[str, Any]]]] = []
+
+    def _name(self, name: str) -> str:
+        return f"{self.namespace}_{name}"
+
+    def describe(self, name: str, help_text: str):
+        self._help[self._name(name)] = help_text
+
+    def observe(self, name: str, seconds: float, **labels: Any):
+        if not self.enabled:
+            return
+        key = tuple(sorted((label, str(label_value)) for label, label_value in labels.items()))
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._histograms.setdefault(self._name(name), {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(len(self.buckets) + 1)
+            histogram.counts[index] += 1
+            histogram.sum += seconds
+            histogram.count += 1
+
+    def inc(self, name: str, value: float = 1, **labels: Any):
+        if not self.enabled:
+            return
+        key = tuple(sorted((label, str(label_value)) for label, label_value in labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(self._name(name), {})
+            series[key] = series.get(key, 0) + value
+
+    def timer(self, name: str, timing: Optional[str] = None, **labels: Any):
+        """
+        with metrics.timer("minio_request_seconds", "minio", operation="stat"): ...
+        - длительность блока в гистограмму name; timing - имя в Server-Timing.
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, timing, labels)
+
+    def collect(self, prefix: str, stats: Callable[[], Dict[str, Any]]):
+        """Выдавать числовые поля stats() (вложенные словари - через _) как gauge prefix_<поле>"""
+        self._collectors.append((prefix, stats))
+
+    def _collected(self) -> List[str]:
+        lines = []
+
+        def flatten(prefix: str, values: Dict[str, Any]):
+            for field, value in values.items():
+                name = _NAME_UNSAFE.sub("_", f"{prefix}_{field}")
+                if isinstance(value, dict):
+                    flatten(name, value)
+                elif isinstance(value, (bool, int, float)):
+                    lines.append(f"# TYPE {name} gauge")
+                    lines.append(f"{name} {float(value)}")
+
+        for prefix, stats in self._collectors:
+            try:
+                flatten(self._name(prefix), stats())
+            except Exception as e:
+                lines.append(f"# {prefix}: {type(e).__name__}")
+        return lines
+
+    def render(self) -> str:
+        """Текстовый формат Prometheus (text/plain; version=0.0.4)"""
+        lines: List[str] = []
+        bounds = [f'le="{bound:g}"' for bound in self.buckets] + ['le="+Inf"']
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(bounds, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_labels(key, bound)} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(key)} {histogram.sum}")
+                    lines.append(f"{name}_count{_labels(key)} {histogram.count}")
+            for name, series in sorted(self._counters.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_labels(key)} {float(value)}")
+        lines.extend(self._collected())
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware: длительность каждого HTTP-запроса в гистограмму
+    http_request_seconds{method, route, status} (route - шаблон пути маршрута,
+    а не сам путь, чтобы id не плодили ряды) и, если server_timing, заголовок
+    Server-Timing с замерами запроса (repo, minio... и app - до начала ответа).
+
+    Для потоковых ответов длительность - до отправки последнего куска.
+    """
+
+    def __init__(self, app, metrics: "Metrics", server_timing: bool = False):
+        self.app = app
+        self.metrics = metrics
+        self.server_timing = server_timing
+        self._routes: Dict[Any, str] = {}
+
+    def _route(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        route = self._routes.get(endpoint)
+        if route is None:
+            for candidate in getattr(scope.get("app"), "routes", ()):
+                if getattr(candidate, "endpoint", None) is not None:
+                    self._routes[candidate.endpoint] = candidate.path
+            route = self._routes.setdefault(endpoint, getattr(endpoint, "__name__", "unknown"))
+        return route
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.metrics.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        timings: Optional[Dict[str, List[float]]] = {} if self.server_timing else None
+        token = _request_timings.set(timings)
+
+        async def send_with_metrics(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if timings is not None:
+                    entries = [
+                        f"{name};dur={seconds * 1000:.2f}" + (f';desc="{int(calls)}x"' if calls > 1 else "")
+                        for name, (seconds, calls) in timings.items()
+                    ]
+                    entries.append(f"app;dur={(time.perf_counter() - started) * 1000:.2f}")
+                    message = {
+                        **message,
+                        "headers": [*message.get("headers", ()), (b"server-timing", ", ".join(entries).encode("latin-1"))],
+                    }
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            _request_timings.reset(token)
+            self.metrics.observe(
+                "http_request_seconds",
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=self._route(scope),
+                status=status,
+            )
+
+
+metrics = Metrics(enabled=os.getenv("METRICS_ENABLED", "true").lower() == "true")
+metrics.describe("http_request_seconds", "Длительность HTTP-запроса по маршрутам")
+metrics.describe("snapshot_load_seconds", "Чтение и разбор данных репозитория (снимок файла или таблицы)")
+metrics.describe("derived_build_seconds", "Построение производных структур снимка (индексы, топы, поиск)")
+metrics.describe("minio_request_seconds", "Запросы к MinIO по операциям, вместе с повторами")
+metrics.describe("minio_errors_total", "Неудачные запросы к MinIO по операциям и кодам ошибок")
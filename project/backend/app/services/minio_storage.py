@@ -1,14 +1,80 @@
-
-
-from minio import Minio
-from minio.error import S3Error
+import logging
 import os
-from io import BytesIO
-from typing import Optional, BinaryIO
+import time
 from datetime import timedelta
+from io import BytesIO
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import certifi
+import urllib3
+from minio import Minio
+from minio.datatypes import Part
+from minio.deleteobjects import DeleteObject
+from minio.error import MinioException, S3Error
+
+from .executor import BlockingExecutor, batched, bounded_map, io_executor
+from .metrics import add_timing, metrics
+from .presigned_cache import PresignedUrlCache
+from .resilience import CircuitBreaker, backoff_delay
+
+logger = logging.getLogger(__name__)
+
+# Коды ответов S3, означающие отсутствие объекта/бакета (это не сбой хранилища)
+NOT_FOUND_CODES = ("NoSuchKey", "NoSuchObject", "NoSuchBucket")
+# Коды ответов S3, после которых запрос имеет смысл повторить
+RETRYABLE_CODES = ("InternalError", "SlowDown", "ServiceUnavailable", "RequestTimeout", "XMinioServerNotInitialized")
+# Предел S3 DeleteObjects: объектов в одном запросе пакетного удаления
+DELETE_BATCH_SIZE = 1000
+
+
+class StorageError(Exception):
+    """Ошибка операции с хранилищем: операция, бакет, объект и код ответа S3 (если был)"""
+
+    def __init__(
+        self,
+        operation: str,
+        bucket_name: Optional[str] = None,
+        object_name: Optional[str] = None,
+        code: Optional[str] = None,
+        message: str = "",
+    ):
+        self.operation = operation
+        self.bucket_name = bucket_name
+        self.object_name = object_name
+        self.code = code
+        target = "/".join(part for part in (bucket_name, object_name) if part)
+        super().__init__(f"{operation} {target}: {code or ''} {message}".strip())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "operation": self.operation,
+            "bucket": self.bucket_name,
+            "object": self.object_name,
+            "code": self.code,
+            "error": str(self),
+        }
+
+
+class StorageUnavailableError(StorageError):
+    """Хранилище недоступно: сетевой сбой, таймаут, 5xx или разомкнут предохранитель"""
+
+    def __init__(self, *args, retry_after: float = 0.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.retry_after = retry_after
 
 
 class MinIOStorage:
+    """
+    Клиент MinIO.
+
+    Пул соединений urllib3 ограничен pool_size на хост, у запросов есть таймауты
+    подключения и чтения. Идемпотентные операции при сетевых сбоях, таймаутах
+    и 5xx повторяются до retries раз с экспоненциальной паузой со случайным
+    разбросом. Предохранитель (CircuitBreaker) после серии сбоев подряд
+    отклоняет вызовы сразу (StorageUnavailableError), не дожидаясь таймаутов,
+    пока пробный вызов не покажет, что MinIO снова отвечает. Ошибки - исключения
+    StorageError с операцией, объектом и кодом S3; "не найдено" - это None/False.
+    """
     
     def __init__(
         self,
@@ -16,34 +82,184 @@ class MinIOStorage:
         access_key: str = "minioadmin",
         secret_key: str = "minioadmin",
         secure: bool = False,
+        public_endpoint: Optional[str] = None,
+        public_secure: Optional[bool] = None,
+        region: str = "us-east-1",
+        url_cache_size: int = 10000,
+        url_safety_margin: float = 300.0,
+        pool_size: int = 32,
+        connect_timeout: float = 3.0,
+        read_timeout: float = 30.0,
+        retries: int = 3,
+        retry_base_delay: float = 0.1,
+        retry_max_delay: float = 2.0,
+        breaker_threshold: int = 5,
+        breaker_reset_timeout: float = 10.0,
     ):
+        # Повторы делает _call (с учётом предохранителя), у urllib3 они выключены
+        self.http = urllib3.PoolManager(
+            maxsize=pool_size,
+            timeout=urllib3.Timeout(connect=connect_timeout, read=read_timeout),
+            retries=False,
+            cert_reqs="CERT_REQUIRED",
+            ca_certs=os.environ.get("SSL_CERT_FILE") or certifi.where(),
+        )
         self.client = Minio(
             endpoint=endpoint,
             access_key=access_key,
             secret_key=secret_key,
             secure=secure,
+            http_client=self.http,
         )
         self.endpoint = endpoint
-    
+        self.pool_size = pool_size
+        self.retries = retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset_timeout)
+        self._retried = 0
+        self._failed = 0
+
+        # Подписанные ссылки отдаются браузеру, поэтому подписываются сразу для
+        # внешнего адреса MinIO (подпись включает host - подменять его в готовой
+        # ссылке нельзя). Регион задан явно: подпись не требует запроса к серверу.
+        self.public_endpoint = public_endpoint or endpoint
+        self.signing_client = Minio(
+            endpoint=self.public_endpoint,
+            access_key=access_key,
+            secret_key=secret_key,
+            secure=secure if public_secure is None else public_secure,
+            region=region,
+        )
+        self.url_cache = PresignedUrlCache(url_cache_size, url_safety_margin)
+
+    def _call(
+        self,
+        operation: str,
+        bucket_name: Optional[str],
+        object_name: Optional[str],
+        fn: Callable[[], Any],
+        idempotent: bool = True,
+    ) -> Any:
+        """
+        Выполнить запрос к MinIO: предохранитель, повторы идемпотентных операций,
+        перевод ошибок в StorageError. S3Error "не найдено" пробрасывается как есть.
+        """
+        with metrics.timer("minio_request_seconds", "minio", operation=operation):
+            return self._attempts(operation, bucket_name, object_name, fn, idempotent)
+
+    def _attempts(
+        self,
+        operation: str,
+        bucket_name: Optional[str],
+        object_name: Optional[str],
+        fn: Callable[[], Any],
+        idempotent: bool,
+    ) -> Any:
+        attempts = self.retries + 1 if idempotent else 1
+        for attempt in range(attempts):
+            self._admit(operation, bucket_name, object_name)
+            try:
+                result = fn()
+            except BaseException as e:
+                code = self._attempt_failed(operation, bucket_name, object_name, e)
+                error = e
+            else:
+                self.breaker.record_success()
+                return result
+
+            if attempt + 1 < attempts:
+                self._retried += 1
+                time.sleep(backoff_delay(attempt, self.retry_base_delay, self.retry_max_delay))
+                continue
+            raise self._unavailable(operation, bucket_name, object_name, error, code, attempt + 1) from error
+
+    def _admit(self, operation: str, bucket_name: Optional[str], object_name: Optional[str]):
+        """Пропустить попытку через предохранитель; разомкнут - StorageUnavailableError"""
+        if not self.breaker.allow():
+            metrics.inc("minio_errors_total", operation=operation, code="CircuitOpen")
+            raise StorageUnavailableError(
+                operation, bucket_name, object_name, code="CircuitOpen",
+                message="MinIO недоступен", retry_after=self.breaker.retry_after(),
+            )
+
+    def _attempt_failed(
+        self,
+        operation: str,
+        bucket_name: Optional[str],
+        object_name: Optional[str],
+        error: BaseException,
+    ) -> str:
+        """
+        Учесть неудачную попытку в предохранителе - при любом исключении, иначе
+        пробный вызов разомкнутого предохранителя так и остался бы незавершённым.
+        Сбой хранилища (сеть, таймаут, 5xx, непонятный ответ) - вернуть код для
+        повтора. Иначе исключение пробрасывается: S3Error "не найдено" - как
+        есть, прочие ответы S3 - StorageError.
+        """
+        if isinstance(error, S3Error) and error.code not in RETRYABLE_CODES:
+            # Хранилище ответило по существу - оно живо
+            self.breaker.record_success()
+            if error.code in NOT_FOUND_CODES:
+                raise error
+            self._failed += 1
+            metrics.inc("minio_errors_total", operation=operation, code=error.code)
+            logger.warning(
+                f"MinIO {operation} failed: {error.code}",
+                extra={"operation": operation, "bucket": bucket_name, "object": object_name, "code": error.code},
+            )
+            raise StorageError(operation, bucket_name, object_name, error.code, error.message) from error
+
+        self.breaker.record_failure()
+        if isinstance(error, S3Error):
+            return error.code
+        if isinstance(error, (MinioException, urllib3.exceptions.HTTPError, OSError)):
+            return type(error).__name__
+        # Не сбой хранилища (ошибка в коде, прерывание) - не повторяется
+        if isinstance(error, Exception):
+            self._failed += 1
+            metrics.inc("minio_errors_total", operation=operation, code=type(error).__name__)
+        raise error
+
+    def _unavailable(
+        self,
+        operation: str,
+        bucket_name: Optional[str],
+        object_name: Optional[str],
+        error: BaseException,
+        code: str,
+        attempts: int,
+    ) -> StorageUnavailableError:
+        self._failed += 1
+        metrics.inc("minio_errors_total", operation=operation, code=code)
+        logger.warning(
+            f"MinIO {operation} unavailable after {attempts} attempt(s): {error!r}",
+            extra={"operation": operation, "bucket": bucket_name, "object": object_name, "code": code},
+        )
+        return StorageUnavailableError(
+            operation, bucket_name, object_name, code=code, message=str(error),
+            retry_after=self.breaker.retry_after(),
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "breaker": self.breaker.stats(),
+            "retried": self._retried,
+            "failed": self._failed,
+            "pool_size": self.pool_size,
+            "presigned": self.url_cache.stats(),
+        }
+
     def bucket_exists(self, bucket_name: str) -> bool:
-        try:
-            return self.client.bucket_exists(bucket_name)
-        except S3Error as e:
-            print(f"Ошибка проверки бакета: {e}")
-            return False
+        return self._call("bucket_exists", bucket_name, None, lambda: self.client.bucket_exists(bucket_name))
     
     def create_bucket(self, bucket_name: str) -> bool:
-        try:
-            if not self.bucket_exists(bucket_name):
-                self.client.make_bucket(bucket_name)
-                print(f" Бакет '{bucket_name}' создан")
-                return True
-            else:
-                print(f"ℹ Бакет '{bucket_name}' уже существует")
-                return False
-        except S3Error as e:
-            print(f" Ошибка создания бакета: {e}")
+        if self.bucket_exists(bucket_name):
+            logger.info(f"Bucket '{bucket_name}' already exists")
             return False
+        self._call("make_bucket", bucket_name, None, lambda: self.client.make_bucket(bucket_name), idempotent=False)
+        logger.info(f"Bucket '{bucket_name}' created")
+        return True
     
     def upload_file(
         self,
@@ -51,27 +267,20 @@ class MinIOStorage:
         file_path: str,
         object_name: Optional[str] = None,
         content_type: str = "application/octet-stream",
-    ) -> Optional[str]:
-        try:
-            if object_name is None:
-                object_name = os.path.basename(file_path)
-            
-            # Загрузить файл
-            self.client.fput_object(
-                bucket_name=bucket_name,
-                object_name=object_name,
-                file_path=file_path,
-                content_type=content_type,
-            )
-            
-            file_url = f"http://{self.endpoint}/{bucket_name}/{object_name}"
-            print(f" Файл '{object_name}' загружен в '{bucket_name}'")
-            print(f"  URL: {file_url}")
-            return file_url
-        
-        except S3Error as e:
-            print(f" Ошибка загрузки файла: {e}")
-            return None
+    ) -> str:
+        if object_name is None:
+            object_name = os.path.basename(file_path)
+
+        # Загрузить файл (при повторе файл читается заново - операция идемпотентна)
+        self._call("upload_file", bucket_name, object_name, lambda: self.client.fput_object(
+            bucket_name=bucket_name,
+            object_name=object_name,
+            file_path=file_path,
+            content_type=content_type,
+        ))
+        self.url_cache.invalidate(bucket_name, object_name)
+        logger.debug(f"Uploaded '{file_path}' to {bucket_name}/{object_name}")
+        return f"http://{self.endpoint}/{bucket_name}/{object_name}"
     
     def upload_bytes(
         self,
@@ -79,24 +288,86 @@ class MinIOStorage:
         object_name: str,
         data: bytes,
         content_type: str = "application/octet-stream",
-    ) -> Optional[str]:
+    ) -> str:
+        self._call("upload_bytes", bucket_name, object_name, lambda: self.client.put_object(
+            bucket_name=bucket_name,
+            object_name=object_name,
+            data=BytesIO(data),
+            length=len(data),
+            content_type=content_type,
+        ))
+        self.url_cache.invalidate(bucket_name, object_name)
+        logger.debug(f"Uploaded {len(data)} bytes to {bucket_name}/{object_name}")
+        return f"http://{self.endpoint}/{bucket_name}/{object_name}"
+
+    # --- Составная (multipart) загрузка: объект собирается из частей, загружаемых по отдельности ---
+    # У Minio нет публичных методов для отдельных частей, поэтому вызываются
+    # внутренние (_create_multipart_upload...). Их сигнатуры проверяет
+    # tests/test_uploads.py - при обновлении minio из requirements.txt смотреть туда.
+
+    def start_multipart_upload(
+        self,
+        bucket_name: str,
+        object_name: str,
+        content_type: str = "application/octet-stream",
+    ) -> str:
+        """Начать составную загрузку; возвращает upload_id"""
+        return self._call(
+            "start_multipart_upload", bucket_name, object_name,
+            lambda: self.client._create_multipart_upload(bucket_name, object_name, {"Content-Type": content_type}),
+            idempotent=False,
+        )
+
+    def upload_part(
+        self,
+        bucket_name: str,
+        object_name: str,
+        upload_id: str,
+        part_number: int,
+        data: bytes,
+        md5_base64: str,
+    ) -> str:
+        """
+        Загрузить часть; MinIO сверяет её с Content-MD5 и отклоняет искажённую.
+        Возвращает ETag части. Повторная загрузка того же номера заменяет часть;
+        повторы частей делает вызывающий (StreamingUploader), здесь - одна попытка.
+        """
+        return self._call(
+            "upload_part", bucket_name, object_name,
+            lambda: self.client._upload_part(
+                bucket_name, object_name, data, {"Content-MD5": md5_base64}, upload_id, part_number,
+            ),
+            idempotent=False,
+        )
+
+    def complete_multipart_upload(
+        self,
+        bucket_name: str,
+        object_name: str,
+        upload_id: str,
+        parts: List[Tuple[int, str]],
+    ) -> str:
+        """Собрать объект из частей [(номер, etag)]; возвращает ETag объекта"""
+        result = self._call(
+            "complete_multipart_upload", bucket_name, object_name,
+            lambda: self.client._complete_multipart_upload(
+                bucket_name, object_name, upload_id, [Part(number, etag) for number, etag in parts],
+            ),
+            idempotent=False,
+        )
+        self.url_cache.invalidate(bucket_name, object_name)
+        return result.etag
+
+    def abort_multipart_upload(self, bucket_name: str, object_name: str, upload_id: str):
+        """Отменить составную загрузку и освободить уже загруженные части"""
         try:
-            data_stream = BytesIO(data)
-            self.client.put_object(
-                bucket_name=bucket_name,
-                object_name=object_name,
-                data=data_stream,
-                length=len(data),
-                content_type=content_type,
+            self._call(
+                "abort_multipart_upload", bucket_name, object_name,
+                lambda: self.client._abort_multipart_upload(bucket_name, object_name, upload_id),
             )
-            
-            file_url = f"http://{self.endpoint}/{bucket_name}/{object_name}"
-            print(f" Объект '{object_name}' загружен в '{bucket_name}'")
-            return file_url
-        
-        except S3Error as e:
-            print(f"Ошибка загрузки объекта: {e}")
-            return None
+        except (StorageError, S3Error) as e:
+            # Незавершённые части уберёт политика жизненного цикла бакета
+            logger.warning(f"Abort of multipart upload {upload_id} failed: {e}")
     
     def download_file(
         self,
@@ -104,75 +375,296 @@ class MinIOStorage:
         object_name: str,
         file_path: str,
     ) -> bool:
+        """Скачать объект в файл; False - объекта нет"""
         try:
-            self.client.fget_object(
+            self._call("download_file", bucket_name, object_name, lambda: self.client.fget_object(
                 bucket_name=bucket_name,
                 object_name=object_name,
                 file_path=file_path,
-            )
-            print(f"Файл '{object_name}' скачан в '{file_path}'")
-            return True
-        
-        except S3Error as e:
-            print(f"Ошибка скачивания файла: {e}")
+            ))
+        except S3Error:
             return False
+        logger.debug(f"Downloaded {bucket_name}/{object_name} to '{file_path}'")
+        return True
     
     def download_bytes(
         self,
         bucket_name: str,
         object_name: str,
     ) -> Optional[bytes]:
-        try:
+        """Содержимое объекта; None - объекта нет"""
+
+        def read() -> bytes:
             response = self.client.get_object(bucket_name, object_name)
-            data = response.read()
-            response.close()
-            print(f" Объект '{object_name}' скачан ({len(data)} байт)")
-            return data
-        
-        except S3Error as e:
-            print(f" Ошибка скачивания объекта: {e}")
+            try:
+                return response.read()
+            finally:
+                response.close()
+                response.release_conn()
+
+        try:
+            return self._call("download_bytes", bucket_name, object_name, read)
+        except S3Error:
             return None
-    
-    def delete_object(self, bucket_name: str, object_name: str) -> bool:
 
+    def stat_object(self, bucket_name: str, object_name: str) -> Optional[Dict[str, Any]]:
+        """Размер, ETag, тип и время изменения объекта; None, если объекта нет"""
         try:
-            self.client.remove_object(bucket_name, object_name)
-            print(f" Объект '{object_name}' удалён из '{bucket_name}'")
-            return True
-        except S3Error as e:
-            print(f" Ошибка удаления объекта: {e}")
-            return False
+            stat = self._call("stat_object", bucket_name, object_name, lambda: self.client.stat_object(bucket_name, object_name))
+        except S3Error:
+            return None
+        return {
+            "size": stat.size,
+            "etag": stat.etag,
+            "content_type": stat.content_type,
+            "last_modified": stat.last_modified,
+        }
+
+    def open_object(self, bucket_name: str, object_name: str, offset: int = 0, length: int = 0):
+        """
+        Открытый ответ MinIO на чтение диапазона [offset, offset + length)
+        (length=0 - до конца). Тело читается через .stream(); после чтения
+        ответ нужно закрыть и вернуть соединение в пул (close/release_conn).
+        """
+        return self._call(
+            "open_object", bucket_name, object_name,
+            lambda: self.client.get_object(bucket_name, object_name, offset=offset, length=length),
+        )
+
+    def delete_object(self, bucket_name: str, object_name: str) -> bool:
+        """Удалить объект; в S3 удаление несуществующего объекта - тоже успех"""
+        self._call("delete_object", bucket_name, object_name, lambda: self.client.remove_object(bucket_name, object_name))
+        self.url_cache.invalidate(bucket_name, object_name)
+        logger.debug(f"Deleted {bucket_name}/{object_name}")
+        return True
     
-    def list_objects(self, bucket_name: str, prefix: str = "") -> list:
+    def delete_objects(self, bucket_name: str, object_names: Iterable[str]) -> List[Dict[str, Any]]:
+        """
+        Удалить объекты пачками по DELETE_BATCH_SIZE: один запрос S3 DeleteObjects
+        на пачку вместо запроса на объект. object_names может быть генератором
+        (например, list_objects). Возвращает ошибки по отдельным объектам
+        [{"name", "code", "message"}]; пустой список - удалено всё.
+        """
+        errors = []
+        for batch in batched(object_names, DELETE_BATCH_SIZE):
+            # remove_objects ленивый: запрос уходит при чтении результата
+            failed = self._call("delete_objects", bucket_name, None, lambda: list(
+                self.client.remove_objects(bucket_name, [DeleteObject(name) for name in batch])
+            ))
+            for name in batch:
+                self.url_cache.invalidate(bucket_name, name)
+            errors.extend({"name": e.name, "code": e.code, "message": e.message} for e in failed)
+        logger.debug(f"Batch delete in '{bucket_name}': {len(errors)} error(s)")
+        return errors
+
+    def _bulk_workers(self, workers: int) -> int:
+        # Больше потоков, чем соединений в пуле, - лишние соединения открываются и закрываются на каждый запрос
+        return max(min(workers, self.pool_size), 1)
+
+    def upload_files(
+        self,
+        bucket_name: str,
+        files: Iterable[Tuple[str, str]],
+        content_type: str = "application/octet-stream",
+        workers: int = 8,
+    ) -> List[Dict[str, Any]]:
+        """
+        Загрузить файлы [(путь к файлу, имя объекта)] в workers потоков.
+        Сбой одного файла не останавливает остальные; возвращает ошибки
+        [{"name", "code", "message"}], пустой список - загружено всё.
+        """
+        def upload(item: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+            file_path, object_name = item
+            try:
+                self.upload_file(bucket_name, file_path, object_name, content_type)
+            except (StorageError, OSError) as e:
+                return {"name": object_name, "code": getattr(e, "code", None) or type(e).__name__, "message": str(e)}
+            return None
+
+        return [error for error in bounded_map(upload, files, self._bulk_workers(workers)) if error is not None]
+
+    def download_files(
+        self,
+        bucket_name: str,
+        files: Iterable[Tuple[str, str]],
+        workers: int = 8,
+    ) -> List[Dict[str, Any]]:
+        """
+        Скачать объекты [(имя объекта, путь к файлу)] в workers потоков.
+        Возвращает ошибки [{"name", "code", "message"}]; отсутствующий объект -
+        ошибка с кодом NoSuchKey.
+        """
+        def download(item: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+            object_name, file_path = item
+            try:
+                if not self.download_file(bucket_name, object_name, file_path):
+                    return {"name": object_name, "code": "NoSuchKey", "message": "Объект не найден"}
+            except (StorageError, OSError) as e:
+                return {"name": object_name, "code": getattr(e, "code", None) or type(e).__name__, "message": str(e)}
+            return None
+
+        return [error for error in bounded_map(download, files, self._bulk_workers(workers)) if error is not None]
+
+    def list_objects(self, bucket_name: str, prefix: str = "", recursive: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        Объекты бакета по мере чтения страниц листинга (S3 отдаёт по 1000):
+        генератор, весь листинг в памяти не собирается. Сбой посреди листинга
+        повторяется с последнего полученного имени, а не с начала.
+        Нет бакета - пустой листинг.
+
+        Весь листинг - одна операция для метрик и предохранителя: время -
+        только ожидание MinIO (без обработки объектов вызывающим), исход
+        попытки учитывается на первой же странице, до выдачи объектов.
+        """
+        operation, object_name = "list_objects", prefix or None
+        last_name = None
+        waited = 0.0
         try:
-            objects = self.client.list_objects(bucket_name, prefix=prefix)
-            result = []
-            for obj in objects:
-                result.append({
-                    "name": obj.object_name,
-                    "size": obj.size,
-                    "modified": obj.last_modified,
-                })
-            print(f" Найдено {len(result)} объектов в '{bucket_name}'")
-            return result
-        
-        except S3Error as e:
-            print(f" Ошибка получения списка объектов: {e}")
-            return []
-    
+            for attempt in range(self.retries + 1):
+                self._admit(operation, bucket_name, object_name)
+                listing = None
+                answered = False
+                while True:
+                    started = time.perf_counter()
+                    try:
+                        if listing is None:
+                            listing = iter(self.client.list_objects(
+                                bucket_name, prefix=prefix, recursive=recursive, start_after=last_name,
+                            ))
+                        obj = next(listing, None)
+                    except BaseException as e:
+                        waited += time.perf_counter() - started
+                        try:
+                            code = self._attempt_failed(operation, bucket_name, object_name, e)
+                        except S3Error:
+                            return
+                        error = e
+                        break
+                    waited += time.perf_counter() - started
+                    if not answered:
+                        answered = True
+                        self.breaker.record_success()
+                    if obj is None:
+                        return
+                    last_name = obj.object_name
+                    yield {
+                        "name": obj.object_name,
+                        "size": obj.size,
+                        "modified": obj.last_modified,
+                    }
+
+                if attempt < self.retries:
+                    self._retried += 1
+                    time.sleep(backoff_delay(attempt, self.retry_base_delay, self.retry_max_delay))
+            raise self._unavailable(operation, bucket_name, object_name, error, code, self.retries + 1) from error
+        finally:
+            metrics.observe("minio_request_seconds", waited, operation=operation)
+            add_timing("minio", waited)
+
     def get_presigned_url(
         self,
         bucket_name: str,
         object_name: str,
         expiration: int = 3600,
     ) -> Optional[str]:
-        try:
-            url = self.client.presigned_get_object(
-                bucket_name,
-                object_name,
-                expires=timedelta(seconds=expiration),
-            )
+        """Подписанная ссылка на чтение объекта (из кэша, пока не подходит к концу её срок)"""
+        return self.url_cache.get(
+            (bucket_name, object_name, expiration),
+            expiration,
+            lambda: self._sign_get_url(bucket_name, object_name, expiration),
+        )
+
+    def cached_presigned_url(self, bucket_name: str, object_name: str, expiration: int = 3600) -> Optional[str]:
+        """Ссылка из кэша без обращения к подписи; None, если её нужно подписать"""
+        return self.url_cache.peek((bucket_name, object_name, expiration))
+
+    def _sign_get_url(self, bucket_name: str, object_name: str, expiration: int) -> str:
+        # Подпись считается локально (регион задан), к MinIO запроса нет
+        return self.signing_client.presigned_get_object(
+            bucket_name,
+            object_name,
+            expires=timedelta(seconds=expiration),
+        )
+
+
+class AsyncMinIOStorage:
+    """
+    Async-обёртка над MinIOStorage: блокирующие вызовы клиента MinIO
+    выполняются в ограниченном пуле потоков, обработчик ждёт их через await.
+    """
+
+    def __init__(self, storage: MinIOStorage, executor: Optional[BlockingExecutor] = None):
+        self.storage = storage
+        self.executor = executor or io_executor
+
+    async def bucket_exists(self, bucket_name: str) -> bool:
+        return await self.executor.run(self.storage.bucket_exists, bucket_name)
+
+    async def create_bucket(self, bucket_name: str) -> bool:
+        return await self.executor.run(self.storage.create_bucket, bucket_name)
+
+    async def upload_file(
+        self,
+        bucket_name: str,
+        file_path: str,
+        object_name: Optional[str] = None,
+        content_type: str = "application/octet-stream",
+    ) -> str:
+        return await self.executor.run(
+            self.storage.upload_file, bucket_name, file_path, object_name, content_type,
+        )
+
+    async def upload_bytes(
+        self,
+        bucket_name: str,
+        object_name: str,
+        data: bytes,
+        content_type: str = "application/octet-stream",
+    ) -> str:
+        return await self.executor.run(
+            self.storage.upload_bytes, bucket_name, object_name, data, content_type,
+        )
+
+    async def download_file(self, bucket_name: str, object_name: str, file_path: str) -> bool:
+        return await self.executor.run(self.storage.download_file, bucket_name, object_name, file_path)
+
+    async def download_bytes(self, bucket_name: str, object_name: str) -> Optional[bytes]:
+        return await self.executor.run(self.storage.download_bytes, bucket_name, object_name)
+
+    async def delete_object(self, bucket_name: str, object_name: str) -> bool:
+        return await self.executor.run(self.storage.delete_object, bucket_name, object_name)
+
+    async def delete_objects(self, bucket_name: str, object_names: Iterable[str]) -> List[Dict[str, Any]]:
+        return await self.executor.run(self.storage.delete_objects, bucket_name, object_names)
+
+    async def upload_files(
+        self,
+        bucket_name: str,
+        files: Iterable[Tuple[str, str]],
+        content_type: str = "application/octet-stream",
+        workers: int = 8,
+    ) -> List[Dict[str, Any]]:
+        return await self.executor.run(self.storage.upload_files, bucket_name, files, content_type, workers)
+
+    async def download_files(
+        self, bucket_name: str, files: Iterable[Tuple[str, str]], workers: int = 8,
+    ) -> List[Dict[str, Any]]:
+        return await self.executor.run(self.storage.download_files, bucket_name, files, workers)
+
+    async def list_objects(self, bucket_name: str, prefix: str = "") -> List[Dict[str, Any]]:
+        # Генератор читается целиком в пуле потоков: в async-коде листинг - список
+        return await self.executor.run(lambda: list(self.storage.list_objects(bucket_name, prefix)))
+
+    async def get_presigned_url(
+        self,
+        bucket_name: str,
+        object_name: str,
+        expiration: int = 3600,
+    ) -> Optional[str]:
+        # Ссылка из кэша - это обращение к словарю, пул потоков нужен только для подписи
+        url = self.storage.cached_presigned_url(bucket_name, object_name, expiration)
+        if url is not None:
             return url
-        except S3Error as e:
-            print(f"Ошибка создания подписанной URL: {e}")
-            return None
\ No newline at end of file
+        return await self.executor.run(
+            self.storage.get_presigned_url, bucket_name, object_name, expiration,
+        )
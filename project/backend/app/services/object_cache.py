@@ -0,0 +1,325 @@
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Ключ кэша: (бакет, объект)
+Key = Tuple[str, str]
+
+
+class CachedObject:
+    """
+    Закэшированный объект, отображённый в память (mmap): срезы data не читают
+    файл в кучу Python, страницы отдаёт кэш ОС. Файл может быть вытеснен из
+    кэша, пока объект открыт, - отображение остаётся целым до close().
+    """
+
+    def __init__(self, path: Path, size: int, etag: Optional[str]):
+        self.size = size
+        self.etag = etag
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self.data = memoryview(self._map) if self._map is not None else memoryview(b"")
+
+    def close(self):
+        self._file.close()
+        try:
+            self.data.release()
+            if self._map is not None:
+                self._map.close()
+        except BufferError:
+            # Срезы data ещё используются (например, отправляются клиенту) -
+            # отображение снимется, когда освободится последний из них
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class _Entry:
+    __slots__ = ("path", "size", "etag", "validated_at")
+
+    def __init__(self, path: Path, size: int, etag: Optional[str], validated_at: float):
+        self.path = path
+        self.size = size
+        self.etag = etag
+        self.validated_at = validated_at
+
+
+class CachedObjectStorage:
+    """
+    Кэш объектов хранилища на локальном диске (read-through) перед MinIOStorage.
+
+    Чтение (download_bytes, download_file, open) сначала ищет объект в
+    cache_dir, при промахе скачивает его из хранилища. Суммарный размер
+    ограничен max_bytes, вытесняются давно не читавшиеся объекты (LRU).
+    Одновременные промахи по одному объекту скачивают его один раз: остальные
+    потоки ждут первый. Спустя revalidate_after секунд объект сверяется с
+    хранилищем по ETag (один stat вместо скачивания). Объекты больше
+    max_object_size не кэшируются.
+
+    Остальные методы передаются хранилищу как есть; запись и удаление через
+    эту обёртку убирают объект из кэша. Кэш переживает перезапуск: имена
+    файлов - хэш ключа и ETag.
+    """
+
+    def __init__(
+        self,
+        storage: Any,
+        cache_dir: str,
+        max_bytes: int = 2 * 1024 ** 3,
+        max_object_size: int = 64 * 1024 ** 2,
+        revalidate_after: float = 300.0,
+    ):
+        self.storage = storage
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_object_size = max_object_size
+        self.revalidate_after = revalidate_after
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Key, _Entry]" = OrderedDict()
+        self._size = 0
+        self._inflight: Dict[Key, threading.Event] = {}
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "revalidations": 0,
+            "coalesced": 0,
+            "evictions": 0,
+            "bytes_served": 0,
+            "bytes_saved": 0,
+            "bytes_fetched": 0,
+            "uncacheable": 0,
+        }
+
+        # Файлы от прошлого запуска: ключ по ним не восстановить, поэтому они
+        # подхватываются при первом чтении своего объекта и вытесняются первыми
+        for tmp in self.cache_dir.glob("*.tmp"):
+            tmp.unlink()
+        self._orphans: "OrderedDict[str, Tuple[Path, int]]" = OrderedDict()
+        for path in sorted(self.cache_dir.glob("*.obj"), key=lambda p: p.stat().st_mtime):
+            size = path.stat().st_size
+            self._orphans[path.name.split(".", 1)[0]] = (path, size)
+            self._size += size
+        self._evict()
+
+    def __getattr__(self, name: str):
+        return getattr(self.storage, name)
+
+    @staticmethod
+    def _hash(key: Key) -> str:
+        return hashlib.sha1(f"{key[0]}/{key[1]}".encode("utf-8")).hexdigest()
+
+    def _file_for(self, key: Key, etag: Optional[str]) -> Path:
+        tag = (etag or "").strip('"').replace("/", "_")
+        return self.cache_dir / f"{self._hash(key)}.{tag}.obj"
+
+    def _adopt(self, key: Key) -> Optional[_Entry]:
+        """Файл этого объекта, оставшийся от прошлого запуска (под self._lock)"""
+        orphan = self._orphans.pop(self._hash(key), None)
+        if orphan is None:
+            return None
+        path, size = orphan
+        etag = path.name.split(".", 1)[1][:-len(".obj")] or None
+        entry = _Entry(path, size, etag, 0.0)  # проверить по ETag при первом чтении
+        self._entries[key] = entry
+        return entry
+
+    def _evict(self):
+        """Вытеснить старые объекты сверх max_bytes (под self._lock)"""
+        while self._size > self.max_bytes and (self._orphans or self._entries):
+            if self._orphans:
+                _, (path, size) = self._orphans.popitem(last=False)
+            else:
+                _, entry = self._entries.popitem(last=False)
+                path, size = entry.path, entry.size
+            self._size -= size
+            self._stats["evictions"] += 1
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def _drop(self, key: Key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return
+            self._size -= entry.size
+        try:
+            os.unlink(entry.path)
+        except FileNotFoundError:
+            pass
+
+    def _lookup(self, key: Key) -> Optional[_Entry]:
+        """Запись кэша, которой можно пользоваться без скачивания (со сверкой ETag, если пора)"""
+        with self._lock:
+            entry = self._entries.get(key) or self._adopt(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            fresh = time.monotonic() - entry.validated_at < self.revalidate_after
+        if fresh:
+            return entry
+
+        info = self.storage.stat_object(*key)
+        with self._lock:
+            self._stats["revalidations"] += 1
+        if info is None or info.get("etag") != entry.etag:
+            self._drop(key)
+            return None
+        entry.validated_at = time.monotonic()
+        return entry
+
+    def _fetch(self, key: Key) -> Optional[_Entry]:
+        """Скачать объект в кэш; None - объекта нет или он слишком большой для кэша"""
+        info = self.storage.stat_object(*key)
+        if info is None:
+            return None
+        if info["size"] > self.max_object_size or info["size"] > self.max_bytes:
+            with self._lock:
+                self._stats["uncacheable"] += 1
+            return None
+
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        os.close(fd)
+        try:
+            if not self.storage.download_file(key[0], key[1], tmp):
+                return None
+            path = self._file_for(key, info.get("etag"))
+            size = os.path.getsize(tmp)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+
+        entry = _Entry(path, size, info.get("etag"), time.monotonic())
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old.size
+                if old.path != path:
+                    try:
+                        os.unlink(old.path)
+                    except FileNotFoundError:
+                        pass
+            self._entries[key] = entry
+            self._size += size
+            self._stats["bytes_fetched"] += size
+            self._evict()
+        return entry
+
+    def _get(self, key: Key) -> Optional[_Entry]:
+        """Запись кэша для объекта: из кэша или скачанная (одна загрузка на все потоки)"""
+        while True:
+            entry = self._lookup(key)
+            if entry is not None:
+                with self._lock:
+                    self._stats["hits"] += 1
+                    self._stats["bytes_saved"] += entry.size
+                return entry
+
+            with self._lock:
+                waiter = self._inflight.get(key)
+                if waiter is None:
+                    done = self._inflight[key] = threading.Event()
+                    self._stats["misses"] += 1
+                else:
+                    self._stats["coalesced"] += 1
+            if waiter is not None:
+                waiter.wait()
+                continue  # объект скачан другим потоком - теперь это попадание
+
+            try:
+                return self._fetch(key)
+            finally:
+                with self._lock:
+                    del self._inflight[key]
+                done.set()
+
+    def open(self, bucket_name: str, object_name: str) -> Optional[CachedObject]:
+        """
+        Объект, отображённый в память, или None, если объекта нет или он не
+        кэшируется (тогда читать напрямую из хранилища). Закрывать после использования.
+        """
+        key = (bucket_name, object_name)
+        for _ in range(2):
+            entry = self._get(key)
+            if entry is None:
+                return None
+            try:
+                cached = CachedObject(entry.path, entry.size, entry.etag)
+            except FileNotFoundError:
+                self._drop(key)  # вытеснен между поиском и открытием
+                continue
+            with self._lock:
+                self._stats["bytes_served"] += entry.size
+            return cached
+        return None
+
+    def download_bytes(self, bucket_name: str, object_name: str) -> Optional[bytes]:
+        cached = self.open(bucket_name, object_name)
+        if cached is None:
+            return self.storage.download_bytes(bucket_name, object_name)
+        with cached:
+            return bytes(cached.data)
+
+    def download_file(self, bucket_name: str, object_name: str, file_path: str) -> bool:
+        cached = self.open(bucket_name, object_name)
+        if cached is None:
+            return self.storage.download_file(bucket_name, object_name, file_path)
+        with cached, open(file_path, "wb") as f:
+            f.write(cached.data)
+        return True
+
+    def upload_file(self, bucket_name: str, file_path: str, object_name: Optional[str] = None, *args, **kwargs):
+        self._drop((bucket_name, object_name or os.path.basename(file_path)))
+        return self.storage.upload_file(bucket_name, file_path, object_name, *args, **kwargs)
+
+    def upload_bytes(self, bucket_name: str, object_name: str, *args, **kwargs):
+        self._drop((bucket_name, object_name))
+        return self.storage.upload_bytes(bucket_name, object_name, *args, **kwargs)
+
+    def delete_object(self, bucket_name: str, object_name: str) -> bool:
+        self._drop((bucket_name, object_name))
+        return self.storage.delete_object(bucket_name, object_name)
+
+    def delete_objects(self, bucket_name: str, object_names: Iterable[str]) -> List[Dict[str, Any]]:
+        def dropped(names: Iterable[str]) -> Iterator[str]:
+            for name in names:
+                self._drop((bucket_name, name))
+                yield name
+
+        return self.storage.delete_objects(bucket_name, dropped(object_names))
+
+    def upload_files(self, bucket_name: str, files: Iterable[Tuple[str, str]], *args, **kwargs) -> List[Dict[str, Any]]:
+        def dropped(items: Iterable[Tuple[str, str]]) -> Iterator[Tuple[str, str]]:
+            for item in items:
+                self._drop((bucket_name, item[1]))
+                yield item
+
+        return self.storage.upload_files(bucket_name, dropped(files), *args, **kwargs)
+
+    def invalidate(self, bucket_name: str, object_name: str):
+        self._drop((bucket_name, object_name))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_ratio": self._stats["hits"] / lookups if lookups else 0.0,
+                "objects": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,175 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from ..CRUD.comment_repository import CommentRepository
+from ..CRUD.video_repository import VideoRepository
+from .recommendations import Leaderboard, get_leaderboard, is_listed
+from .related import TEXT_NEIGHBOURS, get_related_videos
+from .responses import Payload
+
+# Вклад одного действия в интерес к категории видео: своё видео говорит о
+# вкусах больше, чем комментарий
+COMMENT_AFFINITY = 1.0
+UPLOAD_AFFINITY = 2.0
+
+# Кандидаты: топы стольких любимых категорий, похожие на столько последних
+# видео истории и общий топ (чтобы в ленте были и новые для пользователя темы)
+FEED_CATEGORIES = 5
+HISTORY_SEEDS = 5
+HISTORY_WEIGHT = 0.5
+EXPLORATION_WEIGHT = 0.2
+
+# Место в списке кандидатов -> оценка: первое - 1, RANK_SCALE-е - 1/2
+RANK_SCALE = 10
+
+
+def _rank_score(rank: int) -> float:
+    return 1.0 / (1.0 + rank / RANK_SCALE)
+
+
+class UserHistory:
+    """
+    Действия пользователя, из которых строится лента: прокомментированные
+    видео (последние - первыми) и свои загрузки. stamp меняется с каждым новым
+    действием и служит версией ленты в кэше (одинаково во всех процессах).
+    """
+
+    __slots__ = ("user_id", "commented", "uploads", "stamp")
+
+    def __init__(self, user_id: str, comments: List[Dict[str, Any]], uploads: List[Dict[str, Any]]):
+        self.user_id = user_id
+        recent = sorted(comments, key=lambda comment: comment.get("date") or "", reverse=True)
+        self.commented = list(dict.fromkeys(comment.get("video_id") for comment in recent if comment.get("video_id")))
+        self.uploads = uploads
+        self.stamp = (
+            len(comments),
+            recent[0].get("id") if recent else None,
+            len(uploads),
+            uploads[-1].get("id") if uploads else None,
+        )
+
+    def __bool__(self) -> bool:
+        return bool(self.commented or self.uploads)
+
+
+def get_user_history(video_repo: VideoRepository, comment_repo: CommentRepository, user_id: str) -> UserHistory:
+    """История пользователя по индексам user_id репозиториев (без просмотра всех записей)"""
+    return UserHistory(user_id, comment_repo.get_by_user_id(user_id), video_repo.get_by_user_id(user_id))
+
+
+def category_affinity(history: UserHistory, leaderboard: Leaderboard) -> Dict[Any, float]:
+    """Доля интереса к каждой категории: комментарии и загрузки по категориям видео"""
+    weights: Dict[Any, float] = {}
+    for video_id in history.commented:
+        video = leaderboard.get(video_id)
+        if video is not None and video.get("category_id"):
+            weights[video["category_id"]] = weights.get(video["category_id"], 0.0) + COMMENT_AFFINITY
+    for video in history.uploads:
+        if video.get("category_id"):
+            weights[video["category_id"]] = weights.get(video["category_id"], 0.0) + UPLOAD_AFFINITY
+    total = sum(weights.values())
+    return {category_id: weight / total for category_id, weight in weights.items()} if total else {}
+
+
+def build_personal_feed(
+    video_repo: VideoRepository,
+    comment_repo: CommentRepository,
+    history: UserHistory,
+    limit: int = 20,
+) -> List[Dict[str, Any]]:
+    """
+    Лента пользователя: видео из топов любимых категорий (вес - доля интереса
+    к категории), похожие на последние прокомментированные видео и общий топ;
+    оценки кандидата из разных источников складываются. Уже прокомментированные
+    и свои видео не показываются.
+
+    Кандидатов не больше (FEED_CATEGORIES + HISTORY_SEEDS + 1) * 2 * limit:
+    топы - готовые срезы leaderboard, похожие - заранее посчитанные соседи,
+    так что время не зависит от размера каталога. Без истории - общий топ.
+    """
+    leaderboard = get_leaderboard(video_repo, "popularity")
+    if not history:
+        return leaderboard.top(limit)
+
+    seen = set(history.commented)
+    seen.update(video.get("id") for video in history.uploads)
+    depth = 2 * limit
+    scores: Dict[str, float] = {}
+    records: Dict[str, Dict[str, Any]] = {}
+
+    def add(videos: List[Dict[str, Any]], weight: float):
+        for rank, video in enumerate(videos):
+            video_id = video.get("id")
+            if video_id in seen or not is_listed(video):
+                continue
+            scores[video_id] = scores.get(video_id, 0.0) + weight * _rank_score(rank)
+            records[video_id] = video
+
+    affinity = category_affinity(history, leaderboard)
+    for category_id, share in sorted(affinity.items(), key=lambda item: item[1], reverse=True)[:FEED_CATEGORIES]:
+        add(leaderboard.top(depth, category_id), share)
+    for seed in history.commented[:HISTORY_SEEDS]:
+        similar = get_related_videos(video_repo, comment_repo, seed, min(depth, TEXT_NEIGHBOURS))
+        add(similar, HISTORY_WEIGHT / HISTORY_SEEDS)
+    add(leaderboard.top(depth), EXPLORATION_WEIGHT)
+
+    ranked = sorted(scores, key=lambda video_id: (-scores[video_id], video_id))[:limit]
+    return [records[video_id] for video_id in ranked]
+
+
+class PersonalFeedCache:
+    """
+    LRU-кэш готовых лент: (пользователь, limit) -> Payload.
+
+    Лента годна, пока не изменилась история пользователя (stamp: новый
+    комментарий или загрузка сразу дают новую ленту, в любом процессе) и не
+    старше ttl секунд - за это время топы успевают сместиться от просмотров.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[Hashable, float, Payload]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._stale = 0
+        self._evictions = 0
+
+    def peek(self, key: Hashable, stamp: Hashable) -> Optional[Payload]:
+        """Лента из кэша, если история та же и срок не вышел"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != stamp or entry[1] <= now:
+                self._misses += 1
+                if entry is not None:
+                    self._stale += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[2]
+
+    def store(self, key: Hashable, stamp: Hashable, payload: Payload) -> Payload:
+        with self._lock:
+            self._entries[key] = (stamp, time.monotonic() + self.ttl, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return payload
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": self._hits / requests if requests else 0.0,
+                "stale": self._stale,
+                "evictions": self._evictions,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
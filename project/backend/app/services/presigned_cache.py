@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class PresignedUrlCache:
+    """
+    LRU-кэш подписанных ссылок: (бакет, объект, срок действия) -> ссылка.
+
+    Ссылка выдаётся повторно, пока до истечения её срока остаётся больше
+    запаса safety_margin (но не больше половины срока), - так клиент всегда
+    получает ссылку, которой хватит на загрузку плеера и первые запросы.
+    Размер ограничен max_entries, вытесняются давно не запрашивавшиеся ссылки.
+    """
+
+    def __init__(self, max_entries: int = 10000, safety_margin: float = 300.0):
+        self.max_entries = max_entries
+        self.safety_margin = safety_margin
+        self._entries: "OrderedDict[Hashable, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._signatures = 0
+        self._evictions = 0
+
+    def _reuse_until(self, signed_at: float, expiration: int) -> float:
+        return signed_at + expiration - min(self.safety_margin, expiration / 2)
+
+    def peek(self, key: Hashable) -> Optional[str]:
+        """Ссылка из кэша, если она ещё годится (без подписи новой)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def get(self, key: Hashable, expiration: int, sign: Callable[[], Optional[str]]) -> Optional[str]:
+        """Ссылка из кэша или подписанная заново функцией sign"""
+        url = self.peek(key)
+        if url is not None:
+            return url
+
+        signed_at = time.monotonic()
+        url = sign()
+        with self._lock:
+            self._misses += 1
+            self._signatures += 1
+            if url is None:
+                return None
+            self._entries[key] = (url, self._reuse_until(signed_at, expiration))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return url
+
+    def invalidate(self, bucket_name: Optional[str] = None, object_name: Optional[str] = None):
+        """Забыть ссылки на объект (после удаления/перезаписи), бакета или все"""
+        with self._lock:
+            if bucket_name is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k[0] == bucket_name and (object_name is None or k[1] == object_name)]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": self._hits / requests if requests else 0.0,
+                "signatures": self._signatures,
+                "evictions": self._evictions,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
@@ -0,0 +1,118 @@
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+Record = Dict[str, Any]
+Key = Tuple[float, str]
+
+
+class RankedIndex:
+    """
+    Записи, упорядоченные по убыванию rank: общий список и списки по значениям
+    полей-разделов (например, category_id, user_id).
+
+    Списки ключей (-rank, id) хранятся отсортированными: первые K записей или
+    страница после заданного ключа - это bisect и срез, а изменение одной записи -
+    удаление и вставка её ключа вместо пересортировки. Подходит как производная
+    структура репозитория (метод replace).
+    """
+
+    def __init__(
+        self,
+        records: Iterable[Record],
+        rank: Callable[[Record], float],
+        partitions: Sequence[str] = (),
+        listed: Callable[[Record], bool] = lambda record: True,
+    ):
+        self._rank = rank
+        self._listed = listed
+        self._records: Dict[str, Record] = {}
+        self._keys: Dict[str, Key] = {}
+        self._all: List[Key] = []
+        self._partitions: Dict[str, Dict[Any, List[Key]]] = {field: {} for field in partitions}
+
+        for record in records:
+            record_id = record.get("id")
+            self._records[record_id] = record
+            if listed(record):
+                key = (-rank(record), record_id)
+                self._keys[record_id] = key
+                self._all.append(key)
+                for field, lists in self._partitions.items():
+                    lists.setdefault(record.get(field), []).append(key)
+        self._all.sort()
+        for lists in self._partitions.values():
+            for keys in lists.values():
+                keys.sort()
+
+    def _remove(self, record_id: str):
+        record = self._records.pop(record_id, None)
+        key = self._keys.pop(record_id, None)
+        if key is None:
+            return
+        del self._all[bisect_left(self._all, key)]
+        for field, lists in self._partitions.items():
+            keys = lists[record.get(field)]
+            del keys[bisect_left(keys, key)]
+
+    def replace(self, old: Optional[Record], new: Optional[Record]):
+        """Обновить индекс после изменения одной записи"""
+        if old is not None:
+            self._remove(old.get("id"))
+        if new is None:
+            return
+        record_id = new.get("id")
+        self._remove(record_id)
+        self._records[record_id] = new
+        if self._listed(new):
+            key = (-self._rank(new), record_id)
+            self._keys[record_id] = key
+            insort(self._all, key)
+            for field, lists in self._partitions.items():
+                insort(lists.setdefault(new.get(field), []), key)
+
+    def get(self, record_id: str) -> Optional[Record]:
+        return self._records.get(record_id)
+
+    def _keys_for(self, filters: Dict[str, Any]) -> Tuple[Sequence[Key], Dict[str, Any]]:
+        """Самый короткий список ключей под фильтры и фильтры, которые придётся проверить по записям"""
+        best: Sequence[Key] = self._all
+        best_field = None
+        for field, value in filters.items():
+            if field in self._partitions:
+                keys = self._partitions[field].get(value, ())
+                if best_field is None or len(keys) < len(best):
+                    best, best_field = keys, field
+        rest = {field: value for field, value in filters.items() if field != best_field}
+        return best, rest
+
+    def page(
+        self,
+        limit: int,
+        after: Optional[Key] = None,
+        exclude: Optional[str] = None,
+        **filters: Any,
+    ) -> Tuple[List[Record], Optional[Key]]:
+        """
+        Страница из limit записей, идущих после ключа after (курсор), и ключ
+        последней записи страницы - курсор следующей (None, если записей больше нет).
+        """
+        keys, rest = self._keys_for(filters)
+        start = bisect_right(keys, after) if after is not None else 0
+        result: List[Record] = []
+        last = None
+        for i in range(start, len(keys)):
+            if len(result) >= limit:
+                return result, last
+            key = keys[i]
+            record = self._records[key[1]]
+            if key[1] == exclude or any(record.get(f) != v for f, v in rest.items()):
+                continue
+            result.append(record)
+            last = key
+        return result, None
+
+    def top(self, limit: int, exclude: Optional[str] = None, **filters: Any) -> List[Record]:
+        return self.page(limit, exclude=exclude, **filters)[0]
+
+    def partition_values(self, field: str) -> List[Any]:
+        return [value for value, keys in self._partitions[field].items() if keys]
@@ -1,7 +1,9 @@
-import json
 from pathlib import Path
-from typing import List, Dict, Any
-from fastapi import APIRouter
+from typing import Callable, List, Dict, Any, Optional
+
+from ..CRUD.video_repository import VideoRepository
+from .ranked_index import RankedIndex
+from .video_columns import VideoColumns
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent  # backend/
 DATA_DIR = BASE_DIR / "data"
@@ -9,20 +11,74 @@ VIDEOS_FILE = DATA_DIR / "videos.json"
 
 
 def load_videos() -> List[Dict[str, Any]]:
-    """Загрузить видео из videos.json"""
-    try:
-        with open(VIDEOS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return []
-    except json.JSONDecodeError:
-        return []
+    """Загрузить видео из videos.json (вместе с ещё не свёрнутым журналом изменений)"""
+    return list(VideoRepository(str(DATA_DIR)).get_all())
+
+
+def popularity_score(video: Dict[str, Any]) -> float:
+    """Популярность: просмотры + отношение лайков к дизлайкам (по столбцам - video_columns.SCORES)"""
+    views = video.get("views", 0)
+    likes = video.get("likes", 0)
+    dislikes = video.get("dislikes", 1)
+    engagement = (likes / dislikes) if dislikes > 0 else 0
+    return views * 0.7 + engagement * 0.3
+
+
+def views_score(video: Dict[str, Any]) -> float:
+    return video.get("views", 0)
+
+
+# Leaderboard.top без категории - общий топ; None - это категория видео без category_id
+_ALL = object()
+
+
+def is_listed(video: Dict[str, Any]) -> bool:
+    """Видео попадает в ленты и топы: публичное и не удалённое"""
+    return video.get("is_public", True) and not video.get("is_deleted", False)
+
+
+class Leaderboard(RankedIndex):
+    """
+    Публичные видео, упорядоченные по убыванию score: общий топ и топ каждой категории.
+
+    top-K - это срез первых K ключей, а изменение одного видео (просмотры,
+    лайки, удаление) - перестановка одного ключа вместо пересортировки каталога.
+    """
+
+    def __init__(self, videos, score: Callable[[Dict[str, Any]], float] = popularity_score):
+        super().__init__(videos, score, partitions=("category_id",), listed=is_listed)
+
+    def top(
+        self,
+        limit: int,
+        category_id: Any = _ALL,
+        exclude: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Первые limit видео (глобально или в категории, в том числе None), без exclude"""
+        if category_id is _ALL:
+            return super().top(limit, exclude=exclude)
+        return super().top(limit, exclude=exclude, category_id=category_id)
+
+    def categories(self) -> List[Any]:
+        return self.partition_values("category_id")
+
+
+def get_leaderboard(video_repo: VideoRepository, by: str = "popularity") -> Leaderboard:
+    """
+    Топы текущего снимка videos.json: by="popularity" (popularity_score) или "views".
+
+    Строятся один раз и дальше обновляются при каждой записи через video_repo.
+    """
+    score = popularity_score if by == "popularity" else views_score
+    return video_repo.derived(("leaderboard", by), lambda videos: Leaderboard(videos, score))
 
 
 def get_category_recommendations(
     current_video_id: str,
     videos: List[Dict[str, Any]],
     limit: int = 10,
+    leaderboard: Optional[Leaderboard] = None,
+    columns: Optional[VideoColumns] = None,
 ) -> List[Dict[str, Any]]:
     """
     Рекомендует видео из той же категории, что и текущее видео.
@@ -33,7 +89,24 @@ def get_category_recommendations(
     3. Исключаем само текущее видео
     4. Сортируем по популярности (просмотры + лайки)
     5. Возвращаем top-N
+
+    С leaderboard (по popularity_score) шаги 2-4 не нужны: берём готовый топ категории.
+    Со столбцами (columns) шаги 2-4 - маска и argpartition вместо сортировки записей.
     """
+    if leaderboard is not None:
+        current_video = leaderboard.get(current_video_id)
+        if not current_video or current_video.get("is_deleted", False) or not current_video.get("category_id"):
+            return leaderboard.top(limit)
+        same_category = leaderboard.top(limit, current_video["category_id"], exclude=current_video_id)
+        return same_category or leaderboard.top(limit)
+
+    if columns is not None:
+        current_video = columns.get(current_video_id)
+        if not current_video or current_video.get("is_deleted", False) or not current_video.get("category_id"):
+            return columns.top(limit)
+        same_category = columns.top(limit, category_id=current_video["category_id"], exclude=current_video_id)
+        return same_category or columns.top(limit)
+
     current_video = None
     for v in videos:
         if v.get("id") == current_video_id and not v.get("is_deleted", False):
@@ -58,13 +131,6 @@ def get_category_recommendations(
     if not same_category:
         return get_trending_videos(videos, limit)
     
-    def popularity_score(video):
-        views = video.get("views", 0)
-        likes = video.get("likes", 0)
-        dislikes = video.get("dislikes", 1)
-        engagement = (likes / dislikes) if dislikes > 0 else 0
-        return views * 0.7 + engagement * 0.3
-    
     same_category = sorted(same_category, key=popularity_score, reverse=True)
     return same_category[:limit]
 
@@ -72,31 +138,39 @@ def get_category_recommendations(
 def get_trending_videos(
     videos: List[Dict[str, Any]],
     limit: int = 10,
+    leaderboard: Optional[Leaderboard] = None,
+    columns: Optional[VideoColumns] = None,
 ) -> List[Dict[str, Any]]:
-    """Возвращает тренды: самые популярные видео"""
+    """Возвращает тренды: самые популярные видео (из leaderboard или columns, если переданы)"""
+    if leaderboard is not None:
+        return leaderboard.top(limit)
+    if columns is not None:
+        return columns.top(limit)
+
     active_videos = [
         v for v in videos
         if v.get("is_public", True) and not v.get("is_deleted", False)
     ]
     
-    def score(video):
-        views = video.get("views", 0)
-        likes = video.get("likes", 0)
-        dislikes = video.get("dislikes", 1)
-        engagement = (likes / dislikes) if dislikes > 0 else 0
-        return views * 0.7 + engagement * 0.3
-    
-    active_videos = sorted(active_videos, key=score, reverse=True)
+    active_videos = sorted(active_videos, key=popularity_score, reverse=True)
     return active_videos[:limit]
 
 
+# sort_by get_videos_by_category -> оценка VideoColumns
+COLUMN_SORTS = {"views": "views", "likes": "likes", "recent": "date"}
+
+
 def get_videos_by_category(
     category_id: str,
     videos: List[Dict[str, Any]],
     limit: int = 10,
     sort_by: str = "views",
+    columns: Optional[VideoColumns] = None,
 ) -> List[Dict[str, Any]]:
-    """Возвращает видео по категории с сортировкой"""
+    """Возвращает видео по категории с сортировкой (по столбцам, если переданы columns)"""
+    if columns is not None and sort_by in COLUMN_SORTS:
+        return columns.top(limit, COLUMN_SORTS[sort_by], category_id=category_id)
+
     category_videos = [
         v for v in videos
         if v.get("category_id") == category_id
@@ -129,8 +203,24 @@ def get_videos_by_category(
 def get_all_categories_with_top_videos(
     videos: List[Dict[str, Any]],
     top_per_category: int = 3,
+    leaderboard: Optional[Leaderboard] = None,
+    columns: Optional[VideoColumns] = None,
 ) -> List[Dict[str, Any]]:
-    """Возвращает все категории с топ-видео в каждой"""
+    """Возвращает все категории с топ-видео (по просмотрам) в каждой"""
+    if leaderboard is not None:
+        return [
+            {
+                "category_id": cat_id,
+                "top_videos": leaderboard.top(top_per_category, cat_id),
+            }
+            for cat_id in leaderboard.categories()
+        ]
+    if columns is not None:
+        return [
+            {"category_id": cat_id, "top_videos": top_videos}
+            for cat_id, top_videos in columns.top_per_category(top_per_category, "views").items()
+        ]
+
     videos_by_cat = {}
     for v in videos:
         if v.get("is_public", True) and not v.get("is_deleted", False):
@@ -0,0 +1,497 @@
+import heapq
+import math
+import weakref
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # без NumPy похожие видео подбираются только по комментаторам и категории
+    np = None
+
+from ..CRUD.comment_repository import CommentRepository
+from ..CRUD.video_repository import VideoRepository
+from .recommendations import get_category_recommendations, get_leaderboard, is_listed
+from .search import FIELD_WEIGHTS, tokenize
+
+# Сколько соседей по тексту хранится на видео - с запасом: часть может стать скрытой
+TEXT_NEIGHBOURS = 32
+# Самые частые слова (в большей доле видео, не больше DENSE_TERMS) при пакетном
+# расчёте идут плотной матрицей видео x слово (умножение BLAS): по спискам
+# видео пары с ними стоили бы квадрат частоты
+DENSE_FREQUENCY = 0.01
+DENSE_TERMS = 64
+# Ячеек матрицы оценок (и пар видео по спискам) в одном блоке пакетного расчёта - ограничение памяти
+BLOCK_CELLS = 4_000_000
+# Снимок, перечитанный после записи другого процесса, переносит соседей прошлого
+# снимка, если тексты изменились не больше чем у такой доли видео
+REFRESH_MAX_CHANGES = 0.05
+
+# Комментатор больше стольких видео не связывает их между собой (боты, модераторы)
+CO_COMMENT_MAX_USER_VIDEOS = 50
+
+# Вклады сигналов в итоговую оценку похожести
+TEXT_WEIGHT = 0.6
+CO_COMMENT_WEIGHT = 0.4
+CATEGORY_BONUS = 0.1
+
+
+def _text_fields(video: Dict[str, Any]) -> Tuple[Any, ...]:
+    return tuple(video.get(field) for field, _ in FIELD_WEIGHTS)
+
+
+def _term_counts(video: Dict[str, Any]) -> Dict[str, float]:
+    terms: Dict[str, float] = {}
+    for field, weight in FIELD_WEIGHTS:
+        for term in tokenize(video.get(field)):
+            terms[term] = terms.get(term, 0) + weight
+    return terms
+
+
+class TextNeighbours:
+    """
+    Похожие по тексту видео: TF-IDF векторы названия и описания (поля с
+    весами как в поиске), косинусная близость, для каждого видео - top-N
+    соседей, посчитанных заранее.
+
+    Соседи всех видео считаются пакетно (NumPy), блоками строк: вклад частых
+    слов - умножение плотных матриц, остальных - суммирование пар видео по
+    спискам видео каждого слова (bincount), top-N - argpartition. Хранятся две
+    матрицы ёмкость x N: номера соседей (int32, -1 - пусто) и оценки
+    (float32), так что соседи видео - одна строка.
+
+    Производная структура репозитория видео. idf фиксируется при построении
+    (как средняя длина в поиске): новое видео или новый текст считается
+    одним проходом по спискам своих слов и вставляется в строки тех видео,
+    чей N-й сосед похож меньше. Скрытое или удалённое видео просто
+    выключается - в чужих строках оно пропускается при выдаче, поэтому
+    соседей со временем может стать меньше N до перечитывания снимка.
+    """
+
+    def __init__(self, videos: Iterable[Dict[str, Any]], neighbours: int = TEXT_NEIGHBOURS):
+        self.size = neighbours
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._positions: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._vocabulary: Dict[str, int] = {}
+        self._postings: Dict[int, Tuple["np.ndarray", "np.ndarray"]] = {}
+
+        videos = [video for video in videos if is_listed(video)]
+        counts = [_term_counts(video) for video in videos]
+        for video in videos:
+            self._records[video["id"]] = video
+            self._positions[video["id"]] = len(self._ids)
+            self._ids.append(video["id"])
+
+        n = len(videos)
+        lengths = np.fromiter((len(terms) for terms in counts), dtype=np.int64, count=n)
+        columns = np.fromiter(
+            (self._vocabulary.setdefault(term, len(self._vocabulary)) for terms in counts for term in terms),
+            dtype=np.int32,
+        )
+        tf = np.fromiter((count for terms in counts for count in terms.values()), dtype=np.float32)
+        rows = np.repeat(np.arange(n, dtype=np.int32), lengths)
+
+        df = np.bincount(columns, minlength=len(self._vocabulary))
+        self._n = n
+        self._idf = np.log((1 + n) / (1 + df)).astype(np.float32)
+
+        weights = (1 + np.log(tf)) * self._idf[columns]
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=n)).astype(np.float32)
+        weights /= np.where(norms > 0, norms, 1)[rows]
+        keep = weights > 0
+        rows, columns, weights = rows[keep], columns[keep], weights[keep]
+
+        order = np.argsort(columns, kind="stable")
+        term_starts = np.searchsorted(columns[order], np.arange(len(self._vocabulary) + 1))
+        postings = (rows[order], weights[order], term_starts)
+        for term in np.flatnonzero(np.diff(term_starts)):
+            chunk = slice(term_starts[term], term_starts[term + 1])
+            self._postings[int(term)] = (postings[0][chunk], postings[1][chunk])
+
+        capacity = max(n, 16)
+        self._active = np.zeros(capacity, dtype=bool)
+        self._active[:n] = True
+        self._neighbours = np.full((capacity, self.size), -1, dtype=np.int32)
+        self._scores = np.zeros((capacity, self.size), dtype=np.float32)
+
+        frequent = np.argsort(-df, kind="stable")[:DENSE_TERMS]
+        frequent = frequent[df[frequent] > DENSE_FREQUENCY * n]
+        self._build(rows, columns, weights, postings, frequent)
+
+    def _build(self, rows, columns, weights, postings, frequent):
+        n = self._n
+        k = min(self.size, n - 1)
+        if k <= 0:
+            return
+        # Частые слова - плотная матрица видео x слово, остальные - пары видео по спискам
+        dense_column = np.full(len(self._vocabulary), -1, dtype=np.int64)
+        dense_column[frequent] = np.arange(len(frequent))
+        in_dense = dense_column[columns] >= 0
+        dense = np.zeros((n, len(frequent)), dtype=np.float32)
+        dense[rows[in_dense], dense_column[columns[in_dense]]] = weights[in_dense]
+        rows, columns, weights = rows[~in_dense], columns[~in_dense], weights[~in_dense]
+        posting_rows, posting_weights, term_starts = postings
+
+        block = max(1, BLOCK_CELLS // n)
+        for start in range(0, n, block):
+            end = min(start + block, n)
+            scores = dense[start:end] @ dense.T
+            lo, hi = np.searchsorted(rows, (start, end))
+            lengths = term_starts[columns[lo:hi] + 1] - term_starts[columns[lo:hi]]
+            # Слова строк блока по частям - не больше BLOCK_CELLS пар видео за раз
+            cuts = np.searchsorted(np.cumsum(lengths), np.arange(BLOCK_CELLS, lengths.sum(), BLOCK_CELLS))
+            for a, b in zip(np.concatenate([[0], cuts]), np.concatenate([cuts, [hi - lo]])):
+                part = lengths[a:b]
+                if not part.sum():
+                    continue
+                offsets = np.repeat(term_starts[columns[lo + a:lo + b]] - np.cumsum(part) + part, part)
+                offsets += np.arange(len(offsets))
+                cells = np.repeat((rows[lo + a:lo + b] - start).astype(np.int64) * n, part) + posting_rows[offsets]
+                products = np.repeat(weights[lo + a:lo + b], part) * posting_weights[offsets]
+                scores += np.bincount(cells, weights=products, minlength=(end - start) * n).reshape(end - start, n)
+            local = np.arange(end - start)
+            scores[local, local + start] = 0
+            self._store_top(start, scores, k)
+
+    def _store_top(self, start: int, scores: "np.ndarray", k: int):
+        # Первые k оценок каждой строки по убыванию; нулевые (ничего общего) - пустые места
+        top = np.argpartition(scores, scores.shape[1] - k, axis=1)[:, -k:]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        end = start + len(scores)
+        self._neighbours[start:end, :k] = np.where(top_scores > 0, top, -1)
+        self._scores[start:end, :k] = np.where(top_scores > 0, top_scores, 0)
+
+    def _vector(self, video: Dict[str, Any]) -> Tuple["np.ndarray", "np.ndarray"]:
+        counts = _term_counts(video)
+        columns, weights = [], []
+        for term, count in counts.items():
+            column = self._vocabulary.get(term)
+            if column is None:
+                # Новое слово: idf как у слова из одного видео
+                column = self._vocabulary[term] = len(self._idf)
+                self._idf = np.append(self._idf, np.float32(math.log((1 + self._n) / 2)))
+            idf = self._idf[column]
+            if idf > 0:
+                columns.append(column)
+                weights.append((1 + math.log(count)) * idf)
+        columns = np.array(columns, dtype=np.int32)
+        weights = np.array(weights, dtype=np.float32)
+        norm = np.sqrt(np.dot(weights, weights))
+        return columns, weights / norm if norm > 0 else weights
+
+    def _add(self, video: Dict[str, Any]):
+        position = len(self._ids)
+        if position == len(self._active):
+            grow = len(self._active)
+            self._active = np.concatenate([self._active, np.zeros(grow, dtype=bool)])
+            self._neighbours = np.concatenate([self._neighbours, np.full((grow, self.size), -1, dtype=np.int32)])
+            self._scores = np.concatenate([self._scores, np.zeros((grow, self.size), dtype=np.float32)])
+        self._ids.append(video["id"])
+        self._records[video["id"]] = video
+        self._positions[video["id"]] = position
+
+        columns, weights = self._vector(video)
+        scores = np.zeros(position + 1, dtype=np.float32)
+        for column, weight in zip(columns.tolist(), weights.tolist()):
+            postings = self._postings.get(column)
+            if postings is None:
+                self._postings[column] = (np.array([position], dtype=np.int32), np.array([weight], dtype=np.float32))
+            else:
+                scores[postings[0]] += weight * postings[1]
+                self._postings[column] = (np.append(postings[0], np.int32(position)),
+                                          np.append(postings[1], np.float32(weight)))
+        scores[~self._active[:position + 1]] = 0
+        self._active[position] = True
+        scores[position] = 0
+
+        k = min(self.size, position)
+        if k > 0:
+            self._store_top(position, scores[None, :], k)
+        # Новое видео - сосед тех, у кого оно похожее последнего из N
+        closer = np.flatnonzero(scores[:position] > self._scores[:position, -1])
+        if len(closer):
+            self._neighbours[closer, -1] = position
+            self._scores[closer, -1] = scores[closer]
+            order = np.argsort(-self._scores[closer], axis=1, kind="stable")
+            self._neighbours[closer] = np.take_along_axis(self._neighbours[closer], order, axis=1)
+            self._scores[closer] = np.take_along_axis(self._scores[closer], order, axis=1)
+
+    def _remove(self, video_id: str):
+        position = self._positions.pop(video_id, None)
+        if position is not None:
+            self._records.pop(video_id, None)
+            self._active[position] = False
+
+    def replace(self, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]):
+        """Обновить соседей после изменения одного видео"""
+        if new is not None:
+            current = self._records.get(new.get("id"))
+            if current is not None and is_listed(new) and _text_fields(current) == _text_fields(new):
+                # Изменились только счётчики или служебные поля - текст тот же
+                self._records[new["id"]] = new
+                return
+        if old is not None:
+            self._remove(old.get("id"))
+        if new is not None:
+            self._remove(new.get("id"))
+            if is_listed(new):
+                self._add(new)
+
+    def refresh(self, videos: Iterable[Dict[str, Any]]) -> bool:
+        """
+        Перенести соседей на новый снимок (перечитанный после записи другого
+        процесса): видео с изменённым текстом пересчитываются как в replace,
+        остальным обновляются записи. False - изменилось слишком много (или
+        накопилось слишком много выключенных мест), дешевле построить заново.
+        """
+        listed = {video["id"]: video for video in videos if is_listed(video)}
+        changed = [
+            video for video_id, video in listed.items()
+            if video_id not in self._records or _text_fields(self._records[video_id]) != _text_fields(video)
+        ]
+        removed = [video_id for video_id in self._records if video_id not in listed]
+        if (
+            len(changed) + len(removed) > REFRESH_MAX_CHANGES * len(listed)
+            or len(self._ids) + len(changed) > 2 * len(listed)
+        ):
+            return False
+        for video_id in removed:
+            self._remove(video_id)
+        for video in changed:
+            self._remove(video["id"])
+            self._add(video)
+        self._records.update(listed)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def neighbours(self, video_id: str) -> List[Tuple[str, float]]:
+        """(id видео, косинусная близость) по убыванию близости, не больше N"""
+        position = self._positions.get(video_id)
+        if position is None:
+            return []
+        neighbours, scores, active = self._neighbours[position], self._scores[position], self._active
+        return [
+            (self._ids[other], score)
+            for other, score in zip(neighbours.tolist(), scores.tolist())
+            if other >= 0 and active[other]
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "videos": len(self._records),
+            "vocabulary": len(self._vocabulary),
+            "bytes": self._neighbours.nbytes + self._scores.nbytes,
+        }
+
+
+class CoComments:
+    """
+    Видео, которые комментировали одни и те же люди: для пары видео - число
+    общих комментаторов, для видео - число комментаторов (для нормировки).
+
+    Производная структура репозитория комментариев: новый или удалённый
+    комментарий меняет только пары видео его автора. Автор больше
+    CO_COMMENT_MAX_USER_VIDEOS видео пары не образует - иначе один активный
+    комментатор связал бы тысячи видео и стоил бы квадрат их числа.
+
+    Лучшие TEXT_NEIGHBOURS пар видео запоминаются при первом запросе и
+    сбрасываются, когда меняются пары или число комментаторов видео.
+    """
+
+    def __init__(self, comments: Iterable[Dict[str, Any]]):
+        self._comments: Dict[Tuple[str, str], int] = {}
+        self._user_videos: Dict[str, Dict[str, None]] = {}
+        self._commenters: Dict[str, int] = {}
+        self._pairs: Dict[str, Dict[str, int]] = {}
+        self._top: Dict[str, List[Tuple[str, float]]] = {}
+        # Растёт при каждой записи: лучшие пары, посчитанные до неё, не запоминаются
+        self._generation = 0
+
+        for comment in comments:
+            key = self._key(comment)
+            if key is not None:
+                self._comments[key] = self._comments.get(key, 0) + 1
+        for user_id, video_id in self._comments:
+            self._user_videos.setdefault(user_id, {})[video_id] = None
+            self._commenters[video_id] = self._commenters.get(video_id, 0) + 1
+        for videos in self._user_videos.values():
+            if len(videos) <= CO_COMMENT_MAX_USER_VIDEOS:
+                self._link_all(videos, 1)
+
+    @staticmethod
+    def _key(comment: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+        if comment.get("is_deleted", False) or not comment.get("user_id") or not comment.get("video_id"):
+            return None
+        return comment["user_id"], comment["video_id"]
+
+    def _link(self, video_id: str, other: str, delta: int):
+        for a, b in ((video_id, other), (other, video_id)):
+            self._top.pop(a, None)
+            pairs = self._pairs.setdefault(a, {})
+            count = pairs.get(b, 0) + delta
+            if count > 0:
+                pairs[b] = count
+            else:
+                pairs.pop(b, None)
+                if not pairs:
+                    del self._pairs[a]
+
+    def _link_all(self, videos: Iterable[str], delta: int):
+        linked = list(videos)
+        for i, video_id in enumerate(linked):
+            for other in linked[i + 1:]:
+                self._link(video_id, other, delta)
+
+    def _count(self, video_id: str, delta: int):
+        # Число комментаторов входит в оценку всех пар видео
+        for other in self._pairs.get(video_id, ()):
+            self._top.pop(other, None)
+        count = self._commenters.get(video_id, 0) + delta
+        if count > 0:
+            self._commenters[video_id] = count
+        else:
+            self._commenters.pop(video_id, None)
+
+    def _add(self, user_id: str, video_id: str):
+        videos = self._user_videos.setdefault(user_id, {})
+        self._count(video_id, 1)
+        if len(videos) == CO_COMMENT_MAX_USER_VIDEOS:
+            self._link_all(videos, -1)  # автор перестаёт связывать видео
+        elif len(videos) < CO_COMMENT_MAX_USER_VIDEOS:
+            for other in videos:
+                self._link(video_id, other, 1)
+        videos[video_id] = None
+
+    def _discard(self, user_id: str, video_id: str):
+        videos = self._user_videos[user_id]
+        del videos[video_id]
+        self._count(video_id, -1)
+        if len(videos) == CO_COMMENT_MAX_USER_VIDEOS:
+            self._link_all(videos, 1)
+        elif len(videos) < CO_COMMENT_MAX_USER_VIDEOS:
+            for other in videos:
+                self._link(video_id, other, -1)
+        if not videos:
+            del self._user_videos[user_id]
+
+    def replace(self, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]):
+        """Обновить пары после изменения одного комментария"""
+        old_key = self._key(old) if old is not None else None
+        new_key = self._key(new) if new is not None else None
+        if old_key == new_key:
+            return
+        self._generation += 1
+        if old_key is not None and old_key in self._comments:
+            self._comments[old_key] -= 1
+            if not self._comments[old_key]:
+                del self._comments[old_key]
+                self._discard(*old_key)
+        if new_key is not None:
+            self._comments[new_key] = self._comments.get(new_key, 0) + 1
+            if self._comments[new_key] == 1:
+                self._add(*new_key)
+
+    def neighbours(self, video_id: str, limit: int) -> List[Tuple[str, float]]:
+        """(id видео, общих комментаторов / sqrt(произведения числа комментаторов)) - лучшие limit"""
+        top = self._top.get(video_id)
+        if top is None:
+            generation = self._generation
+            pairs = self._pairs.get(video_id)
+            if not pairs:
+                return []
+            commenters = self._commenters
+            own = commenters[video_id]
+            best = heapq.nlargest(
+                TEXT_NEIGHBOURS, list(pairs.items()), key=lambda item: item[1] / math.sqrt(commenters[item[0]]),
+            )
+            top = [(other, common / math.sqrt(own * commenters[other])) for other, common in best]
+            if generation == self._generation:
+                self._top[video_id] = top
+        return top[:limit]
+
+
+# Последние соседи по тексту каждого репозитория видео - для переноса на следующий снимок
+_text_neighbours: "weakref.WeakKeyDictionary[VideoRepository, TextNeighbours]" = weakref.WeakKeyDictionary()
+
+
+def get_text_neighbours(video_repo: VideoRepository) -> Optional[TextNeighbours]:
+    """
+    Соседи по тексту для текущего снимка видео; None, если NumPy не установлен.
+
+    Пакетный расчёт квадратичен по числу видео, поэтому снимок, перечитанный
+    после чужой записи (обычно - счётчики просмотров), получает соседей
+    прошлого снимка через refresh(), а не считает их заново.
+    """
+    if np is None:
+        return None
+
+    def build(videos):
+        structure = _text_neighbours.get(video_repo)
+        if structure is None or not structure.refresh(videos):
+            structure = TextNeighbours(videos)
+        _text_neighbours[video_repo] = structure
+        return structure
+
+    return video_repo.derived("related_text", build)
+
+
+def text_neighbours_ready(video_repo: VideoRepository) -> bool:
+    """Соседи по тексту уже посчитаны: следующим снимкам - только дешёвый перенос (refresh)"""
+    return np is None or video_repo in _text_neighbours
+
+
+def get_co_comments(comment_repo: CommentRepository) -> CoComments:
+    """Пары видео с общими комментаторами для текущего снимка комментариев"""
+    return comment_repo.derived("co_comments", CoComments)
+
+
+def get_related_videos(
+    video_repo: VideoRepository,
+    comment_repo: CommentRepository,
+    video_id: str,
+    limit: int = 10,
+) -> List[Dict[str, Any]]:
+    """
+    Похожие видео: TEXT_WEIGHT * близость текста + CO_COMMENT_WEIGHT * доля
+    общих комментаторов + CATEGORY_BONUS за ту же категорию. Кандидаты - из
+    заранее посчитанных соседей (не больше N по каждому сигналу), так что
+    время ответа не зависит от размера каталога. Если похожих меньше limit,
+    список дополняется топом категории (как get_category_recommendations).
+    """
+    leaderboard = get_leaderboard(video_repo, "popularity")
+    current = leaderboard.get(video_id)
+    if current is None or current.get("is_deleted", False):
+        return leaderboard.top(limit)
+
+    scores: Dict[str, float] = {}
+    text = get_text_neighbours(video_repo)
+    if text is not None:
+        for other, score in text.neighbours(video_id):
+            scores[other] = TEXT_WEIGHT * score
+    for other, score in get_co_comments(comment_repo).neighbours(video_id, TEXT_NEIGHBOURS):
+        scores[other] = scores.get(other, 0.0) + CO_COMMENT_WEIGHT * score
+
+    candidates = []
+    for other, score in scores.items():
+        video = leaderboard.get(other)
+        if video is None or other == video_id or not is_listed(video):
+            continue
+        if current.get("category_id") and video.get("category_id") == current.get("category_id"):
+            score += CATEGORY_BONUS
+        candidates.append((score, other, video))
+    related = [video for _, _, video in heapq.nlargest(limit, candidates, key=lambda item: (item[0], item[1]))]
+
+    if len(related) < limit:
+        seen = {video["id"] for video in related}
+        seen.add(video_id)
+        for video in get_category_recommendations(video_id, [], limit + len(seen), leaderboard=leaderboard):
+            if video["id"] not in seen:
+                related.append(video)
+                if len(related) == limit:
+                    break
+    return related
@@ -0,0 +1,85 @@
+import random
+import threading
+import time
+from typing import Any, Dict
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Пауза перед повтором номер attempt (с 0): экспонента со случайным разбросом (full jitter)"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """
+    Предохранитель для внешнего сервиса.
+
+    После failure_threshold сбоев подряд размыкается: allow() сразу отвечает
+    False, и вызовы не ждут таймаутов недоступного сервиса. Через reset_timeout
+    секунд пропускает один пробный вызов: успех замыкает цепь, сбой снова
+    размыкает её на reset_timeout.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._rejected = 0
+        self._trips = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self._rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._trips += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def retry_after(self) -> float:
+        """Через сколько секунд будет пробный вызов (для заголовка Retry-After)"""
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0.0
+            return max(self.reset_timeout - (time.monotonic() - self._opened_at), 0.0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "trips": self._trips,
+                "rejected": self._rejected,
+            }
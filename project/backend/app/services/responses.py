@@ -0,0 +1,148 @@
+import gzip
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from fastapi import Response
+
+from .json_codec import dumps
+
+try:
+    import brotli
+except ImportError:  # необязательная зависимость: без неё - только gzip
+    brotli = None
+
+# Сжатие для ответов, которые отдаются многим клиентам: быстрее максимального, почти так же плотно
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 5
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Тело в кодировке Content-Encoding: "br" или "gzip" """
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, GZIP_LEVEL, mtime=0)
+
+
+class FastJSONResponse(Response):
+    """
+    JSON-ответ через json_codec (orjson, если установлен). Обработчик, который
+    возвращает такой ответ сам, минует и jsonable_encoder FastAPI - это для
+    данных, которые и так состоят из dict/list/str/чисел.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class JsonBytesResponse(Response):
+    """Уже сериализованное тело (bytes из PayloadCache)"""
+
+    media_type = "application/json"
+
+
+class Payload:
+    """
+    Сериализованный ответ: тело, его ETag и сжатые варианты тела (считаются
+    при первом запросе с такой кодировкой и дальше отдаются готовыми).
+    """
+
+    __slots__ = ("body", "etag", "_encoded", "_lock")
+
+    def __init__(self, body: bytes, etag: Optional[str] = None):
+        self.body = body
+        self.etag = etag
+        self._encoded: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def has(self, encoding: str) -> bool:
+        return encoding in self._encoded
+
+    def encoded(self, encoding: Optional[str]) -> bytes:
+        if encoding is None:
+            return self.body
+        data = self._encoded.get(encoding)
+        if data is None:
+            with self._lock:
+                data = self._encoded.get(encoding)
+                if data is None:
+                    data = self._encoded[encoding] = compress(self.body, encoding)
+        return data
+
+    def size(self) -> int:
+        return len(self.body) + sum(len(data) for data in list(self._encoded.values()))
+
+
+class PayloadCache:
+    """
+    Готовые ответы (Payload), посчитанные по одному снимку данных: популярный
+    ответ (список категорий, тренды) сериализуется и сжимается один раз, а
+    не на каждый запрос.
+
+    Это производная структура репозитория (get_payload_cache): любая запись
+    через репозиторий вызывает replace() и очищает кэш, новый снимок с диска
+    начинается с пустого кэша - устаревшие байты не отдаются.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Payload]" = OrderedDict()
+        # Растёт при каждой записи: ответы, посчитанные до неё, не сохраняются
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.clears = 0
+
+    def peek(self, key: Hashable) -> Optional[Payload]:
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return payload
+
+    def store(self, key: Hashable, payload: Payload, generation: int) -> Payload:
+        """Сохранить ответ, посчитанный по данным поколения generation (если с тех пор не было записи)"""
+        with self._lock:
+            self.misses += 1
+            if generation != self.generation:
+                return payload
+            self._entries[key] = payload
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return payload
+
+    def get(self, key: Hashable, build: Callable[[], Any]) -> bytes:
+        """Байты ответа по ключу; при промахе - dumps(build())"""
+        payload = self.peek(key)
+        if payload is None:
+            generation = self.generation
+            payload = self.store(key, Payload(dumps(build())), generation)
+        return payload.body
+
+    def replace(self, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]):
+        with self._lock:
+            self.generation += 1
+            if self._entries:
+                self._entries.clear()
+                self.clears += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(payload.size() for payload in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "clears": self.clears,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def get_payload_cache(repo) -> PayloadCache:
+    """Кэш готовых ответов для текущего снимка репозитория"""
+    return repo.derived("payloads", lambda data: PayloadCache())
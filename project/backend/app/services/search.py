@@ -0,0 +1,262 @@
+import heapq
+import math
+import re
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ..CRUD.video_repository import VideoRepository
+from .recommendations import is_listed
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# Вес поля в частоте термина (упрощённый BM25F): совпадение в названии важнее описания
+FIELD_WEIGHTS = (("name", 3), ("description", 1))
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Сколько слов словаря подставляется вместо префикса последнего слова запроса
+# и с какой длины префикс вообще раскрывается
+PREFIX_EXPANSIONS = 16
+PREFIX_MIN_LENGTH = 2
+
+
+def normalize(word: str) -> str:
+    """Свёртка регистра по Unicode; "ё" и "е" не различаются"""
+    return word.casefold().replace("ё", "е")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return [normalize(word) for word in _WORD_RE.findall(text)]
+
+
+class _QueryWord:
+    """Слово запроса: одно слово словаря или варианты префикса (засчитывается лучший)"""
+
+    def __init__(self, index: "SearchIndex", terms: List[str]):
+        self.index = index
+        self.weighted = [(term, index._idf(term)) for term in terms if term in index._postings]
+
+    def stream(self) -> Iterator[Tuple[float, str]]:
+        """(-вклад, id видео) по убыванию вклада - слияние списков вариантов"""
+        seen = set()
+        merged = heapq.merge(*[self._scaled(self.index._ranked_list(term), idf) for term, idf in self.weighted])
+        for neg, video_id in merged:
+            if video_id not in seen:
+                seen.add(video_id)
+                yield neg, video_id
+
+    @staticmethod
+    def _scaled(ranked: List[Tuple[float, str]], idf: float) -> Iterator[Tuple[float, str]]:
+        for neg, video_id in ranked:
+            yield neg * idf, video_id
+
+    def score(self, video_id: str) -> Optional[float]:
+        best = None
+        for term, idf in self.weighted:
+            impact = self.index._postings[term].get(video_id)
+            if impact is not None and (best is None or impact * idf > best):
+                best = impact * idf
+        return best
+
+
+class SearchIndex:
+    """
+    Обратный индекс публичных видео по названию и описанию.
+
+    Индекс обслуживает общий поиск (/api/search), поэтому скрытых видео в нём
+    нет - в отличие от VideoRepository.search_by_name/search_by_description,
+    которые, как и раньше, ищут по всем неудалённым видео подстрокой.
+
+    Для каждого слова хранится {id видео: вклад BM25 без idf}, а для слов, которые
+    уже искали, - тот же набор, отсортированный по убыванию вклада. Словарь
+    отсортирован, поэтому префикс ищется бинарным поиском. Все слова запроса
+    обязательны, последнее считается префиксом (подсказки при наборе). Первые K
+    результатов выбираются по отсортированным спискам с ранней остановкой
+    (threshold algorithm), поэтому частые слова не требуют оценки всех
+    содержащих их видео, а общее число совпадений не считается - только
+    есть ли следующая страница.
+
+    Средняя длина документа фиксируется при построении (индекс строится заново
+    при перечитывании снимка). Производная структура репозитория видео:
+    replace(old, new) пересчитывает только изменённое видео, изменение
+    счётчиков индекс не трогает.
+    """
+
+    def __init__(self, videos: Iterable[Dict[str, Any]]):
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._ranked: Dict[str, List[Tuple[float, str]]] = {}  # строятся при первом поиске слова
+        self._doc_terms: Dict[str, Dict[str, float]] = {}
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._vocabulary: List[str] = []
+
+        videos = [video for video in videos if is_listed(video)]
+        documents = [(video, self._document_terms(video)) for video in videos]
+        lengths = [sum(terms.values()) for _, terms in documents]
+        self._avg_len = (sum(lengths) / len(lengths) if lengths else 0.0) or 1.0
+
+        for video, terms in documents:
+            self._add(video, terms, build=True)
+        self._vocabulary = sorted(self._postings)
+
+    @staticmethod
+    def _document_terms(video: Dict[str, Any]) -> Dict[str, float]:
+        terms: Dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS:
+            for term in tokenize(video.get(field)):
+                terms[term] = terms.get(term, 0) + weight
+        return terms
+
+    def _add(self, video: Dict[str, Any], terms: Dict[str, float], build: bool = False):
+        video_id = video.get("id")
+        self._records[video_id] = video
+        self._doc_terms[video_id] = terms
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * sum(terms.values()) / self._avg_len)
+        for term, tf in terms.items():
+            impact = tf * (BM25_K1 + 1) / (tf + norm)
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                if not build:
+                    insort(self._vocabulary, term)
+            postings[video_id] = impact
+            ranked = self._ranked.get(term)
+            if ranked is not None:
+                insort(ranked, (-impact, video_id))
+
+    def _remove(self, video_id: str):
+        terms = self._doc_terms.pop(video_id, None)
+        if terms is None:
+            return
+        del self._records[video_id]
+        for term in terms:
+            postings = self._postings[term]
+            impact = postings.pop(video_id)
+            ranked = self._ranked.get(term)
+            if ranked is not None:
+                del ranked[bisect_left(ranked, (-impact, video_id))]
+            if not postings:
+                del self._postings[term]
+                self._ranked.pop(term, None)
+                del self._vocabulary[bisect_left(self._vocabulary, term)]
+
+    def replace(self, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]):
+        """Обновить индекс после изменения одного видео"""
+        if new is not None:
+            video_id = new.get("id")
+            current = self._records.get(video_id)
+            if (
+                current is not None
+                and is_listed(new)
+                and all(current.get(field) == new.get(field) for field, _ in FIELD_WEIGHTS)
+            ):
+                # Изменились только счётчики или служебные поля - текст тот же
+                self._records[video_id] = new
+                return
+        if old is not None:
+            self._remove(old.get("id"))
+        if new is not None:
+            self._remove(new.get("id"))
+            if is_listed(new):
+                self._add(new, self._document_terms(new))
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def expand_prefix(self, prefix: str, limit: int = PREFIX_EXPANSIONS) -> List[str]:
+        """Слова словаря, начинающиеся с prefix (сначала само слово, если оно есть)"""
+        start = bisect_left(self._vocabulary, prefix)
+        terms = []
+        for term in self._vocabulary[start:start + limit]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+
+    def _ranked_list(self, term: str) -> List[Tuple[float, str]]:
+        ranked = self._ranked.get(term)
+        if ranked is None:
+            ranked = sorted((-impact, video_id) for video_id, impact in self._postings[term].items())
+            self._ranked[term] = ranked
+        return ranked
+
+    def _idf(self, term: str) -> float:
+        df = len(self._postings.get(term, ()))
+        n = len(self._records)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def _top(self, words: List[_QueryWord], k: int, category_id: Any) -> List[Tuple[float, str]]:
+        """
+        K лучших видео, содержащих все слова: списки читаются параллельно по
+        убыванию вклада, каждое новое видео оценивается целиком, чтение
+        останавливается, когда сумма текущих вкладов не может превзойти K-й результат.
+        """
+        streams = [word.stream() for word in words]
+        bounds = [math.inf] * len(words)
+        matches: List[Tuple[float, str]] = []
+        kth: List[float] = []  # K лучших оценок (куча)
+        seen = set()
+        while True:
+            for i, stream in enumerate(streams):
+                item = next(stream, None)
+                if item is None:
+                    # Все видео с этим словом уже просмотрены - новых совпадений не будет
+                    return sorted(matches)[:k]
+                neg, video_id = item
+                bounds[i] = -neg
+                if video_id in seen:
+                    continue
+                seen.add(video_id)
+                if category_id is not None and self._records[video_id].get("category_id") != category_id:
+                    continue
+                total = 0.0
+                for word in words:
+                    score = word.score(video_id)
+                    if score is None:
+                        break
+                    total += score
+                else:
+                    matches.append((-total, video_id))
+                    if len(kth) < k:
+                        heapq.heappush(kth, total)
+                    elif total > kth[0]:
+                        heapq.heapreplace(kth, total)
+            if len(kth) >= k:
+                bound = sum(bounds)
+                # Для одного слова поток уже упорядочен как результат, равные оценки не страшны
+                if kth[0] > bound or (len(words) == 1 and kth[0] >= bound):
+                    return sorted(matches)[:k]
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        offset: int = 0,
+        prefix: bool = True,
+        category_id: Any = None,
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Найденные видео [offset, offset + limit) по убыванию релевантности и
+        признак того, что есть следующая страница.
+        """
+        words = list(dict.fromkeys(tokenize(query)))
+        if not words:
+            return [], False
+
+        alternatives = [[word] for word in words]
+        if prefix and len(words[-1]) >= PREFIX_MIN_LENGTH:
+            alternatives[-1] = self.expand_prefix(words[-1]) or [words[-1]]
+        query_words = [_QueryWord(self, terms) for terms in alternatives]
+        if any(not word.weighted for word in query_words):
+            return [], False
+
+        best = self._top(query_words, offset + limit + 1, category_id)
+        page = best[offset:offset + limit]
+        return [self._records[video_id] for _, video_id in page], len(best) > offset + limit
+
+
+def get_search_index(video_repo: VideoRepository) -> SearchIndex:
+    """Поисковый индекс текущего снимка видео (обновляется при записи через video_repo)"""
+    return video_repo.derived("search", SearchIndex)
@@ -0,0 +1,228 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from . import json_codec
+from .metrics import metrics
+
+
+Stamp = Tuple[int, int, int]
+
+
+def load_json(path: Path) -> Any:
+    """Прочитать и распарсить JSON-файл"""
+    with open(path, "rb") as f:
+        return json_codec.loads(f.read())
+
+
+def file_stamp(path: Path) -> Stamp:
+    """Дешёвая "подпись" файла: mtime, размер и inode (меняется при атомарной замене)"""
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _stamp(path: Path, watch: Sequence[Path]) -> Tuple[Optional[Stamp], ...]:
+    # Основной файл обязан существовать, дополнительные (например, журнал) - нет
+    stamps: List[Optional[Stamp]] = [file_stamp(path)]
+    for extra in watch:
+        try:
+            stamps.append(file_stamp(extra))
+        except FileNotFoundError:
+            stamps.append(None)
+    return tuple(stamps)
+
+
+def _structure_name(key: Hashable) -> str:
+    # Метка для метрик: ключ производной структуры без параметров ("leaderboard", "search"...)
+    if isinstance(key, tuple) and key:
+        key = key[0]
+    return str(key)
+
+
+class Snapshot:
+    """
+    Неизменяемый снимок содержимого файла.
+
+    data - кортеж записей (если в файле список), сами записи изменять нельзя:
+    снимок разделяется всеми запросами процесса.
+    """
+
+    __slots__ = ("path", "version", "stamp", "data", "loaded_at", "_derived", "_lock")
+
+    def __init__(self, path: Path, version: int, stamp: Tuple, data: Any):
+        self.path = path
+        self.version = version
+        self.stamp = stamp
+        self.data = tuple(data) if isinstance(data, list) else data
+        self.loaded_at = time.time()
+        self._derived: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+
+    def peek(self, key: Hashable) -> Any:
+        """Производная структура, если она уже построена (иначе None)"""
+        return self._derived.get(key)
+
+    def derive(self, key: Hashable, builder: Callable[[Any], Any]) -> Any:
+        """Построить (один раз на снимок) производную структуру: индекс, группировку и т.п."""
+        try:
+            return self._derived[key]
+        except KeyError:
+            pass
+        with self._lock:
+            if key not in self._derived:
+                with metrics.timer("derived_build_seconds", "build", structure=_structure_name(key)):
+                    self._derived[key] = builder(self.data)
+            return self._derived[key]
+
+
+class SnapshotCache:
+    """
+    Процессный кэш снимков JSON-файлов.
+
+    Каждый файл парсится один раз; при следующих обращениях проверяется только
+    stat() (не чаще, чем раз в check_interval секунд). Если файл изменился,
+    загружается новый снимок и атомарно подменяет старый - читатели, уже
+    получившие старый снимок, дорабатывают с ним.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[Path], Any] = load_json,
+        check_interval: float = 0.0,
+    ):
+        self._loader = loader
+        self.check_interval = check_interval
+        self._snapshots: Dict[Path, Snapshot] = {}
+        self._checked_at: Dict[Path, float] = {}
+        self._load_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._next_version = 1
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def _count(self, counter: str):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(
+        self,
+        path,
+        loader: Optional[Callable[[Path], Any]] = None,
+        watch: Sequence[Path] = (),
+        revalidate: bool = False,
+    ) -> Snapshot:
+        """
+        Вернуть актуальный снимок файла (FileNotFoundError, если файла нет).
+
+        loader - своя функция загрузки (по умолчанию JSON), watch - дополнительные
+        файлы, изменение которых тоже означает новую версию данных,
+        revalidate - проверить файл, даже если check_interval ещё не истёк.
+        """
+        path = Path(path)
+        snapshot = self._snapshots.get(path)
+
+        if snapshot is not None and self.check_interval > 0 and not revalidate:
+            if time.monotonic() - self._checked_at.get(path, 0.0) < self.check_interval:
+                self._count("hits")
+                return snapshot
+
+        stamp = _stamp(path, watch)
+        if snapshot is not None and snapshot.stamp == stamp:
+            self._checked_at[path] = time.monotonic()
+            self._count("hits")
+            return snapshot
+
+        with self._load_lock:
+            # Пока ждали блокировку, снимок мог уже обновить другой поток
+            current = self._snapshots.get(path)
+            if current is not None and current is not snapshot and current.stamp == stamp:
+                self._count("hits")
+                return current
+        return self._load(path, loader or self._loader, stamp, reload=current is not None)
+
+    def _load(self, path: Path, loader: Callable[[Path], Any], stamp: Tuple, reload: bool) -> Snapshot:
+        # Загрузчик вызывается без блокировок кэша: он может брать свои (например,
+        # блокировку хранилища, которую пишущий поток держит, обращаясь к кэшу).
+        # stamp снят до чтения: если файл поменяется во время чтения, следующая проверка это заметит.
+        with metrics.timer("snapshot_load_seconds", "load", table=path.stem):
+            data = loader(path)
+        with self._load_lock:
+            snapshot = Snapshot(path, self._next_version, stamp, data)
+            self._next_version += 1
+            self._snapshots[path] = snapshot
+            self._checked_at[path] = time.monotonic()
+        self._count("reloads" if reload else "misses")
+        return snapshot
+
+    def is_fresh(self, path, watch: Sequence[Path] = ()) -> bool:
+        """Есть ли актуальный снимок файла (get() вернёт его без загрузки)"""
+        path = Path(path)
+        snapshot = self._snapshots.get(path)
+        if snapshot is None:
+            return False
+        if self.check_interval > 0 and time.monotonic() - self._checked_at.get(path, 0.0) < self.check_interval:
+            return True
+        try:
+            return snapshot.stamp == _stamp(path, watch)
+        except FileNotFoundError:
+            return False
+
+    def publish(
+        self,
+        path,
+        data: Any,
+        derived: Optional[Dict[Hashable, Any]] = None,
+        watch: Sequence[Path] = (),
+    ) -> Snapshot:
+        """
+        Установить снимок после записи файла этим же процессом, не перечитывая его.
+
+        derived - уже обновлённые производные структуры (например, индексы),
+        которые переносятся в новый снимок вместо повторного построения.
+        """
+        path = Path(path)
+        with self._load_lock:
+            snapshot = Snapshot(path, self._next_version, _stamp(path, watch), data)
+            self._next_version += 1
+            if derived:
+                snapshot._derived.update(derived)
+            self._snapshots[path] = snapshot
+            self._checked_at[path] = time.monotonic()
+            return snapshot
+
+    def invalidate(self, path=None):
+        """Сбросить снимок файла (или все снимки), например после записи в него"""
+        with self._load_lock:
+            if path is None:
+                self._snapshots.clear()
+                self._checked_at.clear()
+            else:
+                self._snapshots.pop(Path(path), None)
+                self._checked_at.pop(Path(path), None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Счётчики попаданий/промахов/перезагрузок и сведения о снимках"""
+        files = {}
+        for path, snapshot in list(self._snapshots.items()):
+            files[path.name] = {
+                "version": snapshot.version,
+                "records": len(snapshot.data) if hasattr(snapshot.data, "__len__") else None,
+                "loaded_at": snapshot.loaded_at,
+            }
+        with self._stats_lock:
+            total = self.hits + self.misses + self.reloads
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "hit_ratio": (self.hits / total) if total else 0.0,
+                "files": files,
+            }
+
+
+snapshot_cache = SnapshotCache(
+    check_interval=float(os.getenv("SNAPSHOT_CHECK_INTERVAL", "0")),
+)
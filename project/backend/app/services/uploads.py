@@ -0,0 +1,173 @@
+import asyncio
+import base64
+import hashlib
+import threading
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from .executor import BlockingExecutor
+from .minio_storage import MinIOStorage, StorageUnavailableError
+from .resilience import backoff_delay
+
+MIN_PART_SIZE = 5 * 1024 * 1024  # минимальный размер части (кроме последней) в S3/MinIO
+
+
+class UploadError(Exception):
+    pass
+
+
+class UploadTooLargeError(UploadError):
+    pass
+
+
+class ChecksumMismatchError(UploadError):
+    pass
+
+
+def multipart_etag(part_md5s: List[bytes]) -> str:
+    """ETag, который S3/MinIO присваивает объекту, собранному из частей с такими MD5"""
+    return f"{hashlib.md5(b''.join(part_md5s)).hexdigest()}-{len(part_md5s)}"
+
+
+class StreamingUploader:
+    """
+    Потоковая загрузка файла из тела запроса в MinIO составной загрузкой.
+
+    Поток копится в буфер размера part_size, заполненная часть уходит в MinIO
+    в пуле потоков, пока читается следующая. Одновременно в полёте не больше
+    parallel частей, поэтому память на запрос ограничена (parallel + 1) * part_size
+    независимо от размера файла. Часть хранится в памяти, пока MinIO её не
+    подтвердит: при ошибке она загружается заново (до retries раз), а не вся
+    загрузка. Каждая часть проверяется MinIO по Content-MD5, весь файл - по
+    SHA-256 (если клиент его прислал) и по ETag собранного объекта.
+    """
+
+    def __init__(
+        self,
+        storage: MinIOStorage,
+        executor: BlockingExecutor,
+        part_size: int = 8 * 1024 * 1024,
+        parallel: int = 4,
+        retries: int = 3,
+        retry_delay: float = 0.5,
+    ):
+        self.storage = storage
+        self.executor = executor
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.parallel = max(parallel, 1)
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self._lock = threading.Lock()
+        self._stats = {"started": 0, "completed": 0, "failed": 0, "bytes": 0, "parts": 0, "part_retries": 0}
+
+    def _count(self, **deltas: int):
+        with self._lock:
+            for name, delta in deltas.items():
+                self._stats[name] += delta
+
+    async def _send_part(
+        self, bucket_name: str, object_name: str, upload_id: str, part_number: int, data: bytes,
+    ) -> Tuple[int, str, bytes]:
+        md5 = (await self.executor.run(hashlib.md5, data)).digest()
+        md5_base64 = base64.b64encode(md5).decode("ascii")
+        for attempt in range(self.retries + 1):
+            try:
+                etag = await self.executor.run(
+                    self.storage.upload_part, bucket_name, object_name, upload_id, part_number, data, md5_base64,
+                )
+                self._count(parts=1)
+                return part_number, etag, md5
+            except Exception as e:
+                # Предохранитель разомкнут - MinIO недоступен, повторять часть бессмысленно
+                circuit_open = isinstance(e, StorageUnavailableError) and e.code == "CircuitOpen"
+                if attempt == self.retries or circuit_open:
+                    raise
+                self._count(part_retries=1)
+                await asyncio.sleep(backoff_delay(attempt, self.retry_delay, self.retry_delay * 8))
+
+    async def upload(
+        self,
+        chunks: AsyncIterator[bytes],
+        bucket_name: str,
+        object_name: str,
+        content_type: str = "application/octet-stream",
+        expected_sha256: Optional[str] = None,
+        max_size: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Загрузить поток в bucket_name/object_name. Возвращает размер, SHA-256 и
+        ETag объекта. При любой ошибке (в том числе обрыве соединения клиента)
+        составная загрузка отменяется и объект не появляется.
+        """
+        self._count(started=1)
+        upload_id = await self.executor.run(
+            self.storage.start_multipart_upload, bucket_name, object_name, content_type,
+        )
+        slots = asyncio.Semaphore(self.parallel)
+        tasks: List[asyncio.Task] = []
+        sha256 = hashlib.sha256()
+        size = 0
+
+        async def submit(data: bytes):
+            await slots.acquire()
+            # Упавшая часть (после всех повторов) прерывает загрузку, не дожидаясь конца потока
+            for task in tasks:
+                if task.done() and task.exception() is not None:
+                    slots.release()
+                    raise task.exception()
+            task = asyncio.create_task(
+                self._send_part(bucket_name, object_name, upload_id, len(tasks) + 1, data)
+            )
+            task.add_done_callback(lambda _: slots.release())
+            tasks.append(task)
+
+        try:
+            buffer = bytearray()
+            async for chunk in chunks:
+                if not chunk:
+                    continue
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    raise UploadTooLargeError(f"Файл больше {max_size} байт")
+                sha256.update(chunk)
+                buffer += chunk
+                while len(buffer) >= self.part_size:
+                    part = bytes(memoryview(buffer)[:self.part_size])
+                    del buffer[:self.part_size]
+                    await submit(part)
+            if buffer or not tasks:
+                await submit(bytes(buffer))
+            buffer = None
+
+            parts = sorted(await asyncio.gather(*tasks))
+            digest = sha256.hexdigest()
+            if expected_sha256 is not None and expected_sha256.lower() != digest:
+                raise ChecksumMismatchError(f"SHA-256 не совпадает: получено {digest}")
+
+            etag = await self.executor.run(
+                self.storage.complete_multipart_upload,
+                bucket_name, object_name, upload_id, [(number, part_etag) for number, part_etag, _ in parts],
+            )
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.executor.run(self.storage.abort_multipart_upload, bucket_name, object_name, upload_id)
+            self._count(failed=1)
+            raise
+
+        expected_etag = multipart_etag([md5 for _, _, md5 in parts])
+        if etag.strip('"') != expected_etag:
+            await self.executor.run(self.storage.delete_object, bucket_name, object_name)
+            self._count(failed=1)
+            raise ChecksumMismatchError(f"Собранный объект не совпадает с загруженными частями: {etag}")
+
+        self._count(completed=1, bytes=size)
+        return {"size": size, "sha256": digest, "etag": expected_etag, "parts": len(parts)}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "part_size": self.part_size,
+                "parallel": self.parallel,
+            }
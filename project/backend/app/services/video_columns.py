@@ -0,0 +1,272 @@
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # без NumPy репозиторий видео сортирует записи как раньше
+    np = None
+
+
+def timestamp(value: Any) -> float:
+    """Дата ISO 8601 в секундах; 0 - даты нет или она не разбирается"""
+    try:
+        return datetime.fromisoformat(value or "").timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _popularity(columns: "VideoColumns", rows: slice) -> "np.ndarray":
+    # popularity_score из recommendations.py целиком по столбцам
+    dislikes = columns.dislikes[rows]
+    engagement = np.divide(
+        columns.likes[rows], dislikes, out=np.zeros(len(dislikes), dtype=np.float64), where=dislikes > 0,
+    )
+    return columns.views[rows] * 0.7 + engagement * 0.3
+
+
+# Оценки для сортировки по убыванию: имя -> функция (столбцы, строки) -> массив
+SCORES: Dict[str, Callable[["VideoColumns", slice], "np.ndarray"]] = {
+    "popularity": _popularity,
+    "views": lambda columns, rows: columns.views[rows],
+    "likes": lambda columns, rows: columns.likes[rows],
+    "dislikes": lambda columns, rows: columns.dislikes[rows],
+    "date": lambda columns, rows: columns.dates[rows],
+}
+
+
+class VideoColumns:
+    """
+    Каталог видео по столбцам: счётчики (int64), даты (секунды, float64),
+    коды категорий и авторов (int32, -1 - нет), признаки публичности и
+    удаления, плюс список записей в порядке снимка.
+
+    Оценки считаются сразу для всего столбца (SCORES), фильтры - булевы
+    маски, первые K - argpartition и сортировка только K кандидатов, так что
+    топ по любому ключу - это несколько проходов по массивам без обращения к
+    dict записей. При равных оценках видео идут в порядке снимка (как у
+    sorted по списку записей).
+
+    Производная структура репозитория видео: replace(old, new) меняет одну
+    строку на месте (приращение счётчиков - три присваивания), новое видео
+    дописывается в конец, ёмкость массивов удваивается.
+    """
+
+    def __init__(self, videos: Iterable[Dict[str, Any]]):
+        self.records: List[Dict[str, Any]] = list(videos)
+        self._positions: Dict[str, int] = {video.get("id"): position for position, video in enumerate(self.records)}
+        self._categories: Dict[Any, int] = {}
+        self._category_values: List[Any] = []
+        self._users: Dict[Any, int] = {}
+
+        # Построение - по столбцу за проход, а не по строке, как в _set
+        videos = self.records
+        count = len(videos)
+        self.size = 0
+        self._allocate(max(count, 16))
+        self.views[:count] = [video.get("views", 0) or 0 for video in videos]
+        self.likes[:count] = [video.get("likes", 0) or 0 for video in videos]
+        self.dislikes[:count] = [video.get("dislikes", 1) for video in videos]
+        self.dates[:count] = [timestamp(video.get("date")) for video in videos]
+        self.categories[:count] = [
+            self._code(self._categories, video.get("category_id"), self._category_values) for video in videos
+        ]
+        self.users[:count] = [self._code(self._users, video.get("user_id")) for video in videos]
+        self.public[:count] = [bool(video.get("is_public", False)) for video in videos]
+        self.public_unset[:count] = ["is_public" not in video for video in videos]
+        self.deleted[:count] = [bool(video.get("is_deleted", False)) for video in videos]
+        self.size = count
+
+    def _allocate(self, capacity: int):
+        def grow(array: Optional["np.ndarray"], dtype, fill) -> "np.ndarray":
+            resized = np.full(capacity, fill, dtype=dtype)
+            if array is not None:
+                resized[:self.size] = array[:self.size]
+            return resized
+
+        self.views = grow(getattr(self, "views", None), np.int64, 0)
+        self.likes = grow(getattr(self, "likes", None), np.int64, 0)
+        # Без поля dislikes - 1, как в popularity_score
+        self.dislikes = grow(getattr(self, "dislikes", None), np.int64, 1)
+        self.dates = grow(getattr(self, "dates", None), np.float64, 0.0)
+        self.categories = grow(getattr(self, "categories", None), np.int32, -1)
+        self.users = grow(getattr(self, "users", None), np.int32, -1)
+        # is_public: явно True / не задано (is_listed считает такое видео публичным, get_public_videos - нет)
+        self.public = grow(getattr(self, "public", None), bool, False)
+        self.public_unset = grow(getattr(self, "public_unset", None), bool, False)
+        self.deleted = grow(getattr(self, "deleted", None), bool, False)
+
+    def _append(self, video: Dict[str, Any]):
+        # Строка заполняется до того, как size её откроет читателям
+        if self.size == len(self.views):
+            self._allocate(2 * self.size)
+        position = self.size
+        self.records.append(video)
+        self._positions[video.get("id")] = position
+        self._set(position, video)
+        self.size += 1
+
+    @staticmethod
+    def _code(codes: Dict[Any, int], value: Any, values: Optional[List[Any]] = None) -> int:
+        if value is None:
+            return -1
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes)
+            if values is not None:
+                values.append(value)
+        return code
+
+    def _set(self, position: int, video: Dict[str, Any]):
+        self.records[position] = video
+        self.views[position] = video.get("views", 0) or 0
+        self.likes[position] = video.get("likes", 0) or 0
+        self.dislikes[position] = video.get("dislikes", 1)
+        self.dates[position] = timestamp(video.get("date"))
+        self.categories[position] = self._code(self._categories, video.get("category_id"), self._category_values)
+        self.users[position] = self._code(self._users, video.get("user_id"))
+        self.public[position] = bool(video.get("is_public", False))
+        self.public_unset[position] = "is_public" not in video
+        self.deleted[position] = bool(video.get("is_deleted", False))
+
+    def replace(self, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]):
+        """Обновить строку видео после записи (или дописать новое видео)"""
+        if new is None:
+            return
+        position = self._positions.get(new.get("id"))
+        if position is None:
+            self._append(new)
+        else:
+            self._set(position, new)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def get(self, video_id: str) -> Optional[Dict[str, Any]]:
+        position = self._positions.get(video_id)
+        return self.records[position] if position is not None else None
+
+    # ---------- маски и оценки ----------
+
+    def listed(self) -> "np.ndarray":
+        """Видео в лентах и топах (как is_listed): публичные или без is_public, не удалённые"""
+        rows = slice(0, self.size)
+        return (self.public[rows] | self.public_unset[rows]) & ~self.deleted[rows]
+
+    def public_videos(self) -> "np.ndarray":
+        """Видео get_public_videos: is_public=True и не удалённые"""
+        rows = slice(0, self.size)
+        return self.public[rows] & ~self.deleted[rows]
+
+    def not_deleted(self) -> "np.ndarray":
+        return ~self.deleted[:self.size]
+
+    def mask(
+        self,
+        base: Optional["np.ndarray"] = None,
+        category_id: Any = None,
+        user_id: Any = None,
+        exclude: Optional[str] = None,
+    ) -> "np.ndarray":
+        """base (по умолчанию listed()) с фильтрами по категории, автору и без exclude"""
+        mask = self.listed() if base is None else base.copy()
+        if category_id is not None:
+            mask &= self.categories[:self.size] == self._categories.get(category_id, -2)
+        if user_id is not None:
+            mask &= self.users[:self.size] == self._users.get(user_id, -2)
+        if exclude is not None:
+            position = self._positions.get(exclude)
+            if position is not None:
+                mask[position] = False
+        return mask
+
+    def scores(self, by: str) -> "np.ndarray":
+        """Оценки всех видео по ключу by (см. SCORES), float64"""
+        return np.asarray(SCORES[by](self, slice(0, self.size)), dtype=np.float64)
+
+    # ---------- топы и агрегаты ----------
+
+    def top_positions(self, limit: int, by: str = "popularity", mask: Optional["np.ndarray"] = None) -> "np.ndarray":
+        """Номера строк первых limit видео под маской по убыванию оценки"""
+        if mask is None:
+            mask = self.listed()
+        return self._select(np.flatnonzero(mask), self.scores(by), limit)
+
+    @staticmethod
+    def _select(candidates: "np.ndarray", scores: "np.ndarray", limit: int) -> "np.ndarray":
+        # Первые limit кандидатов (номера строк по возрастанию) по убыванию scores, при равенстве - по номеру
+        if limit <= 0 or not len(candidates):
+            return candidates[:0]
+        scores = scores[candidates]
+        if limit < len(candidates):
+            # Кандидаты не хуже limit-й оценки - с равными ей, чтобы порядок при равенстве был точным
+            kth = np.partition(scores, len(scores) - limit)[len(scores) - limit]
+            keep = scores >= kth
+            candidates, scores = candidates[keep], scores[keep]
+        return candidates[np.lexsort((candidates, -scores))[:limit]]
+
+    def top(
+        self,
+        limit: int,
+        by: str = "popularity",
+        category_id: Any = None,
+        user_id: Any = None,
+        exclude: Optional[str] = None,
+        base: Optional["np.ndarray"] = None,
+    ) -> List[Dict[str, Any]]:
+        """Первые limit записей по убыванию оценки by с фильтрами mask()"""
+        mask = self.mask(base, category_id=category_id, user_id=user_id, exclude=exclude)
+        return [self.records[position] for position in self.top_positions(limit, by, mask).tolist()]
+
+    def top_per_category(self, limit: int, by: str = "popularity") -> Dict[Any, List[Dict[str, Any]]]:
+        """
+        Первые limit видео каждой категории (среди listed), категории - в
+        порядке первого видео каждой в снимке. Оценки считаются один раз на
+        все категории.
+        """
+        scores = self.scores(by)
+        listed = self.listed()
+        categories = self.categories[:self.size]
+        codes, first = np.unique(categories[listed], return_index=True)
+        result = {}
+        for code in codes[np.argsort(first)].tolist():
+            category_id = self._category_values[code] if code >= 0 else None
+            positions = self._select(np.flatnonzero(listed & (categories == code)), scores, limit)
+            result[category_id] = [self.records[position] for position in positions.tolist()]
+        return result
+
+    def category_totals(self) -> Dict[Any, Dict[str, int]]:
+        """Число видео, просмотров и лайков по категориям (среди listed) - bincount по кодам"""
+        listed = self.listed()
+        codes = self.categories[:self.size][listed] + 1  # -1 (без категории) -> 0
+        size = len(self._category_values) + 1
+        counts = np.bincount(codes, minlength=size)
+        views = np.bincount(codes, weights=self.views[:self.size][listed], minlength=size)
+        likes = np.bincount(codes, weights=self.likes[:self.size][listed], minlength=size)
+        return {
+            (self._category_values[code - 1] if code else None): {
+                "videos": int(counts[code]),
+                "views": int(views[code]),
+                "likes": int(likes[code]),
+            }
+            for code in np.flatnonzero(counts).tolist()
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        arrays = (self.views, self.likes, self.dislikes, self.dates, self.categories, self.users,
+                  self.public, self.public_unset, self.deleted)
+        return {
+            "videos": self.size,
+            "capacity": len(self.views),
+            "categories": len(self._categories),
+            "bytes": sum(array.nbytes for array in arrays),
+        }
+
+
+def get_video_columns(video_repo) -> Optional[VideoColumns]:
+    """
+    Столбцы текущего снимка videos.json: строятся один раз на снимок и дальше
+    обновляются при каждой записи через video_repo. None - NumPy не установлен.
+    """
+    if np is None:
+        return None
+    return video_repo.derived("columns", VideoColumns)
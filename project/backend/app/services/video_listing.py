@@ -0,0 +1,56 @@
+import base64
+import binascii
+import json
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from ..CRUD.video_repository import VideoRepository
+from .ranked_index import Key, RankedIndex
+from .recommendations import is_listed
+from .video_columns import timestamp
+
+
+def _date_rank(video: Dict[str, Any]) -> float:
+    return timestamp(video.get("date"))
+
+
+SORT_RANKS = {
+    "date": _date_rank,
+    "views": lambda video: video.get("views", 0),
+    "likes": lambda video: video.get("likes", 0),
+}
+
+
+def get_listing(video_repo: VideoRepository, sort: str = "date") -> RankedIndex:
+    """
+    Публичные видео текущего снимка в порядке sort (по убыванию), с разделами
+    по category_id и user_id. Строится один раз и обновляется при записи.
+    """
+    rank = SORT_RANKS[sort]
+    return video_repo.derived(
+        ("listing", sort),
+        lambda videos: RankedIndex(videos, rank, partitions=("category_id", "user_id"), listed=is_listed),
+    )
+
+
+def encode_cursor(sort: str, key: Key) -> str:
+    raw = json.dumps([sort, key[0], key[1]], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(sort: str, cursor: str) -> Key:
+    """Ключ из курсора; ValueError, если курсор повреждён или выдан для другой сортировки"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, rank, record_id = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise ValueError(f"Повреждённый курсор: {e}")
+    if cursor_sort != sort or not isinstance(rank, (int, float)) or not isinstance(record_id, str):
+        raise ValueError("Курсор выдан для другой сортировки")
+    return (rank, record_id)
+
+
+def project(records: Iterable[Dict[str, Any]], fields: Optional[Sequence[str]]) -> List[Dict[str, Any]]:
+    """Оставить в записях только перечисленные поля"""
+    if not fields:
+        return list(records)
+    return [{f: record[f] for f in fields if f in record} for record in records]
@@ -0,0 +1,142 @@
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Hashable, Optional, Tuple
+
+from .executor import BlockingExecutor
+from .minio_storage import MinIOStorage
+from .object_cache import CachedObjectStorage
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Диапазон из заголовка Range как (начало, конец) включительно; None - отдать
+    файл целиком (заголовка нет, он не про байты или диапазонов несколько).
+    RangeNotSatisfiable - диапазон целиком за концом файла.
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header[len("bytes="):].strip()
+    if "," in spec:
+        return None
+    first, sep, last = spec.partition("-")
+    if not sep:
+        return None
+    try:
+        if first == "":
+            suffix = int(last)
+            if suffix <= 0:
+                raise RangeNotSatisfiable(header)
+            return max(size - suffix, 0), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """Совпадает ли ETag с одним из перечисленных в If-None-Match (слабое сравнение)"""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    bare = etag.strip('"')
+    return any(tag.strip().removeprefix("W/").strip('"') == bare for tag in header.split(","))
+
+
+class ObjectStreamer:
+    """
+    Чтение объектов MinIO потоком для ответа клиенту.
+
+    Тело ответа MinIO пересылается кусками chunk_size по мере чтения, без
+    накопления в памяти; каждое чтение - в пуле потоков, соединение после
+    ответа возвращается в пул urllib3 клиента MinIO. Метаданные объектов
+    (размер, ETag) кэшируются на stat_ttl секунд: перемотка видео - это новый
+    запрос Range, и ему не нужен лишний stat к MinIO. Отсутствие объекта не
+    кэшируется: файл, залитый сразу после 404, отдаётся со следующего запроса.
+
+    Если задан cache, небольшие объекты (не больше cache.max_object_size)
+    отдаются из дискового кэша срезами отображённого в память файла.
+    """
+
+    def __init__(
+        self,
+        storage: MinIOStorage,
+        executor: BlockingExecutor,
+        chunk_size: int = 256 * 1024,
+        stat_ttl: float = 30.0,
+        stat_cache_size: int = 10000,
+        cache: Optional[CachedObjectStorage] = None,
+    ):
+        self.storage = storage
+        self.cache = cache
+        self.executor = executor
+        self.chunk_size = chunk_size
+        self.stat_ttl = stat_ttl
+        self.stat_cache_size = stat_cache_size
+        self._stats: Dict[Hashable, Tuple[float, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    async def stat(self, bucket_name: str, object_name: str) -> Optional[Dict[str, Any]]:
+        key = (bucket_name, object_name)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._stats.get(key)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+
+        info = await self.executor.run(self.storage.stat_object, bucket_name, object_name)
+        if info is None:
+            return None
+        with self._lock:
+            if len(self._stats) >= self.stat_cache_size:
+                self._stats.clear()
+            self._stats[key] = (now + self.stat_ttl, info)
+        return info
+
+    def invalidate(self, bucket_name: str, object_name: str):
+        with self._lock:
+            self._stats.pop((bucket_name, object_name), None)
+
+    async def iterate(
+        self, bucket_name: str, object_name: str, start: int, end: int, size: Optional[int] = None,
+    ) -> AsyncIterator[bytes]:
+        """Байты объекта с start по end включительно (size - размер всего объекта, если известен)"""
+        if self.cache is not None and size is not None and size <= self.cache.max_object_size:
+            cached = await self.executor.run(self.cache.open, bucket_name, object_name)
+            if cached is not None:
+                try:
+                    for offset in range(start, end + 1, self.chunk_size):
+                        # StreamingResponse принимает только bytes/str: кусок копируется
+                        # из отображения (страницы уже в кэше ОС), файл целиком в кучу не читается
+                        yield bytes(cached.data[offset:min(offset + self.chunk_size, end + 1)])
+                finally:
+                    cached.close()
+                return
+
+        response = await self.executor.run(
+            self.storage.open_object, bucket_name, object_name, start, end - start + 1,
+        )
+        try:
+            chunks = response.stream(self.chunk_size, decode_content=False)
+            while True:
+                chunk = await self.executor.run(next, chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            # Клиент мог оборвать загрузку (перемотка) - недочитанное соединение закрывается
+            await self.executor.run(_release, response)
+
+
+def _release(response):
+    response.close()
+    response.release_conn()
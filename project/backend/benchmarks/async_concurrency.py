@@ -0,0 +1,108 @@
+"""
+Бенчмарк конкурентности: sync-обработчики в пуле потоков против async-обработчиков.
+
+MinIO подменяется заглушкой с задержкой (--latency), запросы идут в приложение
+в этом же процессе через httpx.ASGITransport. Одновременно отправляются
+медленные запросы ссылки на видео (обращение к MinIO) и быстрые запросы
+карточки видео (данные в памяти). С sync-обработчиками быстрые запросы ждут,
+пока медленные освободят потоки пула Starlette (40 по умолчанию); с async
+быстрые обслуживаются сразу, а медленные ограничены только IO_POOL_SIZE.
+
+    IO_POOL_SIZE=256 python -m benchmarks.async_concurrency --slow 400 --fast 400
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from app import app as app_module
+
+VIDEO_ID = "770e8400-e29b-41d4-a716-446655440000"
+
+
+class SlowMinio:
+    """Заглушка клиента MinIO: подпись ссылки "стоит" latency секунд блокирующего ожидания"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def presigned_get_object(self, bucket_name, object_name, expires=None):
+        time.sleep(self.latency)
+        return f"http://minio:9000/{bucket_name}/{object_name}?X-Amz-Signature=stub"
+
+
+def _add_sync_routes(app):
+    """Прежний вариант тех же обработчиков: обычные def, выполняются в пуле потоков Starlette"""
+
+    @app.get("/bench/sync/video/{video_id}")
+    def sync_video(video_id: str):
+        return app_module.video_repo.get_by_id(video_id)
+
+    @app.get("/bench/sync/link/{video_id}")
+    def sync_link(video_id: str):
+        url = app_module.minio_client.get_presigned_url("video", f"{video_id}.mp4", 3600)
+        return {"video_url": url}
+
+
+async def _timed_get(client: httpx.AsyncClient, url: str) -> float:
+    started = time.perf_counter()
+    response = await client.get(url)
+    response.raise_for_status()
+    return time.perf_counter() - started
+
+
+async def _scenario(client: httpx.AsyncClient, link_url: str, video_url: str, slow: int, fast: int):
+    started = time.perf_counter()
+    slow_tasks = [asyncio.create_task(_timed_get(client, link_url)) for _ in range(slow)]
+    await asyncio.sleep(0.01)  # медленные запросы успевают занять потоки
+    fast_latencies = await asyncio.gather(*[_timed_get(client, video_url) for _ in range(fast)])
+    await asyncio.gather(*slow_tasks)
+    total = time.perf_counter() - started
+    return total, sorted(fast_latencies)
+
+
+def _report(name: str, slow: int, fast: int, total: float, fast_latencies):
+    p50 = statistics.median(fast_latencies) * 1000
+    p99 = fast_latencies[int(len(fast_latencies) * 0.99) - 1] * 1000
+    print(
+        f"{name:6} total {total:6.2f}s  {(slow + fast) / total:8.0f} req/s  "
+        f"fast requests p50 {p50:8.1f} ms  p99 {p99:8.1f} ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slow", type=int, default=200, help="одновременных запросов ссылки (MinIO)")
+    parser.add_argument("--fast", type=int, default=200, help="одновременных запросов карточки видео")
+    parser.add_argument("--latency", type=float, default=0.05, help="задержка MinIO, секунд")
+    args = parser.parse_args()
+
+    app_module.minio_client.signing_client = SlowMinio(args.latency)
+    # Кэш подписанных ссылок выключен: каждый запрос ссылки должен обращаться к "MinIO"
+    app_module.minio_client.url_cache.max_entries = 0
+    app = app_module.app
+    _add_sync_routes(app)
+
+    transport = httpx.ASGITransport(app=app)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits) as client:
+        await client.get(f"/api/video/{VIDEO_ID}")  # прогрев снимка данных
+
+        total, latencies = await _scenario(
+            client, f"/bench/sync/link/{VIDEO_ID}", f"/bench/sync/video/{VIDEO_ID}", args.slow, args.fast,
+        )
+        _report("sync", args.slow, args.fast, total, latencies)
+
+        total, latencies = await _scenario(
+            client, f"/api/video/{VIDEO_ID}/get_link", f"/api/video/{VIDEO_ID}", args.slow, args.fast,
+        )
+        _report("async", args.slow, args.fast, total, latencies)
+
+    print(f"executor: {app_module.io_executor.stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,107 @@
+"""
+Пакетные операции с объектами: по одному против upload_files/download_files
+(пул потоков) и delete_objects (S3 DeleteObjects), листинг генератором.
+
+По умолчанию - LocalObjectStore с задержкой --latency на запрос (как сетевое
+хранилище); с --minio - настоящий MinIO, бакет --bucket создаётся и
+очищается. Операции по одному меряются на --sample объектах, пакетные - на
+всех --objects.
+
+    python -m benchmarks.batch_objects --objects 10000
+    python -m benchmarks.batch_objects --minio localhost:9000
+"""
+
+import argparse
+import random
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from app.services.local_object_store import LocalObjectStore
+from app.services.minio_storage import MinIOStorage
+
+
+def _report(name: str, count: int, seconds: float):
+    print(f"{name:24} {count:7} objects  {seconds:7.2f}s  {count / seconds:9.0f} objects/s")
+
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--objects", type=int, default=10000)
+    parser.add_argument("--sample", type=int, default=500, help="объектов для операций по одному")
+    parser.add_argument("--size", type=int, default=4096)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.002, help="задержка LocalObjectStore на запрос, секунд")
+    parser.add_argument("--minio", help="адрес MinIO вместо LocalObjectStore")
+    parser.add_argument("--access-key", default="minioadmin")
+    parser.add_argument("--secret-key", default="minioadmin")
+    parser.add_argument("--bucket", default="bench-batch")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        if args.minio:
+            storage = MinIOStorage(args.minio, args.access_key, args.secret_key, pool_size=args.workers)
+        else:
+            storage = LocalObjectStore(f"{root}/store", latency=args.latency)
+        storage.create_bucket(args.bucket)
+
+        files = Path(root, "files")
+        files.mkdir()
+        for i in range(args.objects):
+            (files / f"{i:06}.bin").write_bytes(random.randbytes(args.size))
+        names = [f"obj/{i:06}.bin" for i in range(args.objects)]
+        sample, rest = names[:args.sample], names[args.sample:]
+
+        _, seconds = _timed(lambda: [storage.upload_file(args.bucket, str(files / name[4:]), name) for name in sample])
+        _report("upload_file x N", len(sample), seconds)
+        errors, seconds = _timed(
+            storage.upload_files, args.bucket, [(str(files / name[4:]), name) for name in rest],
+            "application/octet-stream", args.workers,
+        )
+        assert not errors, errors[:3]
+        _report(f"upload_files ({args.workers} thr)", len(rest), seconds)
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        listing = storage.list_objects(args.bucket, "obj/")
+        next(listing)
+        first = time.perf_counter() - started
+        count = 1 + sum(1 for _ in listing)
+        streamed = time.perf_counter() - started
+        _, streamed_peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        everything, listed = _timed(lambda: list(storage.list_objects(args.bucket, "obj/")))
+        _, list_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert count == len(everything) == args.objects
+        print(
+            f"list_objects             {count:7} objects  {streamed:7.2f}s  first after {first * 1000:.1f} ms, "
+            f"peak {streamed_peak / 2 ** 20:.1f} MiB (list(): {listed:.2f}s, peak {list_peak / 2 ** 20:.1f} MiB)"
+        )
+        del everything
+
+        out = Path(root, "out")
+        out.mkdir()
+        _, seconds = _timed(lambda: [storage.download_file(args.bucket, name, str(out / name[4:])) for name in sample])
+        _report("download_file x N", len(sample), seconds)
+        errors, seconds = _timed(storage.download_files, args.bucket, [(name, str(out / name[4:])) for name in rest], args.workers)
+        assert not errors, errors[:3]
+        _report(f"download_files ({args.workers} thr)", len(rest), seconds)
+
+        _, seconds = _timed(lambda: [storage.delete_object(args.bucket, name) for name in sample])
+        _report("delete_object x N", len(sample), seconds)
+        errors, seconds = _timed(storage.delete_objects, args.bucket, iter(rest))
+        assert not errors, errors[:3]
+        _report("delete_objects", len(rest), seconds)
+        assert next(storage.list_objects(args.bucket, "obj/"), None) is None
+
+
+if __name__ == "__main__":
+    main()
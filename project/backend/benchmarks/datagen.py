@@ -0,0 +1,206 @@
+"""
+Генератор синтетических данных в формате data/*.json: пользователи,
+категории, видео и ветки комментариев заданного размера.
+
+Данные воспроизводимы (--seed) и похожи на настоящие по распределениям:
+просмотры и комментарии по видео - по закону Ципфа (немного очень популярных
+видео и длинный хвост), у комментариев есть ответы и ответы на ответы, даты
+комментариев идут по возрастанию, часть записей удалена или скрыта. С
+STORAGE_ENGINE=sqlite данные сразу переносятся в базу (migrate_to_sqlite).
+
+    python -m benchmarks.datagen --out /tmp/mypipe-data --users 1000 --videos 10000 --comments 50000
+"""
+
+import argparse
+import itertools
+import os
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+from app.CRUD.storage import atomic_write, close_storages, encode_json, sqlite_path
+
+CATEGORY_NAMES = (
+    "Music", "Gaming", "Education", "Entertainment", "Vlogs", "Sports", "News", "Science",
+    "Travel", "Cooking", "Comedy", "Technology", "Animals", "Movies", "Fashion", "Auto",
+)
+WORDS = (
+    "react python vue javascript урок обзор музыка игра кот собака новости спорт путешествие "
+    "рецепт стрим подкаст гайд туториал концерт трейлер влог летсплей физика математика "
+    "docker linux backend frontend база данных алгоритмы лекция интервью реакция"
+).split()
+NAMES = "Katya Tanya Ivan Oleg Masha Dima Anya Pavel Sveta Artem Nina Egor Lena Max Vera Gleb".split()
+COMMENT_WORDS = "найс ага класс топ согласен спасибо интересно не понял лайк жду продолжения".split()
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+PERIOD = timedelta(days=730)
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _timestamp(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def zipf_weights(count: int, s: float = 1.0) -> List[float]:
+    """Накопленные веса для random.choices: i-й элемент в (i+1)^s раз реже первого"""
+    return list(itertools.accumulate(1 / (i + 1) ** s for i in range(count)))
+
+
+def make_categories(count: int, rng: random.Random) -> List[Dict[str, Any]]:
+    categories = []
+    for i in range(count):
+        name = CATEGORY_NAMES[i % len(CATEGORY_NAMES)]
+        if i >= len(CATEGORY_NAMES):
+            name = f"{name} {i // len(CATEGORY_NAMES) + 1}"
+        categories.append({"id": _uuid(rng), "name": name})
+    return categories
+
+
+def make_users(count: int, rng: random.Random) -> List[Dict[str, Any]]:
+    users = []
+    for i in range(count):
+        user_id = _uuid(rng)
+        name = rng.choice(NAMES)
+        users.append({
+            "id": user_id,
+            "name": name,
+            "email": f"{name.lower()}{i}@example.com",
+            "birth": f"{rng.randint(1970, 2010)}-{rng.randint(1, 12):02}-{rng.randint(1, 28):02}",
+            "role": "admin" if i == 0 else "user",
+            "registered_at": _timestamp(START + PERIOD * rng.random()),
+            "user_link": f"{name.lower()}-{user_id[:6]}",
+            "logo_loc": f"/avatars/{user_id}.png",
+            "password_hash": f"${rng.getrandbits(63)}",
+            "is_deleted": rng.random() < 0.01,
+        })
+    return users
+
+
+def make_videos(
+    count: int,
+    users: Sequence[Dict[str, Any]],
+    categories: Sequence[Dict[str, Any]],
+    rng: random.Random,
+) -> List[Dict[str, Any]]:
+    # Авторы и категории тоже неравномерны: у активных авторов много видео
+    user_weights = zipf_weights(len(users), 0.8)
+    category_weights = zipf_weights(len(categories), 0.5)
+    videos = []
+    for i in range(count):
+        popularity = 1 / (rng.random() ** 1.5 + 1e-4)  # тяжёлый хвост просмотров
+        views = int(popularity * rng.uniform(5, 50))
+        likes = int(views * rng.uniform(0.01, 0.1))
+        videos.append({
+            "id": _uuid(rng),
+            "user_id": rng.choices(users, cum_weights=user_weights)[0]["id"],
+            "name": " ".join(rng.choices(WORDS, k=rng.randint(2, 6))).capitalize(),
+            "description": " ".join(rng.choices(WORDS, k=rng.randint(5, 30))),
+            "date": _timestamp(START + PERIOD * rng.random()),
+            "likes": likes,
+            "dislikes": int(likes * rng.uniform(0, 0.2)),
+            "views": views,
+            "is_public": rng.random() < 0.9,
+            "is_deleted": rng.random() < 0.02,
+            "category_id": rng.choices(categories, cum_weights=category_weights)[0]["id"],
+        })
+    return videos
+
+
+def make_comments(
+    count: int,
+    users: Sequence[Dict[str, Any]],
+    videos: Sequence[Dict[str, Any]],
+    rng: random.Random,
+    reply_ratio: float = 0.6,
+) -> List[Dict[str, Any]]:
+    """
+    Комментарии в хронологическом порядке (как их дописывает приложение).
+    Видео выбирается по Ципфу; с вероятностью reply_ratio комментарий -
+    ответ на один из последних комментариев этого видео, так что получаются
+    ветки в несколько уровней.
+    """
+    if not videos:
+        return []
+    ranked = sorted(videos, key=lambda video: video["views"], reverse=True)
+    video_weights = zipf_weights(len(ranked))
+    recent: Dict[str, List[str]] = {}
+    moment = START
+    step = PERIOD / max(count, 1)
+    comments = []
+    for _ in range(count):
+        video_id = rng.choices(ranked, cum_weights=video_weights)[0]["id"]
+        thread = recent.setdefault(video_id, [])
+        parent_id = rng.choice(thread[-20:]) if thread and rng.random() < reply_ratio else None
+        comment_id = _uuid(rng)
+        moment += step
+        comments.append({
+            "id": comment_id,
+            "user_id": rng.choice(users)["id"],
+            "video_id": video_id,
+            "parent_id": parent_id,
+            "text": " ".join(rng.choices(COMMENT_WORDS, k=rng.randint(1, 12))),
+            "date": _timestamp(moment),
+            "is_deleted": rng.random() < 0.03,
+        })
+        thread.append(comment_id)
+    return comments
+
+
+def generate(
+    users: int = 1000,
+    videos: int = 10000,
+    comments: int = 50000,
+    categories: int = len(CATEGORY_NAMES),
+    seed: int = 0,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Набор данных: {"users": [...], "categories": [...], "videos": [...], "comments": [...]}"""
+    rng = random.Random(seed)
+    dataset = {"categories": make_categories(categories, rng), "users": make_users(max(users, 1), rng)}
+    dataset["videos"] = make_videos(videos, dataset["users"], dataset["categories"], rng)
+    dataset["comments"] = make_comments(comments, dataset["users"], dataset["videos"], rng)
+    return dataset
+
+
+def write_dataset(dataset: Dict[str, List[Dict[str, Any]]], data_dir: Path):
+    """Записать набор в data_dir/<имя>.json; с STORAGE_ENGINE=sqlite - ещё и перенести в базу"""
+    data_dir.mkdir(parents=True, exist_ok=True)
+    for name, items in dataset.items():
+        atomic_write(data_dir / f"{name}.json", encode_json(items))
+    if os.getenv("STORAGE_ENGINE", "wal").lower() == "sqlite":
+        from migrate_to_sqlite import migrate
+
+        migrate(data_dir, sqlite_path(data_dir), force=True)
+        close_storages()
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Параметры размера данных - общие для генератора и бенчмарков, которые его используют"""
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--videos", type=int, default=10000)
+    parser.add_argument("--comments", type=int, default=50000)
+    parser.add_argument("--categories", type=int, default=len(CATEGORY_NAMES))
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def generate_from_args(args: argparse.Namespace) -> Dict[str, List[Dict[str, Any]]]:
+    return generate(args.users, args.videos, args.comments, args.categories, args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", type=Path, required=True, help="папка данных (как data/)")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    dataset = generate_from_args(args)
+    write_dataset(dataset, args.out)
+    print(", ".join(f"{name}: {len(items)}" for name, items in dataset.items()) + f" -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
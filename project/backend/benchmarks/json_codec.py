@@ -0,0 +1,64 @@
+"""
+Сериализация JSON: как было (json.dumps с indent=2), компактный стандартный
+json, orjson (если установлен) и готовые байты из PayloadCache.
+
+На --videos синтетических видео меряется запись и чтение файла данных, его
+размер и ответ со списком видео (--page видео, --requests раз).
+
+    python -m benchmarks.json_codec --videos 100000
+"""
+
+import argparse
+import json
+import time
+
+from app.services import json_codec
+from app.services.responses import PayloadCache
+from benchmarks.storage_backends import make_videos
+
+
+def _timed(fn, repeat: int = 1) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", type=int, default=100000)
+    parser.add_argument("--page", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    videos = make_videos(args.videos)
+    page = videos[:args.page]
+
+    codecs = {
+        "json indent=2": (
+            lambda data: json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8"),
+            json.loads,
+        ),
+        "json compact": (
+            lambda data: json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+            json.loads,
+        ),
+    }
+    if json_codec.orjson is not None:
+        codecs["orjson"] = (json_codec.dumps, json_codec.loads)
+
+    print(f"{'codec':14} {'file MiB':>9} {'dump s':>8} {'load s':>8} {'response us':>12}")
+    for name, (dumps, loads) in codecs.items():
+        raw = dumps(videos)
+        dump = _timed(lambda: dumps(videos))
+        load = _timed(lambda: loads(raw))
+        response = _timed(lambda: dumps(page), args.requests) * 1e6
+        print(f"{name:14} {len(raw) / 2 ** 20:9.1f} {dump:8.2f} {load:8.2f} {response:12.1f}")
+
+    cache = PayloadCache()
+    response = _timed(lambda: cache.get(("page", args.page), lambda: page), args.requests) * 1e6
+    print(f"{'PayloadCache':14} {'':9} {'':8} {'':8} {response:12.1f}")
+
+
+if __name__ == "__main__":
+    main()
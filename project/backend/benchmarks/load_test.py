@@ -0,0 +1,202 @@
+"""
+Нагрузочный тест API: приложение из app.py в этом же процессе
+(httpx.ASGITransport), синтетические данные benchmarks.datagen, вместо
+MinIO - LocalObjectStore во временной папке (с задержкой --storage-latency на
+обращение), так что тест работает без сети и внешних сервисов.
+
+--concurrency клиентов отправляют --requests запросов вперемешку по маршрутам
+(веса - в ROUTES: карточки и ленты чаще, запись реже); популярные видео
+запрашиваются чаще (по просмотрам). Для каждого маршрута и в сумме печатаются
+запросов в секунду, p50/p95/p99 и число ошибок (ответы 4xx/5xx). Первые
+--warmup запросов не учитываются (прогрев снимков, индексов, кэшей).
+
+--json сохраняет результаты, --baseline сравнивает p95 с сохранёнными ранее.
+Настройки приложения - те же переменные окружения (STORAGE_ENGINE,
+IO_POOL_SIZE, VIDEO_STREAM_PROXY...); цена метрик - разница прогонов с
+METRICS_ENABLED=true и false.
+
+    python -m benchmarks.load_test --videos 10000 --comments 50000 --requests 20000 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import importlib
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import httpx
+
+from app.services.local_object_store import LocalObjectStore
+from benchmarks import datagen, report
+
+
+class Traffic:
+    """Аргументы запросов из синтетических данных: id видео (по популярности), запросы поиска, комментарии"""
+
+    def __init__(self, dataset: Dict[str, List[Dict[str, Any]]], media: List[str], rng: random.Random):
+        self.rng = rng
+        videos = [video for video in dataset["videos"] if video["is_public"] and not video["is_deleted"]]
+        self.videos = videos
+        self.weights = list(itertools.accumulate(video["views"] + 1 for video in videos))
+        self.media = media
+        self.users = [user["id"] for user in dataset["users"]]
+        self.categories = [category["id"] for category in dataset["categories"]]
+        self.comments = [comment["id"] for comment in dataset["comments"] if not comment["is_deleted"]]
+
+    def video(self) -> str:
+        return self.rng.choices(self.videos, cum_weights=self.weights)[0]["id"]
+
+    def user(self) -> str:
+        return self.rng.choice(self.users)
+
+    def query(self) -> str:
+        words = self.rng.sample(datagen.WORDS, self.rng.randint(1, 2))
+        if self.rng.random() < 0.3:
+            words[-1] = words[-1][:3]  # подсказка при наборе
+        return " ".join(words)
+
+
+Request = Tuple[str, str, Dict[str, Any]]
+
+# (маршрут, вес, запрос) - запрос строится из Traffic
+ROUTES: List[Tuple[str, int, Callable[[Traffic], Request]]] = [
+    ("GET /api/video/{id}", 20, lambda t: ("GET", f"/api/video/{t.video()}", {})),
+    ("GET /api/videos?limit", 15, lambda t: ("GET", "/api/videos", {"params": {
+        "limit": 20,
+        "sort": t.rng.choice(("date", "views", "likes")),
+        **({"category_id": t.rng.choice(t.categories)} if t.rng.random() < 0.5 else {}),
+    }})),
+    ("GET /api/videos/feed", 5, lambda t: ("GET", "/api/videos/feed", {"params": {"user_id": t.user()}})),
+    ("GET /api/videos/trending", 10, lambda t: ("GET", "/api/videos/trending", {})),
+    ("GET /api/search", 10, lambda t: ("GET", "/api/search", {"params": {"q": t.query()}})),
+    ("GET /api/video/{id}/recommendations", 10, lambda t: ("GET", f"/api/video/{t.video()}/recommendations", {})),
+    ("GET /api/video/{id}/related", 5, lambda t: ("GET", f"/api/video/{t.video()}/related", {})),
+    ("GET /api/video/{id}/comments/tree", 10, lambda t: ("GET", f"/api/video/{t.video()}/comments/tree", {})),
+    ("GET /api/comments/{id}/thread", 3, lambda t: ("GET", f"/api/comments/{t.rng.choice(t.comments)}/thread", {})),
+    ("GET /api/video/{id}/get_link", 8, lambda t: ("GET", f"/api/video/{t.video()}/get_link", {})),
+    ("GET /api/video/{id}/stream", 5, lambda t: ("GET", f"/api/video/{t.rng.choice(t.media)}/stream", {
+        "headers": {"Range": f"bytes={t.rng.randrange(0, 1024 ** 2)}-{1024 ** 2 + t.rng.randrange(0, 1024 ** 2)}"},
+    })),
+    ("GET /api/categories", 3, lambda t: ("GET", "/api/categories", {})),
+    ("GET /api/videos", 1, lambda t: ("GET", "/api/videos", {"params": {"fields": "id,name,views,category_id"}})),
+    ("POST /api/video/{id}/view", 6, lambda t: ("POST", f"/api/video/{t.video()}/view", {})),
+    ("POST /api/video/{id}/comment", 2, lambda t: ("POST", f"/api/video/{t.video()}/comment", {"json": {
+        "user_id": t.rng.choice(t.users),
+        "text": "нагрузочный тест",
+    }})),
+]
+
+
+def prepare_media(store: LocalObjectStore, video_ids: List[str], size: int, rng: random.Random):
+    """Файлы видео для маршрута stream (одинаковое содержимое - на диске это не важно)"""
+    store.create_bucket("video")
+    data = rng.randbytes(size)
+    for video_id in video_ids:
+        store.upload_bytes("video", f"{video_id}.mp4", data)
+
+
+def use_storage(app_module, store: LocalObjectStore):
+    """Подменить MinIO в приложении на локальное хранилище"""
+    app_module.async_minio.storage = store
+    app_module.video_streamer.storage = store
+    app_module.video_uploader.storage = store
+    if app_module.object_cache is not None:
+        app_module.object_cache.storage = store
+
+
+async def run_load(app, traffic: Traffic, total: int, concurrency: int, record: bool) -> Tuple[dict, dict, float]:
+    weights = list(itertools.accumulate(weight for _, weight, _ in ROUTES))
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    remaining = itertools.count()
+
+    async def client_loop(client: httpx.AsyncClient):
+        while next(remaining) < total:
+            name, _, build = traffic.rng.choices(ROUTES, cum_weights=weights)[0]
+            method, url, kwargs = build(traffic)
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            elapsed = time.perf_counter() - started
+            if record:
+                latencies[name].append(elapsed)
+                if response.status_code >= 400:
+                    errors[name] += 1
+
+    transport = httpx.ASGITransport(app=app)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    datagen.add_arguments(parser)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--warmup", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32, help="одновременных клиентов")
+    parser.add_argument("--media", type=int, default=50, help="видео с файлами для маршрута stream")
+    parser.add_argument("--video-mb", type=float, default=4, help="размер файла видео, МиБ")
+    parser.add_argument("--storage-latency", type=float, default=0.002, help="задержка хранилища, секунд")
+    parser.add_argument("--json", type=Path, help="сохранить результаты в файл")
+    parser.add_argument("--baseline", type=Path, help="сравнить с результатами прошлого прогона")
+    parser.add_argument("--threshold", type=float, default=0.2, help="допустимое замедление p95 (доля)")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    dataset = datagen.generate_from_args(args)
+    with tempfile.TemporaryDirectory() as root:
+        data_dir = Path(root) / "data"
+        datagen.write_dataset(dataset, data_dir)
+        # Приложение читает настройки при импорте
+        os.environ["DATA_DIR"] = str(data_dir)
+        os.environ["OBJECT_CACHE_DIR"] = str(Path(root) / "cache")
+        app_module = importlib.import_module("app.app")
+
+        store = LocalObjectStore(str(Path(root) / "objects"))
+        listed = [video for video in dataset["videos"] if video["is_public"] and not video["is_deleted"]]
+        media = [video["id"] for video in sorted(listed, key=lambda v: v["views"], reverse=True)[:args.media]]
+        prepare_media(store, media, int(args.video_mb * 2 ** 20), rng)
+        store.latency = args.storage_latency
+        use_storage(app_module, store)
+        traffic = Traffic(dataset, media, rng)
+        del dataset
+
+        app_module.startup()
+        try:
+            asyncio.run(run_load(app_module.app, traffic, args.warmup, args.concurrency, record=False))
+            latencies, errors, elapsed = asyncio.run(
+                run_load(app_module.app, traffic, args.requests, args.concurrency, record=True)
+            )
+        finally:
+            app_module.shutdown()
+
+    results = {}
+    print(f"{'':40}{'requests':>9}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name in [name for name, _, _ in ROUTES if name in latencies] + ["total"]:
+        values = latencies[name] if name != "total" else list(itertools.chain(*latencies.values()))
+        result = results[name] = report.summarize(values, elapsed)
+        result["errors"] = errors[name] if name != "total" else sum(errors.values())
+        print(
+            f"{name:40}{result['count']:9}{result['per_second']:10.0f}{result['p50_ms']:10.2f}"
+            f"{result['p95_ms']:10.2f}{result['p99_ms']:10.2f}{result['errors']:8}"
+        )
+    print(f"\nstorage requests: {store.requests}, executor: {app_module.io_executor.stats()}")
+
+    if args.json:
+        report.save(results, args.json)
+    if args.baseline and report.compare(results, args.baseline, "p95_ms", args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Память на запись: dict из JSON (как хранились снимки раньше) и записи со
+слотами (CRUD/records.py) на синтетических данных benchmarks.datagen.
+
+Для каждой таблицы файл данных парсится json_codec.loads, и tracemalloc
+меряет, сколько памяти занимает результат: список dict или те же записи,
+превращённые в Record.from_dict (с интернированными id). Печатается размер
+в файле и в памяти на одну запись, во сколько раз память больше файла, и
+время загрузки (разбор JSON и для записей - преобразование).
+
+    python -m benchmarks.memory --videos 100000 --comments 200000
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+from typing import Any, Callable, List
+
+from app.CRUD.records import CategoryRecord, CommentRecord, Record, UserRecord, VideoRecord
+from app.services import json_codec
+from benchmarks import datagen
+
+TABLES = {
+    "users": UserRecord,
+    "categories": CategoryRecord,
+    "videos": VideoRecord,
+    "comments": CommentRecord,
+}
+
+
+def retained(load: Callable[[], List[Any]]) -> int:
+    """Байты, которые держит результат load()"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        data = load()
+        gc.collect()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del data
+    return size
+
+
+def timed(load: Callable[[], List[Any]]) -> float:
+    # Отдельно от retained: под tracemalloc выделения памяти в разы медленнее
+    started = time.perf_counter()
+    load()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    datagen.add_arguments(parser)
+    args = parser.parse_args()
+
+    dataset = datagen.generate_from_args(args)
+    print(f"{'table':11} {'records':>8} {'file B':>7} {'dict B':>7} {'slots B':>8} "
+          f"{'dict x':>7} {'slots x':>8} {'dict s':>7} {'slots s':>8}")
+    for table, record in TABLES.items():
+        raw = json_codec.dumps(dataset[table])
+        count = max(len(dataset[table]), 1)
+
+        def as_records(record: Record = record) -> List[Any]:
+            from_dict = record.from_dict
+            return [from_dict(item) for item in json_codec.loads(raw)]
+
+        def as_dicts() -> List[Any]:
+            return json_codec.loads(raw)
+
+        file_size = len(raw) / count
+        dicts = retained(as_dicts) / count
+        records = retained(as_records) / count
+        print(f"{table:11} {count:8} {file_size:7.0f} {dicts:7.0f} {records:8.0f} "
+              f"{dicts / file_size:7.2f} {records / file_size:8.2f} "
+              f"{timed(as_dicts):7.2f} {timed(as_records):8.2f}")
+
+
+if __name__ == "__main__":
+    main()
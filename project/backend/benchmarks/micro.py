@@ -0,0 +1,240 @@
+"""
+Микробенчмарки запросов репозиториев и функций рекомендаций, поиска, лент и
+дерева комментариев на синтетических данных (benchmarks.datagen).
+
+Каждый замер вызывает функцию с разными аргументами (id, категории, запросы
+берутся из тех же данных) не меньше --min-time секунд и печатает число
+вызовов в секунду, среднее и p50/p95/p99. Чтения идут по тёплому снимку, как
+в работающем приложении; построение производных структур (топы, индексы)
+замеряется отдельно. Записи идут последними и меняют только временную копию
+данных. Движок хранения - STORAGE_ENGINE (wal или sqlite).
+
+--json сохраняет результаты, --baseline сравнивает p50 с сохранёнными ранее
+и завершается с кодом 1, если что-то стало медленнее больше чем на --threshold.
+
+    python -m benchmarks.micro --videos 10000 --comments 50000 --json before.json
+    python -m benchmarks.micro --videos 10000 --comments 50000 --baseline before.json
+    python -m benchmarks.micro --filter recommendations
+"""
+
+import argparse
+import itertools
+import random
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from app.CRUD.category_repository import CategoryRepository
+from app.CRUD.comment_repository import CommentRepository
+from app.CRUD.storage import close_storages
+from app.CRUD.user_repository import UserRepository
+from app.CRUD.video_repository import VideoRepository
+from app.services.comment_tree import build_comment_tree
+from app.services.metrics import Metrics
+from app.services.personal_feed import build_personal_feed, get_user_history
+from app.services.recommendations import (
+    Leaderboard,
+    get_all_categories_with_top_videos,
+    get_category_recommendations,
+    get_leaderboard,
+    get_trending_videos,
+    get_videos_by_category,
+    popularity_score,
+)
+from app.services.related import CoComments, TextNeighbours, get_co_comments, get_related_videos, get_text_neighbours
+from app.services.search import SearchIndex, get_search_index
+from app.services.snapshot_cache import snapshot_cache
+from app.services.video_columns import VideoColumns, get_video_columns
+from app.services.video_listing import get_listing
+from benchmarks import datagen, report
+
+# (имя, функция одного аргумента, аргументы по кругу)
+Case = Tuple[str, Callable[[Any], Any], Sequence[Any]]
+
+
+def measure(fn: Callable[[Any], Any], args: Sequence[Any], min_time: float, max_calls: int) -> Dict[str, float]:
+    fn(args[0])  # прогрев: снимок, производные структуры
+    latencies: List[float] = []
+    started = time.perf_counter()
+    for arg in itertools.cycle(args):
+        call_started = time.perf_counter()
+        fn(arg)
+        finished = time.perf_counter()
+        latencies.append(finished - call_started)
+        if finished - started >= min_time or len(latencies) >= max_calls:
+            break
+    return report.summarize(latencies, sum(latencies))
+
+
+def read_cases(dataset: Dict[str, List[Dict[str, Any]]], data_dir: str, rng: random.Random) -> List[Case]:
+    videos_repo = VideoRepository(data_dir)
+    comments_repo = CommentRepository(data_dir)
+    users_repo = UserRepository(data_dir)
+    categories_repo = CategoryRepository(data_dir)
+
+    videos = dataset["videos"]
+    # Популярные видео запрашивают чаще - выборка по просмотрам, как у живого трафика
+    weights = list(itertools.accumulate(video["views"] + 1 for video in videos))
+    video_ids = [video["id"] for video in rng.choices(videos, cum_weights=weights, k=1000)]
+    user_ids = [user["id"] for user in rng.sample(dataset["users"], min(len(dataset["users"]), 1000))]
+    emails = [user["email"] for user in rng.sample(dataset["users"], min(len(dataset["users"]), 1000))]
+    names = [user["name"] for user in dataset["users"][:100]]
+    category_ids = [category["id"] for category in dataset["categories"]]
+    category_names = [category["name"] for category in dataset["categories"]]
+    comment_ids = [comment["id"] for comment in rng.sample(dataset["comments"], min(len(dataset["comments"]), 1000))]
+    parent_ids = [comment["parent_id"] for comment in dataset["comments"] if comment["parent_id"]][:1000] or [None]
+    queries = [" ".join(rng.sample(datagen.WORDS, rng.randint(1, 2))) for _ in range(200)]
+    prefixes = [rng.choice(datagen.WORDS)[:3] for _ in range(200)]
+
+    snapshot = list(videos_repo.get_all())
+    popular = get_leaderboard(videos_repo, "popularity")
+    by_views = get_leaderboard(videos_repo, "views")
+    search = get_search_index(videos_repo)
+    listing = get_listing(videos_repo, "date")
+    columns = get_video_columns(videos_repo)
+    get_text_neighbours(videos_repo)
+    get_co_comments(comments_repo)
+    thread_comments = [comments_repo.get_video_comments(video_id) for video_id in video_ids[:200]]
+
+    return [
+        ("videos.get_by_id", videos_repo.get_by_id, video_ids),
+        ("videos.get_by_user_id", videos_repo.get_by_user_id, user_ids),
+        ("videos.get_by_category", videos_repo.get_by_category, category_ids),
+        ("videos.get_public_videos", lambda _: videos_repo.get_public_videos(), [None]),
+        ("videos.search_by_name", videos_repo.search_by_name, queries),
+        ("videos.search_by_description", videos_repo.search_by_description, queries),
+        ("videos.get_trending", lambda limit: videos_repo.get_trending(limit), [10]),
+        ("videos.get_popular_by_likes", lambda limit: videos_repo.get_popular_by_likes(limit), [10]),
+        ("videos.get_similar_videos", videos_repo.get_similar_videos, video_ids),
+        ("videos.get_all", lambda _: videos_repo.get_all(), [None]),
+        ("comments.get_by_video_id", comments_repo.get_by_video_id, video_ids),
+        ("comments.get_root_comments", comments_repo.get_root_comments, video_ids),
+        ("comments.get_replies", comments_repo.get_replies, parent_ids),
+        ("comments.get_by_user_id", comments_repo.get_by_user_id, user_ids),
+        ("comments.get_comment_thread", comments_repo.get_comment_thread, comment_ids),
+        ("users.get_by_id", users_repo.get_by_id, user_ids),
+        ("users.get_by_email", users_repo.get_by_email, emails),
+        ("users.get_by_username", users_repo.get_by_username, names),
+        ("users.get_all_active", lambda _: users_repo.get_all_active(), [None]),
+        ("categories.get_by_name", categories_repo.get_by_name, category_names),
+        ("categories.get_all_active", lambda _: categories_repo.get_all_active(), [None]),
+        ("recommendations.trending[scan]", lambda limit: get_trending_videos(snapshot, limit), [10]),
+        ("recommendations.trending[leaderboard]", lambda limit: get_trending_videos([], limit, popular), [10]),
+        ("recommendations.trending[columns]", lambda limit: get_trending_videos([], limit, columns=columns), [10]),
+        ("recommendations.category[scan]", lambda vid: get_category_recommendations(vid, snapshot, 10), video_ids),
+        ("recommendations.category[leaderboard]",
+         lambda vid: get_category_recommendations(vid, [], 10, popular), video_ids),
+        ("recommendations.category[columns]",
+         lambda vid: get_category_recommendations(vid, [], 10, columns=columns), video_ids),
+        ("recommendations.by_category", lambda cid: get_videos_by_category(cid, snapshot, 10), category_ids),
+        ("recommendations.by_category[columns]",
+         lambda cid: get_videos_by_category(cid, [], 10, columns=columns), category_ids),
+        ("recommendations.top_per_category[scan]",
+         lambda _: get_all_categories_with_top_videos(snapshot, 3), [None]),
+        ("recommendations.top_per_category[leaderboard]",
+         lambda _: get_all_categories_with_top_videos([], 3, by_views), [None]),
+        ("recommendations.top_per_category[columns]",
+         lambda _: get_all_categories_with_top_videos([], 3, columns=columns), [None]),
+        ("columns.top", lambda by: columns.top(20, by), ["popularity", "views", "likes", "date"]),
+        ("columns.category_totals", lambda _: columns.category_totals(), [None]),
+        ("related.get", lambda vid: get_related_videos(videos_repo, comments_repo, vid, 10), video_ids),
+        ("feed.history", lambda uid: get_user_history(videos_repo, comments_repo, uid), user_ids),
+        ("feed.personal",
+         lambda uid: build_personal_feed(videos_repo, comments_repo, get_user_history(videos_repo, comments_repo, uid)),
+         user_ids),
+        ("search.words", lambda q: search.search(q, 20), queries),
+        ("search.prefix", lambda q: search.search(q, 20), prefixes),
+        ("listing.first_page", lambda cid: listing.page(20, category_id=cid), category_ids),
+        ("comment_tree.page", lambda comments: build_comment_tree(comments, limit=20), thread_comments),
+        ("build.leaderboard", lambda _: Leaderboard(snapshot, popularity_score), [None]),
+        ("build.search_index", lambda _: SearchIndex(snapshot), [None]),
+        ("build.video_columns", lambda _: VideoColumns(snapshot), [None]),
+        ("build.related_text", lambda _: TextNeighbours(snapshot), [None]),
+        ("build.co_comments", lambda _: CoComments(comments_repo.get_all()), [None]),
+    ] + metrics_cases()
+
+
+def metrics_cases() -> List[Case]:
+    """Цена замера на горячем пути (metrics.timer) - включённого и выключенного METRICS_ENABLED"""
+    cases = []
+    for state, enabled in (("on", True), ("off", False)):
+        registry = Metrics(enabled=enabled)
+
+        def timed(operation: str, registry: Metrics = registry):
+            with registry.timer("bench_seconds", "bench", operation=operation):
+                pass
+
+        cases.append((f"metrics.timer[{state}]", timed, ["stat_object", "download_bytes"]))
+    return cases
+
+
+def write_cases(dataset: Dict[str, List[Dict[str, Any]]], data_dir: str, rng: random.Random) -> List[Case]:
+    videos_repo = VideoRepository(data_dir)
+    comments_repo = CommentRepository(data_dir)
+    video_ids = [video["id"] for video in rng.sample(dataset["videos"], min(len(dataset["videos"]), 1000))]
+    user_ids = [user["id"] for user in dataset["users"]]
+
+    def update(video_id: str):
+        video = videos_repo.get_by_id(video_id)
+        videos_repo.update(video_id, {**video, "name": video["name"] + "!"})
+
+    def add_comment(video_id: str):
+        comments_repo.create({
+            "id": str(uuid.uuid4()),
+            "user_id": rng.choice(user_ids),
+            "video_id": video_id,
+            "parent_id": None,
+            "text": "бенчмарк",
+            "date": "2026-01-01T00:00:00Z",
+            "is_deleted": False,
+        })
+
+    batches = [{video_id: {"views": 1} for video_id in video_ids[i:i + 100]} for i in range(0, len(video_ids), 100)]
+    return [
+        ("videos.update", update, video_ids),
+        ("videos.apply_counter_deltas[100]", videos_repo.apply_counter_deltas, batches),
+        ("comments.create", add_comment, video_ids),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    datagen.add_arguments(parser)
+    parser.add_argument("--min-time", type=float, default=0.5, help="секунд на замер")
+    parser.add_argument("--max-calls", type=int, default=100000)
+    parser.add_argument("--filter", default="", help="только замеры, в имени которых есть эта строка")
+    parser.add_argument("--json", type=Path, help="сохранить результаты в файл")
+    parser.add_argument("--baseline", type=Path, help="сравнить с результатами прошлого прогона")
+    parser.add_argument("--threshold", type=float, default=0.2, help="допустимое замедление p50 (доля)")
+    args = parser.parse_args()
+
+    dataset = datagen.generate_from_args(args)
+    results = {}
+    with tempfile.TemporaryDirectory() as data_dir:
+        datagen.write_dataset(dataset, Path(data_dir))
+        snapshot_cache.invalidate()
+        rng = random.Random(args.seed)
+        cases = read_cases(dataset, data_dir, rng) + write_cases(dataset, data_dir, rng)
+        print(f"{'':48}{'calls':>9}{'calls/s':>12}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for name, fn, fn_args in cases:
+            if args.filter not in name:
+                continue
+            result = results[name] = measure(fn, fn_args, args.min_time, args.max_calls)
+            print(
+                f"{name:48}{result['count']:9}{result['per_second']:12.0f}{result['mean_ms']:10.3f}"
+                f"{result['p50_ms']:10.3f}{result['p95_ms']:10.3f}{result['p99_ms']:10.3f}",
+                flush=True,
+            )
+        close_storages()
+
+    if args.json:
+        report.save(results, args.json)
+    if args.baseline and report.compare(results, args.baseline, threshold=args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
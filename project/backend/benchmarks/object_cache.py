@@ -0,0 +1,63 @@
+"""
+Дисковый кэш объектов (CachedObjectStorage) на локальной замене MinIO.
+
+LocalObjectStore с задержкой --latency на запрос изображает сетевое
+хранилище; --objects объектов по --size байт читаются --threads потоками с
+популярностью по закону Ципфа (как превью и аватарки), кэш меньше суммарного
+объёма (--cache-mb). Сравнивается время без кэша и с ним, печатаются метрики.
+
+    python -m benchmarks.object_cache --objects 2000 --reads 20000
+"""
+
+import argparse
+import itertools
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.local_object_store import LocalObjectStore
+from app.services.object_cache import CachedObjectStorage
+
+
+def _run(storage, names, args) -> float:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        for data in pool.map(lambda name: storage.download_bytes("media", name), names):
+            assert data is not None and len(data) == args.size
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--objects", type=int, default=2000)
+    parser.add_argument("--size", type=int, default=64 * 1024)
+    parser.add_argument("--reads", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.005, help="задержка хранилища на запрос, секунд")
+    parser.add_argument("--cache-mb", type=float, default=32)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        store = LocalObjectStore(f"{root}/store")
+        store.create_bucket("media")
+        for i in range(args.objects):
+            store.upload_bytes("media", f"thumb-{i}.jpg", random.randbytes(args.size))
+        store.latency = args.latency
+
+        cum_weights = list(itertools.accumulate(1 / (i + 1) for i in range(args.objects)))
+        names = [f"thumb-{i}.jpg" for i in random.choices(range(args.objects), cum_weights=cum_weights, k=args.reads)]
+
+        store.requests = 0
+        direct = _run(store, names, args)
+        print(f"no cache   {direct:6.2f}s  {args.reads / direct:8.0f} reads/s  store requests {store.requests}")
+
+        cache = CachedObjectStorage(store, f"{root}/cache", max_bytes=int(args.cache_mb * 2 ** 20))
+        store.requests = 0
+        cached = _run(cache, names, args)
+        print(f"disk cache {cached:6.2f}s  {args.reads / cached:8.0f} reads/s  store requests {store.requests}")
+        print(cache.stats())
+
+
+if __name__ == "__main__":
+    main()
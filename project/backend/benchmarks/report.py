@@ -0,0 +1,59 @@
+"""Общее для бенчмарков: перцентили задержек, сохранение результатов и сравнение с базовым прогоном"""
+
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+
+def percentile(ordered: Sequence[float], q: float) -> float:
+    """q-й перцентиль (0..100) уже отсортированных значений, ближайший ранг"""
+    if not ordered:
+        return 0.0
+    rank = max(int(len(ordered) * q / 100 + 0.999999) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def summarize(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    """Сводка по задержкам в секундах: количество, операций в секунду, среднее и p50/p95/p99 в мс"""
+    ordered = sorted(latencies)
+    count = len(ordered)
+    return {
+        "count": count,
+        "per_second": count / elapsed if elapsed else 0.0,
+        "mean_ms": sum(ordered) / count * 1000 if count else 0.0,
+        "p50_ms": percentile(ordered, 50) * 1000,
+        "p95_ms": percentile(ordered, 95) * 1000,
+        "p99_ms": percentile(ordered, 99) * 1000,
+    }
+
+
+def save(results: Dict[str, Dict[str, float]], path: Path):
+    path.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline_path: Path,
+    metric: str = "p50_ms",
+    threshold: float = 0.2,
+) -> List[str]:
+    """
+    Сравнить metric с сохранённым прогоном (--json прошлого запуска) и
+    напечатать изменения. Возвращает имена замеров, ставших медленнее больше
+    чем на threshold (доля).
+    """
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    regressions = []
+    print(f"\nсравнение с {baseline_path} ({metric}, порог {threshold:.0%}):")
+    for name, result in results.items():
+        before: Optional[float] = baseline.get(name, {}).get(metric)
+        if not before:
+            print(f"  {name:48} нет в базовом прогоне")
+            continue
+        change = result[metric] / before - 1
+        mark = ""
+        if change > threshold:
+            mark = "  <- медленнее"
+            regressions.append(name)
+        print(f"  {name:48} {before:10.3f} -> {result[metric]:10.3f}  {change:+7.1%}{mark}")
+    return regressions
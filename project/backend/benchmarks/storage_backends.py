@@ -0,0 +1,135 @@
+"""
+JSON (снимок + журнал, STORAGE_ENGINE=wal) против SQLite (STORAGE_ENGINE=sqlite)
+на --sizes видео.
+
+Для каждого размера и движка: начальная загрузка, первое чтение "с холода"
+(JSON-репозиторий читает и парсит весь файл, SQLite - одну строку), чтение по
+id и по категории, create/update и пачка приращений счётчиков, полный снимок
+(get_all) и размер данных на диске. Каждый прогон - в отдельном процессе
+(данные те же): если JSON-движку не хватит памяти, это будет видно в таблице.
+
+    python -m benchmarks.storage_backends --sizes 10000,100000,1000000
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from app.CRUD.storage import atomic_write, close_storages, encode_json
+from app.CRUD.video_repository import VideoRepository
+from app.services.snapshot_cache import snapshot_cache
+
+WORDS = "кот собака музыка обзор игра урок python vue новости спорт путешествие рецепт".split()
+
+
+def make_videos(count: int, categories: int = 20) -> list:
+    users = [str(uuid.uuid4()) for _ in range(max(count // 10, 1))]
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "user_id": random.choice(users),
+            "name": " ".join(random.choices(WORDS, k=4)),
+            "description": " ".join(random.choices(WORDS, k=20)),
+            "date": f"2025-{random.randint(1, 12):02}-{random.randint(1, 28):02}T12:00:00+00:00",
+            "likes": random.randint(0, 1000),
+            "dislikes": random.randint(0, 100),
+            "views": random.randint(0, 100000),
+            "is_public": random.random() < 0.9,
+            "is_deleted": random.random() < 0.02,
+            "category_id": f"cat-{random.randrange(categories)}",
+            "version": 1,
+        }
+        for _ in range(count)
+    ]
+
+
+def _per_op(fn, items) -> float:
+    started = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - started) / len(items) * 1e6
+
+
+def _disk_size(data_dir: Path) -> int:
+    return sum(path.stat().st_size for path in data_dir.iterdir() if path.is_file())
+
+
+def run(engine: str, size: int, args) -> dict:
+    os.environ["STORAGE_ENGINE"] = engine
+    random.seed(size)
+    videos = make_videos(size)
+    ids = [video["id"] for video in random.sample(videos, min(args.reads, size))]
+    result = {}
+    with tempfile.TemporaryDirectory() as root:
+        data_dir = Path(root)
+        started = time.perf_counter()
+        if engine == "sqlite":
+            os.environ["SQLITE_PATH"] = str(data_dir / "mypipe.db")
+            VideoRepository(root).insert_many(videos)
+        else:
+            atomic_write(data_dir / "videos.json", encode_json(videos))
+        result["load_s"] = time.perf_counter() - started
+        del videos
+        close_storages()
+        snapshot_cache.invalidate()
+
+        repo = VideoRepository(root)
+        started = time.perf_counter()
+        repo.get_by_id(ids[0])
+        result["cold_read_ms"] = (time.perf_counter() - started) * 1000
+        result["get_by_id_us"] = _per_op(repo.get_by_id, ids)
+        categories = [f"cat-{i % 20}" for i in range(50)]
+        result["by_category_ms"] = _per_op(repo.get_by_category, categories) / 1000
+
+        result["update_us"] = _per_op(
+            lambda video_id: repo.update(video_id, {**repo.get_by_id(video_id), "name": "обновлено"}),
+            ids[:args.writes],
+        )
+        new = make_videos(args.writes)
+        result["create_us"] = _per_op(repo.create, new)
+        batches = [{video_id: {"views": 1} for video_id in ids[i:i + 100]} for i in range(0, args.writes, 100)]
+        result["counters_100_ms"] = _per_op(repo.apply_counter_deltas, batches) / 1000
+
+        started = time.perf_counter()
+        assert len(repo.get_all()) == size + args.writes
+        result["get_all_s"] = time.perf_counter() - started
+        close_storages()
+        result["disk_mb"] = _disk_size(data_dir) / 2 ** 20
+    return result
+
+
+def _child(engine: str, size: int, args, queue):
+    queue.put(run(engine, size, args))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--reads", type=int, default=5000)
+    parser.add_argument("--writes", type=int, default=500)
+    args = parser.parse_args()
+
+    columns = ("load_s", "cold_read_ms", "get_by_id_us", "by_category_ms", "update_us", "create_us",
+               "counters_100_ms", "get_all_s", "disk_mb")
+    print(f"{'records':>8} {'engine':7}" + "".join(f"{name:>16}" for name in columns))
+    ctx = multiprocessing.get_context("spawn")
+    for size in (int(s) for s in args.sizes.split(",")):
+        for engine in ("wal", "sqlite"):
+            queue = ctx.Queue()
+            process = ctx.Process(target=_child, args=(engine, size, args, queue))
+            process.start()
+            process.join()
+            if process.exitcode != 0:
+                print(f"{size:8} {engine:7}  не завершился (код {process.exitcode}; -9 - не хватило памяти)")
+                continue
+            result = queue.get()
+            print(f"{size:8} {engine:7}" + "".join(f"{result[name]:16.2f}" for name in columns), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Пропускная способность раздачи видео: прокси бэкенда (/api/video/{id}/stream)
+против прямого чтения из MinIO по подписанной ссылке.
+
+Нужны запущенные MinIO и бэкенд (один воркер uvicorn - меряем пропускную
+способность на воркер) и объект video/<video_id>.mp4. Оба варианта получают
+одинаковую нагрузку: --requests запросов случайных диапазонов по --range-size
+байт (как при перемотке) с --concurrency одновременно, плюс --full запросов
+файла целиком.
+
+    python -m benchmarks.stream_throughput --video-id 770e8400-e29b-41d4-a716-446655440000
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+
+from app.services.minio_storage import MinIOStorage
+
+
+async def _fetch(client: httpx.AsyncClient, url: str, headers: dict) -> int:
+    received = 0
+    async with client.stream("GET", url, headers=headers) as response:
+        if response.status_code not in (200, 206):
+            raise RuntimeError(f"{url}: HTTP {response.status_code}")
+        async for chunk in response.aiter_raw():
+            received += len(chunk)
+    return received
+
+
+async def _run(client: httpx.AsyncClient, url: str, size: int, args) -> dict:
+    slots = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def one(headers: dict) -> int:
+        async with slots:
+            started = time.perf_counter()
+            received = await _fetch(client, url, headers)
+            latencies.append(time.perf_counter() - started)
+            return received
+
+    jobs = []
+    for _ in range(args.requests):
+        start = random.randrange(max(size - args.range_size, 1))
+        jobs.append({"Range": f"bytes={start}-{start + args.range_size - 1}"})
+    jobs.extend({} for _ in range(args.full))
+
+    started = time.perf_counter()
+    received = sum(await asyncio.gather(*[one(headers) for headers in jobs]))
+    total = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "seconds": total,
+        "mb_per_s": received / total / 2 ** 20,
+        "req_per_s": len(jobs) / total,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000,
+    }
+
+
+def _report(name: str, result: dict):
+    print(
+        f"{name:8} {result['seconds']:6.2f}s  {result['mb_per_s']:8.1f} MiB/s  {result['req_per_s']:7.0f} req/s  "
+        f"p50 {result['p50_ms']:7.1f} ms  p99 {result['p99_ms']:7.1f} ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--video-id", required=True)
+    parser.add_argument("--api", default="http://localhost:8000", help="адрес бэкенда")
+    parser.add_argument("--minio", default="localhost:9000", help="адрес MinIO")
+    parser.add_argument("--access-key", default="minioadmin")
+    parser.add_argument("--secret-key", default="minioadmin")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=500, help="запросов случайных диапазонов")
+    parser.add_argument("--range-size", type=int, default=1024 * 1024)
+    parser.add_argument("--full", type=int, default=4, help="запросов файла целиком")
+    args = parser.parse_args()
+
+    storage = MinIOStorage(endpoint=args.minio, access_key=args.access_key, secret_key=args.secret_key)
+    object_name = f"{args.video_id}.mp4"
+    info = storage.stat_object("video", object_name)
+    if info is None:
+        raise SystemExit(f"Нет объекта video/{object_name}")
+    direct_url = storage.get_presigned_url("video", object_name, 3600)
+    proxy_url = f"{args.api}/api/video/{args.video_id}/stream"
+    print(f"object {info['size'] / 2 ** 20:.1f} MiB, {args.requests} x {args.range_size} B ranges + {args.full} full")
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=None) as client:
+        await _fetch(client, proxy_url, {"Range": "bytes=0-0"})  # прогрев кэша метаданных
+        _report("direct", await _run(client, direct_url, info["size"], args))
+        _report("proxy", await _run(client, proxy_url, info["size"], args))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
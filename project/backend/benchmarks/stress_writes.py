@@ -0,0 +1,139 @@
+"""
+Стресс-тест конкурентной записи в репозитории.
+
+Несколько процессов (как воркеры uvicorn), в каждом по несколько потоков,
+одновременно создают комментарии, прибавляют просмотры и правят одну и ту же
+запись с оптимистической блокировкой по версии. В конце проверяется, что ни
+одна запись не потерялась.
+
+    python -m benchmarks.stress_writes --processes 4 --threads 4 --ops 200
+    STORAGE_ENGINE=json python -m benchmarks.stress_writes
+    STORAGE_ENGINE=sqlite python -m benchmarks.stress_writes
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from app.CRUD.base_repository import VersionConflictError
+from app.CRUD.comment_repository import CommentRepository
+from app.CRUD.storage import close_storages
+from app.CRUD.video_repository import VideoRepository
+from app.services.snapshot_cache import snapshot_cache
+from migrate_to_sqlite import migrate
+
+SOURCE_DATA = Path(__file__).resolve().parent.parent / "data"
+VIDEO_ID = "770e8400-e29b-41d4-a716-446655440000"
+
+
+def thread_work(data_dir: str, video_id: str, ops: int, conflicts: list):
+    """
+    Один поток нагрузки: ops раз создаёт комментарий к video_id, прибавляет
+    просмотр и правит запись (повторяя при конфликте версий). Число повторов
+    добавляется в conflicts.
+    """
+    videos = VideoRepository(data_dir)
+    comments = CommentRepository(data_dir)
+    retries = 0
+    for i in range(ops):
+        comments.create({
+            "id": str(uuid.uuid4()),
+            "user_id": "stress",
+            "video_id": video_id,
+            "parent_id": None,
+            "text": f"stress {i}",
+            "date": "2025-12-16T10:00:00Z",
+            "is_deleted": False,
+        })
+        videos.increment_views(video_id)
+        while True:
+            video = videos.get_by_id(video_id)
+            try:
+                videos.update(video_id, {**video, "edits": video.get("edits", 0) + 1})
+                break
+            except VersionConflictError:
+                retries += 1
+    conflicts.append(retries)
+
+
+def process_work(data_dir: str, video_id: str, threads: int, ops: int, queue):
+    """Процесс нагрузки (как воркер uvicorn): threads потоков thread_work; в queue - сумма повторов"""
+    conflicts: list = []
+    workers = [
+        threading.Thread(target=thread_work, args=(data_dir, video_id, ops, conflicts))
+        for _ in range(threads)
+    ]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    close_storages()
+    queue.put(sum(conflicts))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--ops", type=int, default=100, help="операций каждого вида на поток")
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="mypipe-stress-")
+    try:
+        shutil.copytree(SOURCE_DATA, data_dir, dirs_exist_ok=True)
+        if os.getenv("STORAGE_ENGINE") == "sqlite":
+            migrate(Path(data_dir), Path(data_dir) / "mypipe.db")
+        video_before = VideoRepository(data_dir).get_by_id(VIDEO_ID)
+        comments_before = len(CommentRepository(data_dir).get_all())
+
+        ctx = multiprocessing.get_context("spawn")
+        queue = ctx.Queue()
+        started = time.perf_counter()
+        procs = [
+            ctx.Process(target=process_work, args=(data_dir, VIDEO_ID, args.threads, args.ops, queue))
+            for _ in range(args.processes)
+        ]
+        for p in procs:
+            p.start()
+        conflicts = sum(queue.get() for _ in procs)
+        for p in procs:
+            p.join()
+        elapsed = time.perf_counter() - started
+
+        # Проверяем то, что лежит на диске, а не снимок в памяти этого процесса
+        snapshot_cache.invalidate()
+
+        total = args.processes * args.threads * args.ops
+        video_after = VideoRepository(data_dir).get_by_id(VIDEO_ID)
+        comments_after = len(CommentRepository(data_dir).get_all())
+
+        expected = {
+            "comments": comments_before + total,
+            "views": video_before["views"] + total,
+            "edits": total,
+        }
+        actual = {
+            "comments": comments_after,
+            "views": video_after["views"],
+            "edits": video_after.get("edits", 0),
+        }
+        print(f"{total * 3} writes in {elapsed:.2f}s ({total * 3 / elapsed:.0f}/s), version conflicts retried: {conflicts}")
+        ok = True
+        for key, value in expected.items():
+            status = "ok" if actual[key] == value else "LOST WRITES"
+            ok = ok and actual[key] == value
+            print(f"  {key}: expected {value}, got {actual[key]} - {status}")
+        return 0 if ok else 1
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
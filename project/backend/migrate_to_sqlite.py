@@ -0,0 +1,82 @@
+"""
+Перенос данных из data/*.json (с учётом журналов .wal) в SQLite.
+
+После переноса приложение запускается с STORAGE_ENGINE=sqlite (файл базы -
+SQLITE_PATH или data/mypipe.db). Уже заполненные таблицы пропускаются,
+--force переносит их заново.
+
+    python migrate_to_sqlite.py
+    python migrate_to_sqlite.py --data-dir data --db /var/lib/mypipe/mypipe.db --force
+"""
+
+import argparse
+import os
+import time
+from pathlib import Path
+
+from app.CRUD.category_repository import CategoryRepository
+from app.CRUD.comment_repository import CommentRepository
+from app.CRUD.sqlite_repository import sqlite_variant
+from app.CRUD.storage import WalStorage, close_storages, get_database, sqlite_path
+from app.CRUD.user_repository import UserRepository
+from app.CRUD.video_repository import VideoRepository
+
+REPOSITORIES = (
+    ("videos.json", VideoRepository),
+    ("comments.json", CommentRepository),
+    ("users.json", UserRepository),
+    ("categories.json", CategoryRepository),
+)
+BATCH_SIZE = 10000
+
+
+def migrate(data_dir: Path, db_path: Path, force: bool = False):
+    # Репозитории открывают базу по SQLITE_PATH
+    os.environ["SQLITE_PATH"] = str(db_path)
+    database = get_database(db_path)
+    for filename, repository_class in REPOSITORIES:
+        source = data_dir / filename
+        if not source.exists():
+            print(f"  {filename}: нет файла, пропущен")
+            continue
+        repo = sqlite_variant(repository_class)(str(data_dir))
+        table = repo.table
+        existing = database.reader().execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+        if existing and not force:
+            print(f"  {table}: уже {existing} записей, пропущена (--force - перенести заново)")
+            continue
+
+        started = time.perf_counter()
+        # Снимок JSON плюс журнал: ровно то, что видит приложение
+        items = WalStorage(source).load()
+        valid = [item for item in items if item.get("id") is not None]
+        with database:
+            database.writer.execute(f'DELETE FROM "{table}"')
+            for i in range(0, len(valid), BATCH_SIZE):
+                repo.insert_many(valid[i:i + BATCH_SIZE])
+        count = database.reader().execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+        skipped = len(items) - len(valid)
+        print(
+            f"  {table}: {count} записей за {time.perf_counter() - started:.2f}s"
+            + (f", без id пропущено: {skipped}" if skipped else "")
+        )
+    database.writer.execute("ANALYZE")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default=str(Path(__file__).resolve().parent / "data"))
+    parser.add_argument("--db", help="файл базы (по умолчанию SQLITE_PATH или <data-dir>/mypipe.db)")
+    parser.add_argument("--force", action="store_true", help="перенести заново уже заполненные таблицы")
+    args = parser.parse_args()
+
+    data_dir = Path(args.data_dir)
+    db_path = Path(args.db) if args.db else sqlite_path(data_dir)
+    print(f" Перенос {data_dir}/*.json -> {db_path}")
+    migrate(data_dir, db_path, args.force)
+    close_storages()
+    print(f"\n Готово. Запуск на SQLite: STORAGE_ENGINE=sqlite SQLITE_PATH={os.path.abspath(db_path)}")
+
+
+if __name__ == "__main__":
+    main()
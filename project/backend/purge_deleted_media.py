@@ -0,0 +1,52 @@
+"""
+Удаление из MinIO файлов видео, помеченных удалёнными (is_deleted), и их превью.
+
+Видео - video/<id>.mp4, превью - объекты бакета thumbnails, имя которых
+начинается с <id>. Удаление пакетами (S3 DeleteObjects), листинг превью -
+генератором, так что объём бакета не важен.
+
+    python purge_deleted_media.py --dry-run
+"""
+
+import argparse
+import os
+from pathlib import Path
+
+from app.CRUD.video_repository import VideoRepository
+from app.services.minio_storage import MinIOStorage
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+
+
+def purge_deleted_media(storage: MinIOStorage, video_repo: VideoRepository, dry_run: bool = False) -> dict:
+    deleted = {video["id"] for video in video_repo.get_all() if video.get("is_deleted", False)}
+    videos = [f"{video_id}.mp4" for video_id in sorted(deleted)]
+    # id - UUID фиксированной длины: превью <id>.jpg, <id>/poster.jpg и т.п.
+    thumbnails = [
+        obj["name"] for obj in storage.list_objects("thumbnails")
+        if obj["name"][:36] in deleted
+    ]
+    if dry_run:
+        return {"videos": len(videos), "thumbnails": len(thumbnails), "errors": []}
+    errors = storage.delete_objects("video", videos) + storage.delete_objects("thumbnails", thumbnails)
+    return {"videos": len(videos), "thumbnails": len(thumbnails), "errors": errors}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="только посчитать, ничего не удалять")
+    args = parser.parse_args()
+
+    storage = MinIOStorage(
+        endpoint=os.getenv("MINIO_ENDPOINT", "minio:9000"),
+        access_key=os.getenv("MINIO_ACCESS_KEY", "minioadmin"),
+        secret_key=os.getenv("MINIO_SECRET_KEY", "minioadmin"),
+    )
+    result = purge_deleted_media(storage, VideoRepository(str(DATA_DIR)), args.dry_run)
+    print(f" Видео: {result['videos']}, превью: {result['thumbnails']}, ошибок: {len(result['errors'])}")
+    for error in result["errors"]:
+        print(f"   {error['name']}: {error['code']} {error['message']}")
+
+
+if __name__ == "__main__":
+    main()
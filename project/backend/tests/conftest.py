@@ -0,0 +1,88 @@
+import importlib
+import json
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services.local_object_store import LocalObjectStore
+
+
+@pytest.fixture
+def data_dir(tmp_path: Path) -> Callable[..., Path]:
+    """
+    Папка данных во временном каталоге: data_dir(videos=[...], comments=[...])
+    пишет переданные таблицы в <таблица>.json и возвращает путь к папке.
+    """
+
+    def write(**tables: List[Dict[str, Any]]) -> Path:
+        directory = tmp_path / "data"
+        directory.mkdir(exist_ok=True)
+        for table, items in tables.items():
+            (directory / f"{table}.json").write_text(json.dumps(items), encoding="utf-8")
+        return directory
+
+    return write
+
+
+def make_video(video_id: str, **fields: Any) -> Dict[str, Any]:
+    video = {
+        "id": video_id,
+        "user_id": "u1",
+        "name": f"video {video_id}",
+        "description": "",
+        "date": "2024-01-01T00:00:00+00:00",
+        "likes": 0,
+        "dislikes": 0,
+        "views": 0,
+        "is_public": True,
+        "is_deleted": False,
+        "category_id": "c1",
+    }
+    video.update(fields)
+    return video
+
+
+# Данные приложения для тестов маршрутов: 9 публичных видео в двух категориях
+# (у v3 и v3b одинаковые дата и просмотры), одно скрытое и одно удалённое
+APP_VIDEOS = [
+    make_video(f"v{i}", date=f"2024-01-{10 + i:02d}T00:00:00+00:00", views=100 - i * 10,
+               category_id="c1" if i % 2 else "c2")
+    for i in range(1, 9)
+] + [
+    make_video("v3b", date="2024-01-13T00:00:00+00:00", views=70, category_id="c1"),
+    make_video("hidden", is_public=False),
+    make_video("deleted", is_deleted=True),
+]
+
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    """
+    Модуль app.app поверх временной папки данных (настройки читаются при
+    импорте, поэтому один на сессию) и LocalObjectStore вместо MinIO.
+    """
+    root = tmp_path_factory.mktemp("app")
+    directory = root / "data"
+    directory.mkdir()
+    for table, items in {"videos": APP_VIDEOS, "comments": [], "users": [], "categories": []}.items():
+        (directory / f"{table}.json").write_text(json.dumps(items), encoding="utf-8")
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("DATA_DIR", str(directory))
+        patch.setenv("OBJECT_CACHE_DIR", str(root / "cache"))
+        module = importlib.import_module("app.app")
+
+    store = LocalObjectStore(str(root / "objects"))
+    module.async_minio.storage = store
+    module.video_streamer.storage = store
+    module.video_uploader.storage = store
+    if module.object_cache is not None:
+        module.object_cache.storage = store
+    return module
+
+
+@pytest.fixture
+def client(app_module) -> TestClient:
+    return TestClient(app_module.app)
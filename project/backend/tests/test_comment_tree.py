@@ -0,0 +1,111 @@
+from typing import Any, Dict, List, Optional
+
+from app.services.comment_tree import build_comment_tree
+
+
+def comment(comment_id: str, parent_id: Optional[str] = None, is_deleted: bool = False) -> Dict[str, Any]:
+    return {
+        "id": comment_id,
+        "user_id": "u1",
+        "video_id": "v1",
+        "parent_id": parent_id,
+        "text": f"text {comment_id}",
+        "date": "2024-01-01T00:00:00+00:00",
+        "is_deleted": is_deleted,
+    }
+
+
+def ids(nodes: List[Dict[str, Any]]) -> List[str]:
+    return [node["id"] for node in nodes]
+
+
+def test_replies_are_nested_in_order():
+    tree = build_comment_tree([comment("a"), comment("b", "a"), comment("c"), comment("d", "b"), comment("e", "a")])
+    a, c = tree["items"]
+    assert ids(tree["items"]) == ["a", "c"]
+    assert ids(a["replies"]) == ["b", "e"]
+    assert ids(a["replies"][0]["replies"]) == ["d"]
+    assert (a["depth"], a["replies"][0]["depth"], a["replies"][0]["replies"][0]["depth"]) == (0, 1, 2)
+    assert (a["reply_count"], a["total_replies"]) == (2, 3)
+    assert (c["reply_count"], c["total_replies"], c["replies"]) == (0, 0, [])
+    assert tree["total_roots"] == 2 and tree["next_offset"] is None
+
+
+def test_deleted_parent_with_live_replies_is_a_tombstone():
+    tree = build_comment_tree([comment("a", is_deleted=True), comment("b", "a"), comment("c", is_deleted=True)])
+    # c удалён и без ответов - его нет; a остаётся заглушкой ради ответа b
+    assert ids(tree["items"]) == ["a"]
+    tombstone = tree["items"][0]
+    assert tombstone["is_deleted"] is True
+    assert tombstone["text"] is None and tombstone["user_id"] is None
+    assert (tombstone["video_id"], tombstone["date"]) == ("v1", "2024-01-01T00:00:00+00:00")
+    assert ids(tombstone["replies"]) == ["b"]
+    assert tombstone["total_replies"] == 1
+
+
+def test_deleted_replies_do_not_count():
+    tree = build_comment_tree([
+        comment("a"),
+        comment("b", "a", is_deleted=True),
+        comment("c", "b", is_deleted=True),
+        comment("d", "a", is_deleted=True),
+        comment("e", "d"),
+    ])
+    a = tree["items"][0]
+    # Ветка b - только удалённые, она пропадает; d - заглушка над живым e
+    assert ids(a["replies"]) == ["d"]
+    assert (a["reply_count"], a["total_replies"]) == (1, 1)
+    assert a["replies"][0]["is_deleted"] is True
+    assert ids(a["replies"][0]["replies"]) == ["e"]
+
+
+def test_orphans_become_roots():
+    tree = build_comment_tree([comment("a"), comment("b", "missing"), comment("c", "b"), comment("d", "d")])
+    assert ids(tree["items"]) == ["a", "b", "d"]
+    assert ids(tree["items"][1]["replies"]) == ["c"]
+
+
+def test_max_depth_truncates_with_has_more_replies():
+    comments = [comment("a"), comment("b", "a"), comment("c", "b"), comment("d", "c"), comment("e")]
+
+    flat = build_comment_tree(comments, max_depth=0)
+    a, e = flat["items"]
+    assert a["replies"] == [] and a["has_more_replies"] is True
+    assert (a["reply_count"], a["total_replies"]) == (1, 3)
+    assert e["has_more_replies"] is False
+
+    tree = build_comment_tree(comments, max_depth=1)
+    b = tree["items"][0]["replies"][0]
+    assert tree["items"][0]["has_more_replies"] is False
+    assert b["replies"] == [] and b["has_more_replies"] is True
+
+    # Продолжение обрезанной ветки - с root_id
+    branch = build_comment_tree(comments, root_id="b", max_depth=1)
+    assert ids(branch["items"]) == ["b"]
+    assert ids(branch["items"][0]["replies"]) == ["c"]
+    assert branch["items"][0]["replies"][0]["has_more_replies"] is True
+
+    assert build_comment_tree(comments)["items"][0]["replies"][0]["replies"][0]["replies"][0]["id"] == "d"
+
+
+def test_root_pagination():
+    comments = [comment(f"r{i}") for i in range(5)] + [comment("x", "r1"), comment("gone", is_deleted=True)]
+
+    first = build_comment_tree(comments, limit=2)
+    assert ids(first["items"]) == ["r0", "r1"]
+    assert ids(first["items"][1]["replies"]) == ["x"]
+    assert (first["total_roots"], first["next_offset"]) == (5, 2)
+
+    last = build_comment_tree(comments, limit=2, offset=4)
+    assert ids(last["items"]) == ["r4"]
+    assert last["next_offset"] is None
+
+    newest = build_comment_tree(comments, limit=2, newest_first=True)
+    assert ids(newest["items"]) == ["r4", "r3"]
+    assert ids(build_comment_tree(comments, limit=2, offset=10)["items"]) == []
+
+
+def test_missing_or_hidden_root_id():
+    comments = [comment("a", is_deleted=True), comment("b")]
+    assert build_comment_tree(comments, root_id="a")["items"] == []
+    assert build_comment_tree(comments, root_id="nope")["items"] == []
@@ -0,0 +1,96 @@
+import multiprocessing
+import queue
+import time
+from pathlib import Path
+
+import pytest
+
+from app.CRUD.base_repository import VersionConflictError
+from app.CRUD.comment_repository import CommentRepository
+from app.CRUD.locking import FileLock
+from app.CRUD.video_repository import VideoRepository
+from app.services.snapshot_cache import snapshot_cache
+from benchmarks.stress_writes import process_work
+from migrate_to_sqlite import migrate
+
+from .conftest import make_video
+
+PROCESSES = 2
+THREADS = 2
+OPS = 10
+
+
+def _hold_lock(path: str, results):
+    with FileLock(Path(path)):
+        results.put(time.monotonic())
+
+
+@pytest.fixture
+def videos(data_dir):
+    return VideoRepository(str(data_dir(videos=[make_video("v1", views=5, version=1)], comments=[])))
+
+
+def test_update_with_stale_version_conflicts(videos):
+    video = videos.get_by_id("v1")
+    first = videos.update("v1", {**video, "name": "first"})
+    assert first["version"] == 2
+
+    with pytest.raises(VersionConflictError) as error:
+        videos.update("v1", {**video, "name": "stale"})
+    assert (error.value.item_id, error.value.expected, error.value.actual) == ("v1", 1, 2)
+    assert videos.get_by_id("v1")["name"] == "first"
+
+    # Без version - безусловная замена; счётчики update() не перезаписывает
+    videos.increment_views("v1")
+    updated = videos.update("v1", {"name": "second", "views": 0})
+    assert updated["version"] == 3
+    assert videos.get_by_id("v1")["views"] == 6
+
+
+def test_file_lock_excludes_other_processes(tmp_path):
+    path = str(tmp_path / "videos.json.lock")
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    lock = FileLock(Path(path))
+    with lock:
+        with lock:  # реентерабельна в своём потоке
+            assert lock.held()
+        child = ctx.Process(target=_hold_lock, args=(path, results))
+        child.start()
+        with pytest.raises(queue.Empty):
+            results.get(timeout=1.0)
+        released = time.monotonic()
+    acquired = results.get(timeout=30)
+    child.join()
+    assert acquired >= released
+    assert not lock.held()
+
+
+@pytest.mark.parametrize("engine", ["wal", "json", "sqlite"])
+def test_writes_from_several_processes_are_not_lost(data_dir, monkeypatch, engine):
+    monkeypatch.setenv("STORAGE_ENGINE", engine)
+    # С version каждое update() проверяет версию - без неё первое обновление безусловное
+    directory = data_dir(videos=[make_video("v1", views=5, version=1)], comments=[], users=[], categories=[])
+    if engine == "sqlite":
+        monkeypatch.setenv("SQLITE_PATH", str(directory / "mypipe.db"))
+        migrate(directory, directory / "mypipe.db")
+
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    processes = [ctx.Process(target=process_work, args=(str(directory), "v1", THREADS, OPS, results)) for _ in range(PROCESSES)]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        results.get(timeout=120)
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    # Проверяем то, что на диске, а не снимок в памяти этого процесса
+    snapshot_cache.invalidate()
+    total = PROCESSES * THREADS * OPS
+    video = VideoRepository(str(directory)).get_by_id("v1")
+    assert len(CommentRepository(str(directory)).get_all()) == total
+    assert video["views"] == 5 + total
+    assert video["edits"] == total
+    assert video["version"] > total
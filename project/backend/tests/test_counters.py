@@ -0,0 +1,55 @@
+import pytest
+
+from app.CRUD.video_repository import VideoRepository
+from app.services.counters import CounterAggregator
+from app.services.snapshot_cache import snapshot_cache
+
+from .conftest import make_video
+
+
+@pytest.fixture
+def videos(data_dir):
+    return VideoRepository(str(data_dir(videos=[make_video("v1"), make_video("v2", views=10)])))
+
+
+def test_flush_writes_deltas(videos):
+    counters = CounterAggregator(videos.apply_counter_deltas)
+    for _ in range(3):
+        counters.increment("v1", "views")
+    counters.increment("v2", "likes")
+
+    assert counters.flush() == 2
+    assert videos.get_by_id("v1")["views"] == 3
+    assert videos.get_by_id("v2")["likes"] == 1
+    assert counters.pending("v1") == {}
+
+
+def test_failed_write_keeps_deltas(videos, monkeypatch):
+    counters = CounterAggregator(videos.apply_counter_deltas)
+    counters.increment("v1", "views", 2)
+    counters.increment("v2", "views", 5)
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(videos.storage, "write", fail)
+    assert counters.flush() == 0
+    assert counters.flush_errors == 1
+    # Приращения вернулись в накопитель, а в данные ничего не попало
+    assert counters.pending("v1") == {"views": 2}
+    assert counters.pending("v2") == {"views": 5}
+    assert videos.get_by_id("v1")["views"] == 0
+    assert videos.get_by_id("v2")["views"] == 10
+
+    # Пока запись не удалась, новые приращения складываются с возвращёнными
+    counters.increment("v1", "views")
+    monkeypatch.undo()
+    assert counters.flush() == 2
+    assert videos.get_by_id("v1")["views"] == 3
+    assert videos.get_by_id("v2")["views"] == 15
+    assert counters.stats()["pending_delta"] == 0
+
+    # И на диске тоже: снимок перечитывается из файла и журнала
+    snapshot_cache.invalidate(videos.file_path)
+    assert videos.get_by_id("v1")["views"] == 3
+    assert videos.get_by_id("v2")["views"] == 15
@@ -0,0 +1,116 @@
+import gzip
+
+import pytest
+
+from app.services import http_cache
+from app.services.http_cache import choose_encoding, if_none_match, make_etag
+from app.services.responses import Payload
+
+
+def test_if_none_match_forms():
+    etag = make_etag("videos.json:1", "key")
+    bare = etag.strip('"')
+    assert if_none_match(etag, etag)
+    assert if_none_match(f'W/{etag}', etag)
+    assert if_none_match(f'"other", {etag}', etag)
+    assert if_none_match("*", etag)
+    # Сжатые представления - то же содержимое
+    assert if_none_match(f'"{bare}-gzip"', etag) and if_none_match(f'"{bare}-br"', etag)
+    assert not if_none_match('"other"', etag) and not if_none_match(None, etag)
+    assert make_etag("videos.json:2", "key") != etag
+
+
+@pytest.mark.parametrize("header, with_brotli, expected", [
+    (None, True, None),
+    ("identity", True, None),
+    ("gzip, deflate", False, "gzip"),
+    ("br, gzip", False, "gzip"),
+    ("br, gzip", True, "br"),
+    ("br;q=0, gzip;q=0.5", True, "gzip"),
+    ("GZIP;q=0", True, None),
+])
+def test_choose_encoding(monkeypatch, header, with_brotli, expected):
+    monkeypatch.setattr(http_cache, "brotli", object() if with_brotli else None)
+    assert choose_encoding(header) == expected
+
+
+def _get(client, path, **headers):
+    return client.get(path, headers={"accept-encoding": "identity", **headers})
+
+
+def test_cached_json_etag_and_304(app_module, client):
+    first = _get(client, "/api/videos")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.headers["vary"] == "Accept-Encoding" and "max-age" in first.headers["cache-control"]
+    assert "content-encoding" not in first.headers
+
+    again = _get(client, "/api/videos", **{"if-none-match": etag})
+    assert again.status_code == 304 and again.content == b"" and again.headers["etag"] == etag
+
+    # Любая запись меняет версию данных, а с ней ETag
+    hidden = app_module.video_repo.get_by_id("hidden")
+    app_module.video_repo.update("hidden", {**hidden, "description": hidden.get("description", "") + "."})
+    changed = _get(client, "/api/videos", **{"if-none-match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+
+
+def test_gzip_representation(client):
+    plain = _get(client, "/api/videos")
+    assert len(plain.content) >= http_cache.COMPRESS_MIN_SIZE
+
+    # stream, чтобы httpx не распаковал тело сам
+    with client.stream("GET", "/api/videos", headers={"accept-encoding": "gzip"}) as response:
+        raw = b"".join(response.iter_raw())
+        headers = response.headers
+    assert headers["content-encoding"] == "gzip"
+    assert headers["etag"] == plain.headers["etag"][:-1] + '-gzip"'
+    assert gzip.decompress(raw) == plain.content
+
+    # Клиент со сжатым представлением получает 304 и без сжатия, и со сжатием
+    for encoding in ("identity", "gzip"):
+        response = _get(client, "/api/videos", **{"if-none-match": headers["etag"], "accept-encoding": encoding})
+        assert response.status_code == 304 and response.headers["etag"] == headers["etag"]
+
+
+def test_small_responses_are_not_compressed(client):
+    response = client.get("/api/videos", params={"limit": 1, "fields": "id"}, headers={"accept-encoding": "gzip"})
+    assert response.status_code == 200 and "content-encoding" not in response.headers
+
+
+def test_brotli_representation(client):
+    brotli = pytest.importorskip("brotli")
+    with client.stream("GET", "/api/videos", headers={"accept-encoding": "br"}) as response:
+        raw = b"".join(response.iter_raw())
+        assert response.headers["content-encoding"] == "br"
+    assert brotli.decompress(raw) == _get(client, "/api/videos").content
+
+
+def test_conditional_json_etag_and_304(client):
+    params = {"limit": 3, "sort": "views"}
+    first = client.get("/api/videos", params=params)
+    assert first.status_code == 200
+    again = client.get("/api/videos", params=params, headers={"if-none-match": first.headers["etag"]})
+    assert again.status_code == 304
+    other = client.get("/api/videos", params={**params, "limit": 4}, headers={"if-none-match": first.headers["etag"]})
+    assert other.status_code == 200 and other.headers["etag"] != first.headers["etag"]
+
+
+def test_payload_keeps_compressed_variant():
+    payload = Payload(b'{"a": 1}' * 200, '"tag"')
+    assert not payload.has("gzip")
+    body = payload.encoded("gzip")
+    assert payload.has("gzip") and payload.encoded("gzip") is body
+    assert gzip.decompress(body) == payload.body
+
+
+@pytest.mark.parametrize("limit", [0, 101, 10 ** 6])
+def test_trending_limit_is_bounded(client, limit):
+    assert client.get("/api/videos/trending", params={"limit": limit}).status_code == 422
+
+
+def test_cache_key_parameters_are_bounded(client):
+    response = client.get("/api/videos/trending", params={"limit": 2})
+    assert response.status_code == 200 and len(response.json()) == 2
+    params = {"include_recommendations": True, "top_per_category": 10 ** 6}
+    assert client.get("/api/videos", params=params).status_code == 422
@@ -0,0 +1,193 @@
+import threading
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from minio.datatypes import Object
+from minio.deleteobjects import DeleteError
+from minio.error import S3Error
+
+from app.CRUD.video_repository import VideoRepository
+from app.services.local_object_store import LocalObjectStore
+from app.services.metrics import metrics
+from app.services.minio_storage import DELETE_BATCH_SIZE, MinIOStorage, StorageUnavailableError
+from app.services.resilience import CircuitBreaker
+from purge_deleted_media import purge_deleted_media
+
+from .conftest import make_video
+
+
+def s3_error(code: str) -> S3Error:
+    return S3Error(code, code, "/bucket/object", "request", "host", None)
+
+
+class FakeMinio:
+    """Клиент MinIO в памяти: только вызовы, которые делают пакетные операции"""
+
+    def __init__(self, names=(), fail_listing_after=None, missing=()):
+        self.names = sorted(names)
+        self.fail_listing_after = fail_listing_after
+        self.missing = set(missing)
+        self.delete_batches = []
+        self.listings = []
+        self.uploaded = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def remove_objects(self, bucket_name, delete_object_list):
+        # Как у minio: запрос уходит при чтении результата
+        names = [item._name for item in delete_object_list]
+        self.delete_batches.append(names)
+        for name in names:
+            if name in self.missing:
+                yield DeleteError("AccessDenied", "нет доступа", name, None)
+
+    def list_objects(self, bucket_name, prefix=None, recursive=False, start_after=None):
+        if bucket_name == "missing":
+            raise s3_error("NoSuchBucket")
+        self.listings.append(start_after)
+        for name in self.names:
+            if start_after is not None and name <= start_after:
+                continue
+            if self.fail_listing_after is not None and name > self.fail_listing_after:
+                self.fail_listing_after = None  # обрыв один раз
+                raise ConnectionResetError("обрыв листинга")
+            yield Object(bucket_name, name, datetime(2024, 1, 1, tzinfo=timezone.utc), size=len(name))
+
+    def _busy(self, fn):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            return fn()
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def fput_object(self, bucket_name, object_name, file_path, content_type):
+        def upload():
+            if object_name in self.missing:
+                raise s3_error("AccessDenied")
+            self.uploaded.append(object_name)
+
+        return self._busy(upload)
+
+    def fget_object(self, bucket_name, object_name, file_path):
+        def download():
+            if object_name in self.missing:
+                raise s3_error("NoSuchKey")
+            with open(file_path, "w") as f:
+                f.write(object_name)
+
+        return self._busy(download)
+
+
+def make_storage(client: FakeMinio, **options) -> MinIOStorage:
+    storage = MinIOStorage(endpoint="localhost:9", retry_base_delay=0, retry_max_delay=0, **options)
+    storage.client = client
+    return storage
+
+
+def listing_count() -> float:
+    for line in metrics.render().splitlines():
+        if line.startswith('mypipe_minio_request_seconds_count{operation="list_objects"}'):
+            return float(line.split()[-1])
+    return 0.0
+
+
+def test_delete_objects_in_batches():
+    names = [f"{i:05d}.mp4" for i in range(2 * DELETE_BATCH_SIZE + 500)]
+    client = FakeMinio(missing={"00007.mp4", "02400.mp4"})
+    storage = make_storage(client)
+    storage.url_cache.get(("video", "00001.mp4", 3600), 3600, lambda: "http://signed")
+
+    errors = storage.delete_objects("video", (name for name in names))
+    assert [len(batch) for batch in client.delete_batches] == [DELETE_BATCH_SIZE, DELETE_BATCH_SIZE, 500]
+    assert [name for batch in client.delete_batches for name in batch] == names
+    assert [(error["name"], error["code"]) for error in errors] == [
+        ("00007.mp4", "AccessDenied"), ("02400.mp4", "AccessDenied"),
+    ]
+    assert storage.cached_presigned_url("video", "00001.mp4") is None
+    assert storage.delete_objects("video", []) == [] and len(client.delete_batches) == 3
+
+
+def test_listing_is_one_operation():
+    names = [f"{i:03d}.jpg" for i in range(50)]
+    storage = make_storage(FakeMinio(names))
+    before = listing_count()
+    listed = [obj["name"] for obj in storage.list_objects("thumbnails")]
+    assert listed == names
+    assert listing_count() == before + 1
+    assert storage.breaker.stats()["consecutive_failures"] == 0
+
+
+def test_listing_resumes_after_last_name():
+    names = [f"{i:03d}.jpg" for i in range(10)]
+    client = FakeMinio(names, fail_listing_after="004.jpg")
+    storage = make_storage(client)
+    assert [obj["name"] for obj in storage.list_objects("thumbnails")] == names
+    assert client.listings == [None, "004.jpg"]
+    assert storage.stats()["retried"] == 1
+
+
+def test_listing_gives_up_after_retries():
+    client = FakeMinio(["a"])
+    client.list_objects = lambda *args, **kwargs: (_ for _ in ()).throw(OSError("нет сети"))
+    storage = make_storage(client, retries=1, breaker_threshold=10)
+    with pytest.raises(StorageUnavailableError) as error:
+        list(storage.list_objects("thumbnails"))
+    assert error.value.code == "OSError"
+
+
+def test_missing_bucket_lists_nothing():
+    assert list(make_storage(FakeMinio()).list_objects("missing")) == []
+
+
+def test_abandoned_listing_still_closes_half_open_breaker():
+    storage = make_storage(FakeMinio([f"{i}.jpg" for i in range(5)]), breaker_threshold=1, breaker_reset_timeout=0)
+    storage.breaker.record_failure()
+    listing = storage.list_objects("thumbnails")
+    next(listing)
+    listing.close()
+    assert storage.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_bulk_upload_and_download(tmp_path):
+    files = []
+    for i in range(20):
+        path = tmp_path / f"{i}.bin"
+        path.write_text(str(i))
+        files.append((str(path), f"{i}.bin"))
+    client = FakeMinio(missing={"3.bin"})
+    storage = make_storage(client, pool_size=4)
+
+    errors = storage.upload_files("video", files, workers=16)
+    assert [(error["name"], error["code"]) for error in errors] == [("3.bin", "AccessDenied")]
+    assert sorted(client.uploaded) == sorted(name for _, name in files if name != "3.bin")
+    # Потоков не больше, чем соединений в пуле
+    assert 1 <= client.max_active <= 4
+
+    target = tmp_path / "out"
+    target.mkdir()
+    errors = storage.download_files("video", [(name, str(target / name)) for _, name in files], workers=4)
+    assert [(error["name"], error["code"]) for error in errors] == [("3.bin", "NoSuchKey")]
+    assert (target / "5.bin").read_text() == "5.bin"
+
+
+def test_purge_deleted_media(data_dir, tmp_path):
+    kept, gone = str(uuid.uuid4()), str(uuid.uuid4())
+    videos = VideoRepository(str(data_dir(videos=[make_video(kept), make_video(gone, is_deleted=True)])))
+    store = LocalObjectStore(str(tmp_path / "objects"))
+    for video_id in (kept, gone):
+        store.upload_bytes("video", f"{video_id}.mp4", b"video")
+        store.upload_bytes("thumbnails", f"{video_id}.jpg", b"jpg")
+        store.upload_bytes("thumbnails", f"{video_id}/poster.jpg", b"jpg")
+
+    assert purge_deleted_media(store, videos, dry_run=True) == {"videos": 1, "thumbnails": 2, "errors": []}
+    assert store.stat_object("video", f"{gone}.mp4") is not None
+
+    assert purge_deleted_media(store, videos) == {"videos": 1, "thumbnails": 2, "errors": []}
+    assert store.stat_object("video", f"{gone}.mp4") is None
+    assert [obj["name"] for obj in store.list_objects("thumbnails")] == sorted([f"{kept}.jpg", f"{kept}/poster.jpg"])
+    assert store.stat_object("video", f"{kept}.mp4") is not None
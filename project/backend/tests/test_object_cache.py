@@ -0,0 +1,121 @@
+import threading
+
+import pytest
+
+from app.services.local_object_store import LocalObjectStore
+from app.services.object_cache import CachedObjectStorage
+
+
+class CountingStore(LocalObjectStore):
+    """LocalObjectStore, считающий скачивания (и медленный - чтобы промахи пересекались)"""
+
+    def __init__(self, root, latency=0.0):
+        super().__init__(root, latency)
+        self.downloads = []
+
+    def download_file(self, bucket_name, object_name, file_path):
+        self.downloads.append(object_name)
+        return super().download_file(bucket_name, object_name, file_path)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CountingStore(str(tmp_path / "objects"))
+    for name in ("a", "b", "c"):
+        store.upload_bytes("media", name, name.encode() * 100)
+    return store
+
+
+def test_concurrent_misses_download_once(tmp_path, store):
+    store.latency = 0.05
+    cache = CachedObjectStorage(store, str(tmp_path / "cache"))
+    threads = 8
+    barrier = threading.Barrier(threads)
+    results = []
+
+    def read():
+        barrier.wait()
+        results.append(cache.download_bytes("media", "a"))
+
+    workers = [threading.Thread(target=read) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert results == [b"a" * 100] * threads
+    assert store.downloads == ["a"]
+    stats = cache.stats()
+    assert stats["misses"] == 1 and stats["hits"] == threads - 1 and stats["coalesced"] >= 1
+
+
+def test_least_recently_read_object_is_evicted(tmp_path, store):
+    cache = CachedObjectStorage(store, str(tmp_path / "cache"), max_bytes=250)
+    cache.download_bytes("media", "a")
+    cache.download_bytes("media", "b")
+    cache.download_bytes("media", "a")  # a читали позже b
+    cache.download_bytes("media", "c")
+
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["objects"] == 2 and stats["bytes"] == 200
+    assert len(list((tmp_path / "cache").glob("*.obj"))) == 2
+    store.downloads.clear()
+    assert cache.download_bytes("media", "a") == b"a" * 100
+    assert cache.download_bytes("media", "b") == b"b" * 100
+    assert store.downloads == ["b"]
+
+
+def test_open_maps_the_cached_file(tmp_path, store):
+    cache = CachedObjectStorage(store, str(tmp_path / "cache"), max_bytes=150)
+    cached = cache.open("media", "a")
+    assert cached.size == 100 and cached.etag == store.stat_object("media", "a")["etag"]
+    assert isinstance(cached.data, memoryview) and cached.data.readonly
+    piece = cached.data[10:20]
+    assert bytes(piece) == b"a" * 10
+
+    # Вытеснение удаляет файл, но открытое отображение остаётся читаемым
+    cache.download_bytes("media", "b")
+    assert cache.stats()["evictions"] == 1
+    assert bytes(cached.data[90:]) == b"a" * 10
+    cached.close()  # срез piece ещё жив - close не падает
+    assert bytes(piece) == b"a" * 10
+
+    target = tmp_path / "copy"
+    assert cache.download_file("media", "b", str(target)) and target.read_bytes() == b"b" * 100
+
+
+def test_changed_object_is_refetched_after_revalidation(tmp_path, store):
+    cache = CachedObjectStorage(store, str(tmp_path / "cache"), revalidate_after=0.0)
+    assert cache.download_bytes("media", "a") == b"a" * 100
+    store.upload_bytes("media", "a", b"new")
+    assert cache.download_bytes("media", "a") == b"new"
+    assert store.downloads == ["a", "a"] and cache.stats()["revalidations"] == 1
+
+
+def test_writes_through_the_cache_drop_the_object(tmp_path, store):
+    cache = CachedObjectStorage(store, str(tmp_path / "cache"))
+    cache.download_bytes("media", "a")
+    cache.upload_bytes("media", "a", b"new")
+    assert cache.download_bytes("media", "a") == b"new"
+    cache.delete_object("media", "a")
+    assert cache.download_bytes("media", "a") is None and cache.stats()["objects"] == 0
+
+
+def test_large_and_missing_objects_are_not_cached(tmp_path, store):
+    cache = CachedObjectStorage(store, str(tmp_path / "cache"), max_object_size=50)
+    assert cache.open("media", "a") is None
+    assert cache.download_bytes("media", "a") == b"a" * 100
+    assert cache.download_bytes("media", "missing") is None
+    stats = cache.stats()
+    assert stats["uncacheable"] == 2 and stats["objects"] == 0
+
+
+def test_cache_survives_restart(tmp_path, store):
+    CachedObjectStorage(store, str(tmp_path / "cache")).download_bytes("media", "a")
+    store.downloads.clear()
+
+    cache = CachedObjectStorage(store, str(tmp_path / "cache"))
+    assert cache.stats()["bytes"] == 100
+    assert cache.download_bytes("media", "a") == b"a" * 100
+    # Файл прошлого запуска подхвачен после сверки ETag, без скачивания
+    assert store.downloads == [] and cache.stats()["revalidations"] == 1
@@ -0,0 +1,128 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.CRUD.comment_repository import CommentRepository
+from app.CRUD.video_repository import VideoRepository
+from app.services import personal_feed
+from app.services.personal_feed import (
+    PersonalFeedCache,
+    UserHistory,
+    build_personal_feed,
+    category_affinity,
+    get_user_history,
+)
+from app.services.recommendations import get_leaderboard
+from app.services.responses import Payload
+
+from .conftest import make_video
+
+# Две категории по пять видео (в c1 популярнее), автор всех - u1
+VIDEOS = [
+    make_video(f"a{i}", category_id="c1", views=1000 - i * 10, name=f"кошки {i}") for i in range(5)
+] + [
+    make_video(f"b{i}", category_id="c2", views=500 - i * 10, name=f"горы {i}") for i in range(5)
+] + [
+    make_video("own", user_id="reader", category_id="c2", views=5),
+    make_video("hidden", category_id="c2", views=10_000, is_public=False),
+]
+
+
+def _comment(comment_id, video_id, user_id="reader", date="2024-02-01T00:00:00+00:00"):
+    return {"id": comment_id, "video_id": video_id, "user_id": user_id, "parent_id": None,
+            "text": "комментарий", "date": date, "is_deleted": False}
+
+
+@pytest.fixture
+def repos(data_dir):
+    directory = str(data_dir(videos=VIDEOS, comments=[
+        _comment("k1", "b1", date="2024-02-01T00:00:00+00:00"),
+        _comment("k2", "b2", date="2024-02-03T00:00:00+00:00"),
+        _comment("k3", "b1", date="2024-02-02T00:00:00+00:00"),
+        _comment("k4", "a1", user_id="someone"),
+    ]))
+    return VideoRepository(directory), CommentRepository(directory)
+
+
+def _ids(videos):
+    return [video["id"] for video in videos]
+
+
+def test_history_lists_recent_commented_videos_once(repos):
+    history = get_user_history(*repos, "reader")
+    assert history.commented == ["b2", "b1"]
+    assert _ids(history.uploads) == ["own"]
+    assert history and not get_user_history(*repos, "nobody")
+
+
+def test_history_stamp_changes_with_each_action():
+    base = UserHistory("u", [_comment("k1", "a1")], [])
+    assert UserHistory("u", [_comment("k1", "a1")], []).stamp == base.stamp
+    assert UserHistory("u", [_comment("k1", "a1"), _comment("k2", "a2")], []).stamp != base.stamp
+    assert UserHistory("u", [_comment("k1", "a1")], [make_video("v")]).stamp != base.stamp
+
+
+def test_category_affinity_weights_uploads_over_comments(repos):
+    videos, comments = repos
+    history = get_user_history(videos, comments, "reader")
+    affinity = category_affinity(history, get_leaderboard(videos, "popularity"))
+    assert affinity == {"c2": 1.0}
+
+    history = UserHistory("u", [_comment("k1", "a1"), _comment("k2", "b1")], [make_video("x", category_id="c1")])
+    assert category_affinity(history, get_leaderboard(videos, "popularity")) == {"c1": 0.75, "c2": 0.25}
+
+
+def test_feed_without_history_is_global_top(repos):
+    videos, comments = repos
+    history = get_user_history(videos, comments, "nobody")
+    assert _ids(build_personal_feed(videos, comments, history, 3)) == ["a0", "a1", "a2"]
+
+
+def test_feed_prefers_favourite_category_and_skips_seen(repos):
+    videos, comments = repos
+    feed = build_personal_feed(videos, comments, get_user_history(videos, comments, "reader"), 5)
+    ids = _ids(feed)
+    assert len(ids) == 5 and not {"b1", "b2", "own", "hidden"} & set(ids)
+    # c2 менее популярна, но это категория пользователя - её видео впереди общего топа
+    assert ids[:3] == ["b0", "b3", "b4"]
+
+
+def test_feed_cache_follows_history_stamp_and_ttl(monkeypatch):
+    clock = SimpleNamespace(now=100.0)
+    monkeypatch.setattr(personal_feed, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    cache = PersonalFeedCache(max_entries=2, ttl=30)
+    payload = cache.store(("u", 10), "stamp-1", Payload(b"[]", '"e"'))
+
+    assert cache.peek(("u", 10), "stamp-1") is payload
+    assert cache.peek(("u", 10), "stamp-2") is None  # новое действие пользователя
+    clock.now += 30
+    assert cache.peek(("u", 10), "stamp-1") is None  # топы могли сместиться
+    assert cache.stats()["stale"] == 2
+
+    cache.store(("u", 10), "s", payload)
+    cache.store(("v", 10), "s", payload)
+    cache.peek(("u", 10), "s")
+    cache.store(("w", 10), "s", payload)
+    assert cache.peek(("v", 10), "s") is None and cache.peek(("u", 10), "s") is payload
+    assert cache.stats()["evictions"] == 1
+
+
+def test_feed_etag_is_stable_between_rebuilds(app_module, client, monkeypatch):
+    monkeypatch.setattr(app_module, "personal_feeds", PersonalFeedCache())
+    params = {"user_id": "feed-reader", "limit": 3}
+    first = client.get("/api/videos/feed", params=params)
+    assert first.status_code == 200 and first.headers["cache-control"].startswith("private")
+    etag = first.headers["etag"]
+
+    # Пересобранная лента по тем же данным - тот же ETag и 304 без сборки
+    monkeypatch.setattr(app_module, "personal_feeds", PersonalFeedCache())
+    assert client.get("/api/videos/feed", params=params).headers["etag"] == etag
+    monkeypatch.setattr(app_module, "personal_feeds", PersonalFeedCache())
+    response = client.get("/api/videos/feed", params=params, headers={"if-none-match": etag})
+    assert response.status_code == 304
+    assert app_module.personal_feeds.stats()["entries"] == 0
+
+    app_module.comment_repo.create(_comment("feed-k1", "v2", user_id="feed-reader"))
+    changed = client.get("/api/videos/feed", params=params, headers={"if-none-match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert "v2" not in _ids(changed.json())
@@ -0,0 +1,107 @@
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from app.services import presigned_cache
+from app.services.minio_storage import MinIOStorage
+from app.services.presigned_cache import PresignedUrlCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Управляемое время presigned_cache: clock.now - секунды"""
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(presigned_cache, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def _signer():
+    signed = []
+
+    def sign(name):
+        def signature():
+            signed.append(name)
+            return f"https://minio/{name}?sig={len(signed)}"
+        return signature
+
+    return sign, signed
+
+
+def test_url_is_resigned_before_it_expires(clock):
+    cache = PresignedUrlCache(safety_margin=300)
+    sign, signed = _signer()
+
+    first = cache.get(("video", "a", 3600), 3600, sign("a"))
+    clock.now += 3299
+    assert cache.get(("video", "a", 3600), 3600, sign("a")) == first
+    # За safety_margin до конца срока ссылку уже не отдают - подписывается новая
+    clock.now += 1
+    assert cache.peek(("video", "a", 3600)) is None
+    assert cache.get(("video", "a", 3600), 3600, sign("a")) != first
+    assert signed == ["a", "a"]
+
+
+def test_short_links_keep_half_of_their_lifetime(clock):
+    cache = PresignedUrlCache(safety_margin=300)
+    sign, _ = _signer()
+
+    cache.get(("video", "a", 60), 60, sign("a"))
+    clock.now += 29
+    assert cache.peek(("video", "a", 60)) is not None
+    clock.now += 1
+    assert cache.peek(("video", "a", 60)) is None
+
+
+def test_least_recently_used_link_is_evicted(clock):
+    cache = PresignedUrlCache(max_entries=2)
+    sign, signed = _signer()
+
+    for name in ("a", "b"):
+        cache.get(("video", name, 3600), 3600, sign(name))
+    assert cache.peek(("video", "a", 3600)) is not None  # a снова свежая, вытесняется b
+    cache.get(("video", "c", 3600), 3600, sign("c"))
+
+    assert cache.peek(("video", "b", 3600)) is None
+    assert cache.peek(("video", "a", 3600)) is not None
+    assert cache.stats()["evictions"] == 1 and cache.stats()["entries"] == 2
+    assert signed == ["a", "b", "c"]
+
+
+def test_failed_signature_is_not_cached(clock):
+    cache = PresignedUrlCache()
+    assert cache.get(("video", "a", 3600), 3600, lambda: None) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_invalidate_object_and_bucket(clock):
+    cache = PresignedUrlCache()
+    sign, _ = _signer()
+    for key in [("video", "a", 3600), ("video", "a", 60), ("video", "b", 3600), ("preview", "a", 3600)]:
+        cache.get(key, key[2], sign(key[1]))
+
+    cache.invalidate("video", "a")
+    assert cache.peek(("video", "a", 3600)) is None and cache.peek(("video", "a", 60)) is None
+    assert cache.peek(("video", "b", 3600)) is not None
+    cache.invalidate("video")
+    assert cache.peek(("video", "b", 3600)) is None and cache.peek(("preview", "a", 3600)) is not None
+
+
+def test_links_are_signed_for_the_public_endpoint():
+    storage = MinIOStorage(endpoint="minio:9000", public_endpoint="media.example.com", public_secure=True)
+    assert storage.cached_presigned_url("video", "v1.mp4") is None
+
+    url = storage.get_presigned_url("video", "v1.mp4", expiration=600)
+    parts = urlsplit(url)
+    assert (parts.scheme, parts.netloc, parts.path) == ("https", "media.example.com", "/video/v1.mp4")
+    query = parse_qs(parts.query)
+    assert query["X-Amz-Expires"] == ["600"] and query["X-Amz-SignedHeaders"] == ["host"]
+    assert "us-east-1" in query["X-Amz-Credential"][0]
+
+    # Подпись посчитана локально и закэширована: вторая ссылка - та же
+    assert storage.get_presigned_url("video", "v1.mp4", expiration=600) == url
+    assert storage.cached_presigned_url("video", "v1.mp4", expiration=600) == url
+    assert storage.url_cache.stats()["signatures"] == 1
+
+    internal = MinIOStorage(endpoint="minio:9000").get_presigned_url("video", "v1.mp4", expiration=600)
+    assert urlsplit(internal).netloc == "minio:9000"
@@ -0,0 +1,41 @@
+from app.services.recommendations import (
+    Leaderboard,
+    get_all_categories_with_top_videos,
+    views_score,
+)
+from app.services.video_columns import VideoColumns
+
+from .conftest import make_video
+
+VIDEOS = [
+    make_video("a1", category_id="c1", views=50),
+    make_video("a2", category_id="c1", views=40),
+    make_video("n1", category_id=None, views=5),
+    make_video("n2", category_id=None, views=3),
+    make_video("b1", category_id="c2", views=30),
+    make_video("gone", category_id=None, views=900, is_deleted=True),
+]
+
+
+def _by_category(result):
+    return {entry["category_id"]: [video["id"] for video in entry["top_videos"]] for entry in result}
+
+
+def test_uncategorised_videos_get_their_own_bucket():
+    expected = {"c1": ["a1", "a2"], None: ["n1", "n2"], "c2": ["b1"]}
+    assert _by_category(get_all_categories_with_top_videos(VIDEOS, 3)) == expected
+    leaderboard = Leaderboard(VIDEOS, views_score)
+    assert _by_category(get_all_categories_with_top_videos([], 3, leaderboard=leaderboard)) == expected
+    columns = VideoColumns(VIDEOS)
+    assert _by_category(get_all_categories_with_top_videos([], 3, columns=columns)) == expected
+
+
+def test_leaderboard_top_without_category_is_global():
+    leaderboard = Leaderboard(VIDEOS, views_score)
+    assert [video["id"] for video in leaderboard.top(3)] == ["a1", "a2", "b1"]
+    assert [video["id"] for video in leaderboard.top(3, None)] == ["n1", "n2"]
+    assert [video["id"] for video in leaderboard.top(3, None, exclude="n1")] == ["n2"]
+
+    leaderboard.replace(VIDEOS[2], {**VIDEOS[2], "category_id": "c2"})
+    assert [video["id"] for video in leaderboard.top(3, None)] == ["n2"]
+    assert [video["id"] for video in leaderboard.top(3, "c2")] == ["b1", "n1"]
@@ -0,0 +1,72 @@
+import pickle
+
+import pytest
+
+from app.CRUD.records import CommentRecord, Record, VideoRecord
+from app.services import json_codec
+from benchmarks.memory import retained
+
+from .conftest import make_video
+
+
+def test_record_behaves_like_a_read_only_dict():
+    data = {**make_video("v1"), "version": 3}
+    record = VideoRecord.from_dict(data)
+
+    assert record == data and data == record
+    assert dict(record) == data == {**record}
+    assert record.to_dict() == data
+    assert len(record) == len(data) and set(record) == set(data)
+    assert record["name"] == "video v1" and record.get("views") == 0
+    # Поле не из __slots__ - в _extra
+    assert record["version"] == 3 and "version" in record
+    assert record.get("missing", "default") == "default" and "missing" not in record
+    with pytest.raises(KeyError):
+        record["missing"]
+    with pytest.raises(TypeError):
+        hash(record)
+    with pytest.raises(AttributeError):
+        record.__dict__
+    assert VideoRecord.from_dict(record) is record
+
+
+def test_unset_slots_are_missing_keys():
+    record = VideoRecord.from_dict({"id": "v1", "views": 5})
+    assert dict(record) == {"id": "v1", "views": 5}
+    assert "name" not in record and record.get("name") is None
+    with pytest.raises(KeyError):
+        record["name"]
+    assert {**record, "views": 6} == {"id": "v1", "views": 6}
+
+
+def test_record_serializes_and_pickles_like_a_dict():
+    data = make_video("v1", version=2)
+    record = VideoRecord.from_dict(data)
+    assert json_codec.loads(json_codec.dumps(record)) == data
+    assert json_codec.loads(json_codec.dumps([record, record])) == [data, data]
+    restored = pickle.loads(pickle.dumps(record))
+    assert type(restored) is VideoRecord and restored == data
+
+
+def test_ids_are_interned():
+    # Строки из разных разборов JSON - разные объекты, пока их не интернировать
+    raw = json_codec.dumps([{"id": "c-1", "video_id": "video-42", "user_id": "user-7", "text": "текст"}])
+    first, second = (CommentRecord.from_dict(json_codec.loads(raw)[0]) for _ in range(2))
+    assert first["video_id"] is second["video_id"]
+    assert first["user_id"] is second["user_id"]
+    assert first["id"] is second["id"]
+
+
+def test_field_names_cannot_shadow_methods():
+    with pytest.raises(TypeError):
+        class BadRecord(Record):
+            __slots__ = ("id", "items")
+
+
+def test_records_take_less_memory_than_dicts():
+    raw = json_codec.dumps([make_video(f"video-{i:05d}", views=i, likes=i // 2) for i in range(5000)])
+    dicts = retained(lambda: json_codec.loads(raw))
+    # Первый проход может расширить таблицу интернированных строк - её размер не в счёт записей
+    [VideoRecord.from_dict(item) for item in json_codec.loads(raw)]
+    records = retained(lambda: [VideoRecord.from_dict(item) for item in json_codec.loads(raw)])
+    assert records < dicts * 0.75
@@ -0,0 +1,184 @@
+import math
+import random
+import weakref
+
+import pytest
+
+from app.CRUD import base_repository
+from app.CRUD.comment_repository import CommentRepository
+from app.CRUD.video_repository import VideoRepository
+from app.services import related
+from app.services.related import CoComments, TextNeighbours, get_related_videos, text_neighbours_ready
+from app.services.search import FIELD_WEIGHTS, tokenize
+from app.services.snapshot_cache import SnapshotCache
+
+from .conftest import make_video
+
+pytest.importorskip("numpy")
+
+TOPICS = {
+    "c1": ["кошка", "котёнок", "мяукать", "лоток", "корм"],
+    "c2": ["гитара", "аккорд", "струна", "медиатор", "песня"],
+    "c3": ["рецепт", "тесто", "духовка", "начинка", "пирог"],
+}
+COMMON = ["видео", "смотреть", "новый", "лучший"]
+
+
+def _topic_videos(seed=3, per_topic=8):
+    rng = random.Random(seed)
+    videos = []
+    for category_id, words in TOPICS.items():
+        for i in range(per_topic):
+            videos.append(make_video(
+                f"{category_id}-{i}",
+                category_id=category_id,
+                name=" ".join(rng.sample(words, 2) + rng.sample(COMMON, 1)),
+                description=" ".join(rng.choices(words + COMMON, k=6)),
+            ))
+    return videos
+
+
+def _cosines(videos):
+    """Эталон: TF-IDF (1 + log tf) * log((1 + n) / (1 + df)), нормированные векторы, попарные косинусы"""
+    counts = {}
+    for video in videos:
+        terms = {}
+        for field, weight in FIELD_WEIGHTS:
+            for term in tokenize(video.get(field)):
+                terms[term] = terms.get(term, 0) + weight
+        counts[video["id"]] = terms
+    n = len(videos)
+    df = {}
+    for terms in counts.values():
+        for term in terms:
+            df[term] = df.get(term, 0) + 1
+    vectors = {}
+    for video_id, terms in counts.items():
+        vector = {term: (1 + math.log(tf)) * math.log((1 + n) / (1 + df[term])) for term, tf in terms.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        vectors[video_id] = {term: weight / norm for term, weight in vector.items()}
+    return {
+        (a, b): sum(weight * vectors[b].get(term, 0.0) for term, weight in vectors[a].items())
+        for a in vectors for b in vectors if a != b
+    }
+
+
+def test_neighbours_share_the_topic():
+    videos = _topic_videos()
+    text = TextNeighbours(videos, neighbours=5)
+    for video in videos:
+        neighbours = text.neighbours(video["id"])
+        assert len(neighbours) == 5
+        assert all(other.split("-")[0] == video["category_id"] for other, _ in neighbours), video["id"]
+        scores = [score for _, score in neighbours]
+        assert scores == sorted(scores, reverse=True) and 0 < scores[-1] and scores[0] <= 1.0 + 1e-6
+
+
+def test_scores_match_brute_force_tfidf():
+    # Слов больше DENSE_TERMS: частые идут плотной матрицей, редкие - по спискам видео
+    rng = random.Random(11)
+    vocabulary = [f"слово{i}" for i in range(150)]
+    videos = [
+        make_video(f"v{i:03d}", name=" ".join(rng.choices(vocabulary[:20], k=2)),
+                   description=" ".join(rng.choices(vocabulary, k=rng.randint(3, 10))))
+        for i in range(120)
+    ]
+    text = TextNeighbours(videos, neighbours=8)
+    cosines = _cosines(videos)
+    for video in videos:
+        expected = sorted((cosines[(video["id"], other["id"])] for other in videos if other is not video), reverse=True)
+        expected = [score for score in expected[:8] if score > 0]
+        neighbours = text.neighbours(video["id"])
+        assert [score for _, score in neighbours] == pytest.approx(expected, abs=1e-5)
+        for other, score in neighbours:
+            assert score == pytest.approx(cosines[(video["id"], other)], abs=1e-5)
+
+
+def test_replace_keeps_neighbours_current():
+    videos = _topic_videos()
+    text = TextNeighbours(videos, neighbours=5)
+    twin = make_video("twin", category_id="c2", name=videos[0]["name"], description=videos[0]["description"])
+    text.replace(None, twin)
+    assert text.neighbours("twin")[0] == (videos[0]["id"], pytest.approx(1.0, abs=1e-5))
+    assert "twin" in [other for other, _ in text.neighbours(videos[0]["id"])]
+
+    # Скрытое видео пропадает из чужих списков, изменение счётчиков соседей не трогает
+    text.replace(twin, {**twin, "is_public": False})
+    assert "twin" not in [other for other, _ in text.neighbours(videos[0]["id"])]
+    before = text.neighbours(videos[1]["id"])
+    text.replace(videos[1], {**videos[1], "views": 99})
+    assert text.neighbours(videos[1]["id"]) == before
+
+
+def test_co_comments_link_videos_with_shared_commenters():
+    comments = [
+        {"id": f"k{i}", "user_id": user, "video_id": video}
+        for i, (user, video) in enumerate([
+            ("u1", "a"), ("u1", "b"), ("u2", "a"), ("u2", "b"), ("u3", "a"), ("u3", "c"), ("u4", "d"),
+        ])
+    ]
+    co = CoComments(comments)
+    assert [other for other, _ in co.neighbours("a", 5)] == ["b", "c"]
+    assert co.neighbours("a", 5)[0][1] == pytest.approx(2 / math.sqrt(3 * 2))
+    assert co.neighbours("d", 5) == []
+
+    co.replace(comments[0], None)  # u1 больше не комментирует a
+    assert co.neighbours("a", 5) == [("c", pytest.approx(1 / math.sqrt(2))), ("b", pytest.approx(1 / 2))]
+
+
+@pytest.fixture
+def repos(data_dir):
+    directory = str(data_dir(videos=_topic_videos(), comments=[
+        {"id": "k1", "user_id": "fan", "video_id": "c1-0", "parent_id": None},
+        {"id": "k2", "user_id": "fan", "video_id": "c3-5", "parent_id": None},
+    ]))
+    return VideoRepository(directory), CommentRepository(directory)
+
+
+def test_related_videos_combine_text_comments_and_category(repos):
+    videos, comments = repos
+    assert not text_neighbours_ready(videos)
+    result = [video["id"] for video in get_related_videos(videos, comments, "c1-0", 6)]
+    assert text_neighbours_ready(videos)
+    assert len(result) == 6 and "c1-0" not in result
+    # Общий комментатор поднимает видео другой темы выше остальных её видео
+    assert "c3-5" in result
+    assert all(video_id.startswith("c1-") for video_id in result if video_id != "c3-5")
+
+
+def test_without_numpy_related_uses_comments_and_category_top(repos, monkeypatch):
+    monkeypatch.setattr(related, "np", None)
+    monkeypatch.setattr(related, "_text_neighbours", weakref.WeakKeyDictionary())
+    videos, comments = repos
+    assert text_neighbours_ready(videos) and related.get_text_neighbours(videos) is None
+    result = [video["id"] for video in get_related_videos(videos, comments, "c1-0", 4)]
+    assert result[0] == "c3-5"
+    assert len(result) == 4 and all(video_id.startswith("c1-") for video_id in result[1:])
+
+
+def test_related_endpoint_builds_neighbours_off_the_event_loop(app_module, client, monkeypatch):
+    # Как сразу после запуска: ни снимков в памяти, ни посчитанных соседей
+    monkeypatch.setattr(base_repository, "snapshot_cache", SnapshotCache())
+    monkeypatch.setattr(related, "_text_neighbours", weakref.WeakKeyDictionary())
+    assert not text_neighbours_ready(app_module.video_repo)
+    executor = app_module.io_executor
+    calls = []
+
+    class RecordingExecutor:
+        def __getattr__(self, name):
+            return getattr(executor, name)
+
+        async def run(self, fn, *args):
+            calls.append(fn)
+            return await executor.run(fn, *args)
+
+    monkeypatch.setattr(app_module, "io_executor", RecordingExecutor())
+    first = client.get("/api/video/v1/related", params={"limit": 3})
+    assert first.status_code == 200 and len(first.json()) == 3
+    assert get_related_videos in calls and text_neighbours_ready(app_module.video_repo)
+
+    # Соседи посчитаны и снимок свежий - следующий ответ собирается без пула
+    calls.clear()
+    second = client.get("/api/video/v1/related", params={"limit": 4})
+    assert second.status_code == 200 and get_related_videos not in calls
+    assert [video["id"] for video in second.json()][:3] == [video["id"] for video in first.json()]
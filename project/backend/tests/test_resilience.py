@@ -0,0 +1,147 @@
+import time
+
+import pytest
+from minio.error import InvalidResponseError, S3Error
+
+from app.services.minio_storage import MinIOStorage, StorageError, StorageUnavailableError
+from app.services.resilience import CircuitBreaker, backoff_delay
+
+RESET = 0.05
+
+
+def s3_error(code: str) -> S3Error:
+    return S3Error(code, code, "/bucket/object", "request", "host", None)
+
+
+def trip(breaker: CircuitBreaker):
+    for _ in range(breaker.failure_threshold):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_backoff_delay_is_bounded():
+    for attempt in range(10):
+        assert 0 <= backoff_delay(attempt, 0.1, 2.0) <= min(2.0, 0.1 * 2 ** attempt)
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=RESET)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()  # успех обнуляет серию
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert 0 < breaker.retry_after() <= RESET
+    assert breaker.stats()["trips"] == 1 and breaker.stats()["rejected"] == 1
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=RESET)
+    trip(breaker)
+    time.sleep(RESET * 1.5)
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()  # пока пробный вызов не завершён, остальные отклоняются
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=RESET)
+    trip(breaker)
+    time.sleep(RESET * 1.5)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.stats()["trips"] == 2
+
+
+@pytest.fixture
+def storage():
+    # Клиент MinIO к серверу не обращается: запросы - функции, переданные в _call
+    return MinIOStorage(
+        endpoint="localhost:9",
+        retries=2,
+        retry_base_delay=0,
+        retry_max_delay=0,
+        breaker_threshold=3,
+        breaker_reset_timeout=RESET,
+    )
+
+
+def failing(*errors):
+    """Функция запроса: по очереди бросает errors, затем возвращает "ok"; calls - число вызовов"""
+    pending = list(errors)
+
+    def fn():
+        fn.calls += 1
+        if pending:
+            raise pending.pop(0)
+        return "ok"
+
+    fn.calls = 0
+    return fn
+
+
+def test_transient_errors_are_retried(storage):
+    fn = failing(OSError("reset"), s3_error("SlowDown"))
+    assert storage._call("stat_object", "video", "a.mp4", fn) == "ok"
+    assert fn.calls == 3
+    assert storage.stats()["retried"] == 2
+    assert storage.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_non_idempotent_call_is_not_retried(storage):
+    fn = failing(OSError("reset"))
+    with pytest.raises(StorageUnavailableError):
+        storage._call("make_bucket", "video", None, fn, idempotent=False)
+    assert fn.calls == 1
+
+
+def test_s3_answers_are_not_failures(storage):
+    with pytest.raises(S3Error):
+        storage._call("stat_object", "video", "a.mp4", failing(s3_error("NoSuchKey")))
+    with pytest.raises(StorageError) as error:
+        storage._call("stat_object", "video", "a.mp4", failing(s3_error("AccessDenied")))
+    assert not isinstance(error.value, StorageUnavailableError)
+    assert error.value.code == "AccessDenied"
+    assert storage.breaker.stats()["consecutive_failures"] == 0
+
+
+def test_unknown_minio_errors_count_as_failures(storage):
+    # Непонятный ответ (например, HTML от прокси) - такой же сбой хранилища, как 5xx
+    fn = failing(*[InvalidResponseError(502, "text/html", "<html>")] * 3)
+    with pytest.raises(StorageUnavailableError) as error:
+        storage._call("stat_object", "video", "a.mp4", fn)
+    assert error.value.code == "InvalidResponseError"
+    assert storage.breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(StorageUnavailableError) as rejected:
+        storage._call("stat_object", "video", "a.mp4", failing())
+    assert rejected.value.code == "CircuitOpen"
+
+
+@pytest.mark.parametrize("error", [
+    InvalidResponseError(502, "text/html", "<html>"),
+    ValueError("неожиданная ошибка"),
+])
+def test_probe_with_unexpected_error_does_not_wedge_breaker(storage, error):
+    trip(storage.breaker)
+    time.sleep(RESET * 1.5)
+
+    with pytest.raises((StorageUnavailableError, ValueError)):
+        storage._call("stat_object", "video", "a.mp4", failing(error), idempotent=False)
+    # Пробный вызов завершился сбоем: предохранитель снова разомкнут, а не застрял в half_open
+    assert storage.breaker.state == CircuitBreaker.OPEN
+
+    time.sleep(RESET * 1.5)
+    assert storage._call("stat_object", "video", "a.mp4", failing()) == "ok"
+    assert storage.breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,142 @@
+import math
+import random
+
+import pytest
+
+from app.CRUD.video_repository import VideoRepository
+from app.services.search import BM25_B, BM25_K1, FIELD_WEIGHTS, SearchIndex, get_search_index, tokenize
+
+from .conftest import make_video
+
+WORDS = ["кошка", "кошелёк", "собака", "река", "лес", "море", "город", "ночь", "утро", "дорога"]
+
+
+def _ids(results):
+    return [video["id"] for video in results[0]]
+
+
+def _corpus(seed=7, size=60):
+    rng = random.Random(seed)
+    return [
+        make_video(
+            f"v{i:02d}",
+            name=" ".join(rng.choices(WORDS, k=rng.randint(1, 3))),
+            description=" ".join(rng.choices(WORDS, k=rng.randint(0, 8))),
+        )
+        for i in range(size)
+    ]
+
+
+def _bm25_order(videos, words):
+    """Эталон: оценка каждого видео по формуле BM25F напрямую, без индекса"""
+    documents = {}
+    for video in videos:
+        terms = {}
+        for field, weight in FIELD_WEIGHTS:
+            for term in tokenize(video.get(field)):
+                terms[term] = terms.get(term, 0) + weight
+        documents[video["id"]] = terms
+    avg_len = sum(sum(terms.values()) for terms in documents.values()) / len(documents)
+    scores = {}
+    for video_id, terms in documents.items():
+        if not all(word in terms for word in words):
+            continue
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * sum(terms.values()) / avg_len)
+        total = 0.0
+        for word in words:
+            df = sum(1 for other in documents.values() if word in other)
+            idf = math.log(1 + (len(documents) - df + 0.5) / (df + 0.5))
+            total += terms[word] * (BM25_K1 + 1) / (terms[word] + norm) * idf
+        scores[video_id] = total
+    return sorted(scores, key=lambda video_id: (-scores[video_id], video_id))
+
+
+def test_cyrillic_case_folding_and_yo():
+    index = SearchIndex([
+        make_video("a", name="Ёжик в ТУМАНЕ"),
+        make_video("b", name="туман над рекой"),
+    ])
+    assert _ids(index.search("ежик", prefix=False)) == ["a"]
+    assert _ids(index.search("ЁЖИК", prefix=False)) == ["a"]
+    # Слова сравниваются целиком: "тумане" и "туман" - разные слова
+    assert _ids(index.search("Тумане", prefix=False)) == ["a"]
+    assert _ids(index.search("ТУМАН", prefix=False)) == ["b"]
+
+
+def test_last_word_is_a_prefix():
+    index = SearchIndex([
+        make_video("a", name="кошка на крыше"),
+        make_video("b", name="кошелёк"),
+        make_video("c", name="собака"),
+    ])
+    assert sorted(_ids(index.search("кош"))) == ["a", "b"]
+    assert _ids(index.search("кош", prefix=False)) == []
+    # Все слова обязательны, префиксом считается только последнее
+    assert _ids(index.search("кошка кр")) == ["a"]
+    assert _ids(index.search("кош крыше")) == []
+    assert index.expand_prefix("кош") == ["кошелек", "кошка"]
+
+
+def test_name_match_outranks_description_match():
+    index = SearchIndex([
+        make_video("in_description", name="прогулка", description="река"),
+        make_video("in_name", name="река", description="прогулка"),
+    ])
+    assert _ids(index.search("река", prefix=False)) == ["in_name", "in_description"]
+
+
+@pytest.mark.parametrize("query", ["кошка", "лес", "море город", "дорога утро ночь"])
+def test_order_matches_bm25(query):
+    videos = _corpus()
+    index = SearchIndex(videos)
+    expected = _bm25_order(videos, tokenize(query))
+    assert expected, "запрос должен что-то находить"
+    assert _ids(index.search(query, limit=10, prefix=False)) == expected[:10]
+    # Страницы продолжают одна другую
+    second, has_more = index.search(query, limit=10, offset=10, prefix=False)
+    assert [video["id"] for video in second] == expected[10:20]
+    assert has_more == (len(expected) > 20)
+
+
+def test_only_listed_videos_are_indexed():
+    index = SearchIndex([
+        make_video("shown", name="река"),
+        make_video("hidden", name="река", is_public=False),
+        make_video("gone", name="река", is_deleted=True),
+    ])
+    assert _ids(index.search("река")) == ["shown"]
+    assert _ids(index.search("река", category_id="c2")) == []
+
+
+def test_index_follows_repository_writes(data_dir):
+    repo = VideoRepository(str(data_dir(videos=[
+        make_video("a", name="река", version=1),
+        make_video("b", name="лес", version=1),
+    ])))
+    assert _ids(get_search_index(repo).search("река")) == ["a"]
+
+    repo.update("a", {**repo.get_by_id("a"), "name": "море"})
+    assert _ids(get_search_index(repo).search("река")) == []
+    assert _ids(get_search_index(repo).search("море")) == ["a"]
+
+    repo.create(make_video("c", name="река и лес"))
+    assert _ids(get_search_index(repo).search("лес")) == ["b", "c"]
+
+    repo.increment_views("c")
+    assert _ids(get_search_index(repo).search("река"))[0] == "c"
+    assert get_search_index(repo).search("река")[0][0]["views"] == 1
+
+    repo.delete("b")
+    assert _ids(get_search_index(repo).search("лес")) == ["c"]
+    repo.update("c", {**repo.get_by_id("c"), "is_public": False})
+    assert _ids(get_search_index(repo).search("лес")) == []
+
+
+def test_repository_substring_search_keeps_private_videos(data_dir):
+    repo = VideoRepository(str(data_dir(videos=[
+        make_video("a", name="Большая река", description="лес"),
+        make_video("hidden", name="река", is_public=False),
+        make_video("gone", name="река", is_deleted=True),
+    ])))
+    assert [video["id"] for video in repo.search_by_name("РЕК")] == ["a", "hidden"]
+    assert [video["id"] for video in repo.search_by_description("лес")] == ["a"]
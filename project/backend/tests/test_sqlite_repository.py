@@ -0,0 +1,125 @@
+import json
+import sqlite3
+
+import pytest
+
+from app.CRUD.base_repository import VersionConflictError
+from app.CRUD.comment_repository import CommentRepository
+from app.CRUD.sqlite_repository import SqliteRepository
+from app.CRUD.video_repository import VideoRepository
+from app.services.recommendations import get_leaderboard
+from migrate_to_sqlite import migrate
+
+from .conftest import make_video
+
+VIDEOS = [
+    make_video("v1", user_id="u1", category_id="c1", views=10, version=1),
+    make_video("v2", user_id="u2", category_id="c1", views=30, version=1),
+    make_video("v3", user_id="u1", category_id=None, views=20, version=1),
+    make_video("v4", user_id="u1", category_id="c2", is_deleted=True, version=1),
+]
+COMMENTS = [
+    {"id": "k1", "video_id": "v1", "user_id": "u1", "parent_id": None, "text": "первый"},
+    {"id": "k2", "video_id": "v1", "user_id": "u2", "parent_id": "k1", "text": "ответ"},
+]
+
+
+@pytest.fixture
+def sqlite_dir(data_dir, monkeypatch):
+    """Папка данных, перенесённая в SQLite; репозитории создаются с STORAGE_ENGINE=sqlite"""
+    directory = data_dir(videos=VIDEOS, comments=COMMENTS, users=[], categories=[])
+    monkeypatch.setenv("SQLITE_PATH", str(directory / "mypipe.db"))
+    migrate(directory, directory / "mypipe.db")
+    monkeypatch.setenv("STORAGE_ENGINE", "sqlite")
+    return directory
+
+
+def _ids(items):
+    return [item["id"] for item in items]
+
+
+def test_migrate_round_trip(data_dir, monkeypatch, capsys):
+    directory = data_dir(videos=VIDEOS + [{"name": "без id"}], comments=COMMENTS)
+    # Изменения из журнала (.wal) тоже переносятся
+    json_videos = VideoRepository(str(directory))
+    json_videos.increment_views("v1")
+    json_videos.update("v2", {**json_videos.get_by_id("v2"), "name": "новое имя"})
+    expected = [dict(video) for video in json_videos.get_all() if video.get("id") is not None]
+
+    monkeypatch.setenv("SQLITE_PATH", str(directory / "mypipe.db"))
+    migrate(directory, directory / "mypipe.db")
+    monkeypatch.setenv("STORAGE_ENGINE", "sqlite")
+    videos = VideoRepository(str(directory))
+    assert isinstance(videos, SqliteRepository)
+    assert [dict(video) for video in videos.get_all()] == expected
+    assert [dict(comment) for comment in CommentRepository(str(directory)).get_all()] == COMMENTS
+    assert "без id пропущено: 1" in capsys.readouterr().out
+
+    # Заполненные таблицы повторно не переносятся, --force переносит заново
+    videos.create(make_video("v9"))
+    migrate(directory, directory / "mypipe.db")
+    assert len(VideoRepository(str(directory)).get_all()) == len(expected) + 1
+    migrate(directory, directory / "mypipe.db", force=True)
+    assert [dict(video) for video in VideoRepository(str(directory)).get_all()] == expected
+
+
+def test_index_queries(sqlite_dir):
+    videos = VideoRepository(str(sqlite_dir))
+    assert type(videos).__name__ == "SqliteVideoRepository"
+    assert videos.get_by_id("v2")["views"] == 30 and videos.get_by_id("nope") is None
+    assert _ids(videos._find_many("user_id", "u1")) == ["v1", "v3", "v4"]
+    assert _ids(videos.get_by_user_id("u1")) == ["v1", "v3"]
+    assert _ids(videos._find_many("category_id", None)) == ["v3"]
+    assert _ids(videos.get_by_category("c1")) == ["v1", "v2"]
+    assert videos._find_unique("user_id", "u2")["id"] == "v2"
+    assert videos._find_unique("user_id", "nobody") is None
+
+    comments = CommentRepository(str(sqlite_dir))
+    assert _ids(comments.get_replies("k1")) == ["k2"]
+    assert _ids(comments.get_root_comments("v1")) == ["k1"]
+
+
+def test_update_checks_version(sqlite_dir):
+    videos = VideoRepository(str(sqlite_dir))
+    stale = dict(videos.get_by_id("v1"))
+    updated = videos.update("v1", {**stale, "name": "первое", "views": 999})
+    assert updated["version"] == 2 and updated["views"] == 10  # счётчики update() не меняет
+
+    with pytest.raises(VersionConflictError):
+        videos.update("v1", {**stale, "name": "второе"})
+    assert videos.get_by_id("v1")["name"] == "первое"
+    assert videos.update("missing", {"name": "x"}) is None
+
+
+def test_counter_deltas_update_snapshot_in_place(sqlite_dir):
+    videos = VideoRepository(str(sqlite_dir))
+    leaderboard = get_leaderboard(videos, "views")
+    assert _ids(leaderboard.top(3)) == ["v2", "v3", "v1"]
+
+    assert videos.apply_counter_deltas({"v1": {"views": 25, "likes": 2}, "missing": {"views": 1}}) == 1
+    video = videos.get_by_id("v1")
+    assert video["views"] == 35 and video["likes"] == 2
+    assert videos.is_fresh()
+    # Производная структура обновлена той же записью, а не построена заново
+    assert get_leaderboard(videos, "views") is leaderboard
+    assert _ids(leaderboard.top(3)) == ["v1", "v2", "v3"]
+
+
+def test_data_tag_follows_table_version(sqlite_dir):
+    videos = VideoRepository(str(sqlite_dir))
+    tag = videos.data_tag()
+    assert videos.data_tag() == tag
+    videos.increment_views("v1")
+    assert videos.data_tag() != tag
+
+    # Запись другого процесса: версия таблицы меняется, снимок перечитывается
+    tag = videos.data_tag()
+    assert len(videos.get_all()) == len(VIDEOS)
+    with sqlite3.connect(sqlite_dir / "mypipe.db") as conn:
+        conn.execute(
+            'INSERT INTO videos (id, data, is_deleted) VALUES (?, ?, 0)',
+            ("v5", json.dumps(make_video("v5"))),
+        )
+        conn.execute("UPDATE _versions SET version = version + 1 WHERE name = 'videos'")
+    assert videos.data_tag() != tag and not videos.is_fresh()
+    assert _ids(videos.get_all())[-1] == "v5"
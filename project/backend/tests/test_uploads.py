@@ -0,0 +1,110 @@
+import hashlib
+import inspect
+
+import pytest
+from minio import Minio
+
+BODY = bytes(range(256)) * 10  # 2560 байт - три части по 1024
+
+
+@pytest.fixture
+def uploads(app_module, monkeypatch):
+    """Загрузчик приложения с маленькими частями и без пауз между повторами"""
+    uploader = app_module.video_uploader
+    monkeypatch.setattr(uploader, "part_size", 1024)
+    monkeypatch.setattr(uploader, "retry_delay", 0.0)
+    created = []
+    yield uploader, created
+    for video_id in created:
+        app_module.video_repo.delete(video_id)
+
+
+def _objects(store):
+    return sorted(item["name"] for item in store.list_objects("video"))
+
+
+def _pending(store):
+    directory = store.root / ".uploads"
+    return sorted(path.name for path in directory.iterdir()) if directory.is_dir() else []
+
+
+def _upload(client, body=BODY, **headers):
+    return client.post(
+        "/api/videos/upload",
+        params={"user_id": "u9", "name": "загрузка", "is_public": "false"},
+        content=body,
+        headers={"content-type": "video/mp4", **headers},
+    )
+
+
+def test_upload_assembles_parts_and_creates_video(app_module, client, uploads):
+    uploader, created = uploads
+    parts_before = uploader.stats()["parts"]
+    response = _upload(client, **{"x-content-sha256": hashlib.sha256(BODY).hexdigest()})
+    assert response.status_code == 200
+    body = response.json()
+    created.append(body["video"]["id"])
+    assert body["size"] == len(BODY) and body["sha256"] == hashlib.sha256(BODY).hexdigest()
+    assert uploader.stats()["parts"] - parts_before == 3
+
+    store = uploader.storage
+    assert store.download_bytes("video", f"{body['video']['id']}.mp4") == BODY
+    assert _pending(store) == []
+    assert app_module.video_repo.get_by_id(body["video"]["id"])["user_id"] == "u9"
+
+
+def test_checksum_mismatch_aborts_upload(app_module, client, uploads):
+    store = uploads[0].storage
+    objects = _objects(store)
+    videos = len(app_module.video_repo.get_all())
+    response = _upload(client, **{"x-content-sha256": "0" * 64})
+    assert response.status_code == 422
+    assert _objects(store) == objects and _pending(store) == []
+    assert len(app_module.video_repo.get_all()) == videos
+
+
+def test_failed_part_aborts_upload(app_module, client, uploads, monkeypatch):
+    uploader = uploads[0]
+    store = uploader.storage
+    calls = []
+
+    def broken_part(*args):
+        calls.append(args[3])
+        raise OSError("обрыв соединения")
+
+    monkeypatch.setattr(uploader, "retries", 1)
+    monkeypatch.setattr(store, "upload_part", broken_part)
+    objects = _objects(store)
+    response = _upload(client)
+    assert response.status_code == 500
+    # Часть повторяется retries раз, потом загрузка отменяется целиком
+    assert calls.count(1) == 2
+    assert _objects(store) == objects and _pending(store) == []
+
+
+def test_upload_over_size_limit_is_rejected(app_module, client, uploads, monkeypatch):
+    monkeypatch.setattr(app_module, "MAX_UPLOAD_SIZE", 2000)
+    store = uploads[0].storage
+    objects = _objects(store)
+    videos = len(app_module.video_repo.get_all())
+    response = _upload(client)
+    assert response.status_code == 413
+    assert _objects(store) == objects and _pending(store) == []
+    assert len(app_module.video_repo.get_all()) == videos
+
+
+def test_upload_requires_video_content_type(client):
+    response = _upload(client, **{"content-type": "text/plain"})
+    assert response.status_code == 415
+
+
+def test_minio_multipart_methods_keep_their_signatures():
+    # MinIOStorage вызывает внутренние методы Minio - новая версия minio не должна их молча сломать
+    expected = {
+        "_create_multipart_upload": ["bucket_name", "object_name", "headers"],
+        "_upload_part": ["bucket_name", "object_name", "data", "headers", "upload_id", "part_number"],
+        "_complete_multipart_upload": ["bucket_name", "object_name", "upload_id", "parts"],
+        "_abort_multipart_upload": ["bucket_name", "object_name", "upload_id"],
+    }
+    for name, parameters in expected.items():
+        assert list(inspect.signature(getattr(Minio, name)).parameters)[1:] == parameters, name
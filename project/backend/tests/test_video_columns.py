@@ -0,0 +1,97 @@
+import pytest
+
+from app.CRUD.video_repository import VideoRepository
+from app.services.recommendations import is_listed
+from app.services.video_columns import VideoColumns
+
+from .conftest import make_video
+
+pytest.importorskip("numpy")
+
+# Равные просмотры и лайки, удалённые и скрытые видео, видео без is_public, счётчиков и категории
+VIDEOS = [
+    make_video("a", views=50, likes=5),
+    make_video("b", views=50, likes=9, category_id="c2"),
+    make_video("c", views=70, likes=5),
+    make_video("d", views=90, likes=1, is_deleted=True),
+    make_video("e", views=80, likes=9, is_public=False),
+    make_video("f", views=50, likes=5),
+    make_video("g", views=10, likes=0, category_id=None),
+    {key: value for key, value in make_video("h", views=60).items() if key not in ("is_public", "likes")},
+    make_video("i", views=70, likes=2, category_id="c2"),
+    make_video("j", views=50, likes=5, is_deleted=True, is_public=False),
+]
+
+
+def _ids(videos):
+    return [video["id"] for video in videos]
+
+
+def _queries(repo):
+    results = {}
+    for limit in (1, 2, 3, 5, len(VIDEOS) + 1):
+        results[("trending", limit)] = _ids(repo.get_trending(limit))
+        results[("likes", limit)] = _ids(repo.get_popular_by_likes(limit))
+        for video in VIDEOS:
+            results[("similar", video["id"], limit)] = _ids(repo.get_similar_videos(video["id"], limit))
+    return results
+
+
+def _assert_paths_agree(repo, monkeypatch):
+    assert repo.video_columns() is not None
+    by_columns = _queries(repo)
+    with monkeypatch.context() as patch:
+        patch.setattr(repo, "video_columns", lambda: None)
+        by_records = _queries(repo)
+    assert by_columns == by_records
+
+
+def test_columns_match_sorted_records(data_dir, monkeypatch):
+    repo = VideoRepository(str(data_dir(videos=VIDEOS)))
+    _assert_paths_agree(repo, monkeypatch)
+    assert _ids(repo.get_trending(4)) == ["c", "i", "a", "b"]
+
+
+def test_counter_deltas_update_column_rows(data_dir, monkeypatch):
+    repo = VideoRepository(str(data_dir(videos=VIDEOS)))
+    columns = repo.video_columns()
+    position = _ids(columns.records).index("f")
+
+    assert repo.apply_counter_deltas({"f": {"views": 20, "likes": 1}, "missing": {"views": 1}}) == 1
+    assert repo.video_columns() is columns
+    assert columns.views[position] == 70 and columns.likes[position] == 6
+    assert columns.get("f") == repo.get_by_id("f")
+    # f сравнялся по просмотрам с c и i - порядок при равенстве тот же, что у sorted
+    _assert_paths_agree(repo, monkeypatch)
+
+    repo.update("e", {**repo.get_by_id("e"), "is_public": True})
+    assert columns.public[_ids(columns.records).index("e")]
+    _assert_paths_agree(repo, monkeypatch)
+
+
+def test_append_doubles_capacity():
+    columns = VideoColumns([make_video(f"v{i:02d}", views=i) for i in range(16)])
+    assert columns.stats()["capacity"] == 16
+
+    for i in range(16, 40):
+        columns.replace(None, make_video(f"v{i:02d}", views=i, category_id="new"))
+    assert len(columns) == 40 and columns.stats()["capacity"] == 64
+    assert columns.views[:40].tolist() == list(range(40))
+    assert _ids(columns.top(3, "views")) == ["v39", "v38", "v37"]
+    assert _ids(columns.top(2, "views", category_id="c1")) == ["v15", "v14"]
+    assert columns.get("v00")["views"] == 0 and columns.get("v39")["category_id"] == "new"
+
+
+def test_catalog_stats(app_module, client):
+    expected = {}
+    for video in app_module.video_repo.get_all():
+        if is_listed(video):
+            totals = expected.setdefault(video.get("category_id"), {"videos": 0, "views": 0, "likes": 0})
+            totals["videos"] += 1
+            totals["views"] += video.get("views", 0)
+            totals["likes"] += video.get("likes", 0)
+
+    body = client.get("/api/stats/catalog").json()
+    assert body["enabled"] is True
+    assert body["videos"] == len(app_module.video_repo.get_all())
+    assert {entry.pop("category_id"): entry for entry in body["by_category"]} == expected
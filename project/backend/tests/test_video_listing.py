@@ -0,0 +1,88 @@
+import base64
+import json
+
+import pytest
+
+from app.services.video_listing import decode_cursor, encode_cursor, project
+
+from .conftest import APP_VIDEOS
+
+LISTED = [video for video in APP_VIDEOS if video["is_public"] and not video["is_deleted"]]
+
+
+def _pages(client, **params):
+    """Все страницы ленты по курсорам: список страниц (списков id)"""
+    pages = []
+    cursor = None
+    while True:
+        response = client.get("/api/videos", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        body = response.json()
+        pages.append([video["id"] for video in body["items"]])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return pages
+        assert len(pages) <= len(APP_VIDEOS), "курсоры зациклились"
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("views", (70, "v3b"))
+    assert "=" not in cursor
+    assert json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))) == ["views", 70, "v3b"]
+    assert decode_cursor("views", cursor) == (70, "v3b")
+
+
+@pytest.mark.parametrize("cursor", [
+    "не base64",
+    "e30",  # {} - не список
+    base64.urlsafe_b64encode(b'["views", "70", "v1"]').decode(),
+    base64.urlsafe_b64encode(b'["views", 70]').decode(),
+    encode_cursor("date", (1.0, "v1")),  # курсор другой сортировки
+])
+def test_decode_cursor_rejects_malformed(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor("views", cursor)
+
+
+@pytest.mark.parametrize("sort", ["date", "views"])
+def test_pages_cover_listing_without_duplicates_or_gaps(client, sort):
+    pages = _pages(client, limit=2, sort=sort)
+    ids = [video_id for page in pages for video_id in page]
+    assert all(len(page) == 2 for page in pages[:-1])
+    assert len(ids) == len(set(ids))
+    assert set(ids) == {video["id"] for video in LISTED}
+    # По убыванию ключа; при равном ключе порядок один и тот же на всех страницах
+    ranks = [next(video[sort] for video in LISTED if video["id"] == video_id) for video_id in ids]
+    assert ranks == sorted(ranks, reverse=True)
+    assert ids == [video_id for page in _pages(client, limit=3, sort=sort) for video_id in page]
+
+
+def test_pages_with_filter(client):
+    ids = [video_id for page in _pages(client, limit=2, category_id="c1") for video_id in page]
+    assert sorted(ids) == sorted(video["id"] for video in LISTED if video["category_id"] == "c1")
+
+
+@pytest.mark.parametrize("cursor", ["не base64", "e30", encode_cursor("views", (70, "v3"))])
+def test_malformed_cursor_is_400(client, cursor):
+    response = client.get("/api/videos", params={"cursor": cursor, "sort": "date"})
+    assert response.status_code == 400
+
+
+def test_unknown_sort_is_400(client):
+    assert client.get("/api/videos", params={"limit": 2, "sort": "name"}).status_code == 400
+
+
+def test_project():
+    records = [{"id": "v1", "name": "a", "views": 1}, {"id": "v2", "views": 2}]
+    assert project(records, ["id", "name"]) == [{"id": "v1", "name": "a"}, {"id": "v2"}]
+    assert project(records, None) == records
+
+
+def test_fields_projection(app_module, client):
+    page = client.get("/api/videos", params={"limit": 3, "fields": "id,views"}).json()
+    assert page["items"] and all(set(video) == {"id", "views"} for video in page["items"])
+
+    catalog = client.get("/api/videos", params={"fields": "id,name"}).json()
+    # Другие тесты дописывают в каталог (загрузки), поэтому сверяем с репозиторием
+    assert len(catalog) == len(app_module.video_repo.get_all()) >= len(APP_VIDEOS)
+    assert all(set(video) == {"id", "name"} for video in catalog)
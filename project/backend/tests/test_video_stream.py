@@ -0,0 +1,106 @@
+import pytest
+
+from app.services.video_stream import RangeNotSatisfiable, parse_range
+
+SIZE = 1000
+CONTENT = bytes(range(256)) * 3 + bytes(SIZE - 768)
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-199", (100, 199)),
+    ("bytes=900-5000", (900, 999)),  # конец за файлом - до последнего байта
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=500-", (500, 999)),
+    ("bytes=0-", (0, 999)),
+    (None, None),
+    ("", None),
+    ("items=0-10", None),
+    ("bytes=0-10,20-30", None),  # несколько диапазонов - файл целиком
+    ("bytes=abc-def", None),
+    ("bytes=200-100", None),
+    ("bytes=10", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, SIZE) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=1000-2000", "bytes=-0"])
+def test_parse_range_not_satisfiable(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, SIZE)
+
+
+@pytest.fixture(scope="module")
+def media(app_module):
+    store = app_module.video_streamer.storage
+    store.create_bucket("video")
+    store.upload_bytes("video", "v1.mp4", CONTENT)
+    return "/api/video/v1/stream"
+
+
+def test_full_response(client, media):
+    response = client.get(media)
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["content-length"] == str(SIZE)
+    assert response.headers["accept-ranges"] == "bytes"
+    assert "content-range" not in response.headers
+
+
+@pytest.mark.parametrize("header, start, end", [
+    ("bytes=0-99", 0, 99),
+    ("bytes=250-260", 250, 260),
+    ("bytes=-10", 990, 999),
+    ("bytes=995-", 995, 999),
+    ("bytes=900-5000", 900, 999),
+])
+def test_partial_response(client, media, header, start, end):
+    response = client.get(media, headers={"Range": header})
+    assert response.status_code == 206
+    assert response.content == CONTENT[start:end + 1]
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{SIZE}"
+    assert response.headers["content-length"] == str(end - start + 1)
+
+
+def test_head_has_headers_without_body(client, media):
+    response = client.head(media, headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == b""
+    assert response.headers["content-range"] == f"bytes 10-19/{SIZE}"
+    assert response.headers["content-length"] == "10"
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=5000-6000", "bytes=-0"])
+def test_unsatisfiable_range_is_416(client, media, header):
+    response = client.get(media, headers={"Range": header})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{SIZE}"
+
+
+def test_if_range_with_other_etag_returns_whole_file(client, media):
+    etag = client.head(media).headers["etag"]
+    partial = client.get(media, headers={"Range": "bytes=0-9", "If-Range": etag})
+    assert partial.status_code == 206
+    whole = client.get(media, headers={"Range": "bytes=0-9", "If-Range": '"other"'})
+    assert whole.status_code == 200
+    assert whole.content == CONTENT
+
+
+def test_missing_file_is_404(client, media):
+    assert client.get("/api/video/v2/stream").status_code == 404
+    assert client.get("/api/video/nope/stream").status_code == 404
+
+
+def test_missing_object_is_not_cached(app_module, client, media):
+    store = app_module.video_streamer.storage
+    assert client.head("/api/video/v4/stream").status_code == 404
+    # Файл залит в обход сервиса (invalidate не вызывался) - 404 не должен запомниться
+    store.upload_bytes("video", "v4.mp4", CONTENT[:10])
+    try:
+        response = client.get("/api/video/v4/stream")
+        assert response.status_code == 200 and response.content == CONTENT[:10]
+    finally:
+        store.delete_object("video", "v4.mp4")
+        app_module.video_streamer.invalidate("video", "v4.mp4")
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+
+import pytest
+
+from app.CRUD.records import VideoRecord
+from app.CRUD.storage import WalStorage, atomic_write
+
+from .conftest import make_video
+
+
+def log_lines(storage: WalStorage):
+    return [json.loads(line) for line in storage.log_path.read_bytes().splitlines() if line.strip()]
+
+
+@pytest.fixture
+def path(data_dir):
+    return data_dir(videos=[make_video("v1"), make_video("v2", views=10)]) / "videos.json"
+
+
+def open_storage(path, **options) -> WalStorage:
+    # fsync после каждой записи: без фонового таймера
+    return WalStorage(path, fsync_batch=1, **options)
+
+
+def put(storage: WalStorage, item):
+    data = [row for row in storage.load() if row["id"] != item["id"]] + [item]
+    assert storage.write(data, [{"op": "put", "item": item}])
+
+
+def incr(storage: WalStorage, item_id: str, **deltas):
+    data = [
+        {**row, **{field: row[field] + delta for field, delta in deltas.items()}} if row["id"] == item_id else row
+        for row in storage.load()
+    ]
+    assert storage.write(data, [{"op": "incr", "id": item_id, "deltas": deltas}])
+
+
+def test_replay_put_and_incr(path):
+    writer = open_storage(path)
+    put(writer, make_video("v3", name="new"))
+    put(writer, make_video("v1", name="renamed"))
+    incr(writer, "v2", views=3, likes=1)
+    incr(writer, "v2", views=2)
+
+    lines = log_lines(writer)
+    assert lines[0] == {"op": "base", "sha1": hashlib.sha1(path.read_bytes()).hexdigest()}
+    assert [line["op"] for line in lines[1:]] == ["put", "put", "incr", "incr"]
+    # Снимок на диске не переписывался - всё в журнале
+    assert [video["id"] for video in json.loads(path.read_bytes())] == ["v1", "v2"]
+
+    # Другой процесс: снимок + проигранный журнал
+    rows = {row["id"]: row for row in open_storage(path, record=VideoRecord).load()}
+    assert list(rows) == ["v1", "v2", "v3"]
+    assert isinstance(rows["v1"], VideoRecord)
+    assert rows["v1"]["name"] == "renamed"
+    assert rows["v3"]["name"] == "new"
+    assert (rows["v2"]["views"], rows["v2"]["likes"]) == (15, 1)
+
+
+def test_reader_replays_only_appended_tail(path):
+    writer = open_storage(path)
+    reader = open_storage(path)
+    put(writer, make_video("v3"))
+    assert [row["id"] for row in reader.load()] == ["v1", "v2", "v3"]
+    incr(writer, "v3", views=7)
+    incr(writer, "v3", views=1)
+    assert reader.load()[-1]["views"] == 8
+
+
+def test_torn_last_line_is_ignored(path):
+    writer = open_storage(path)
+    incr(writer, "v1", views=1)
+    with open(writer.log_path, "ab") as f:
+        f.write(b'{"op":"incr","id":"v1","deltas":{"views":10')  # запись оборвалась
+
+    reader = open_storage(path)
+    data = reader.load()
+    assert data[0]["views"] == 1
+
+    # Хвост журнала не совпал с прочитанным: запись идёт с новой строки, а
+    # write() возвращает False - вызывающий перечитает данные
+    assert not reader.write(data, [{"op": "incr", "id": "v1", "deltas": {"views": 2}}])
+    assert reader.load()[0]["views"] == 3
+    incr(reader, "v1", views=4)
+    assert open_storage(path).load()[0]["views"] == 7
+    assert writer.load()[0]["views"] == 7
+
+
+def test_log_of_other_snapshot_is_dropped(path):
+    writer = open_storage(path)
+    incr(writer, "v1", views=5)
+    # Снимок заменили, а журнал остался от прежнего (сбой посреди компактизации)
+    atomic_write(path, json.dumps([make_video("v1", views=100)]).encode())
+
+    reader = open_storage(path)
+    rows = reader.load()
+    assert [(row["id"], row["views"]) for row in rows] == [("v1", 100)]
+    assert log_lines(reader) == [{"op": "base", "sha1": hashlib.sha1(path.read_bytes()).hexdigest()}]
+
+
+def test_compaction_keeps_all_records(path):
+    storage = open_storage(path, compact_every=4)
+    inode = os.stat(path).st_ino
+    put(storage, make_video("v3"))
+    incr(storage, "v2", views=1)
+    incr(storage, "v3", likes=2)
+    assert os.stat(path).st_ino == inode
+    put(storage, make_video("v4"))  # четвёртая запись - компактизация
+
+    # Снимок заменён переименованием временного файла, журнал начат заново
+    assert os.stat(path).st_ino != inode
+    assert not list(path.parent.glob("*.tmp"))
+    assert log_lines(storage) == [{"op": "base", "sha1": hashlib.sha1(path.read_bytes()).hexdigest()}]
+
+    on_disk = {video["id"]: video for video in json.loads(path.read_bytes())}
+    assert list(on_disk) == ["v1", "v2", "v3", "v4"]
+    assert (on_disk["v2"]["views"], on_disk["v3"]["likes"]) == (11, 2)
+    assert [dict(row) for row in open_storage(path).load()] == list(on_disk.values())
+
+    # Журнал после компактизации продолжает работать поверх нового снимка
+    incr(storage, "v4", views=1)
+    assert open_storage(path).load()[-1]["views"] == 1
+
+
+def test_close_compacts(path):
+    storage = open_storage(path)
+    incr(storage, "v1", views=4)
+    storage.close()
+    assert json.loads(path.read_bytes())[0]["views"] == 4
+    assert len(log_lines(storage)) == 1